@@ -1,8 +1,18 @@
+import asyncio
+import httpx
 import requests
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlencode, quote
 from enum import Enum
 import logging
+import os
+import time
+from functools import lru_cache
+from concurrency import (default_resolve_timeout, gather_with_deadline, get_executor, race_preferred,
+                         race_preferred_async, run_concurrently)
+from http_client import HttpClient, get_async_http_client, get_http_client
+from local_cache import PlaceCache, get_place_cache
+from place_names import CURRENT_LOCATION_NAMES
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +24,20 @@ class TransportMode(Enum):
 
 
 class AmapLocationService:
-    def __init__(self, api_key: str):
+    provider = "amap"
+
+    def __init__(self, api_key: str, cache: Optional[PlaceCache] = None,
+                 http: Optional[HttpClient] = None, resolve_strategy: str = None):
         self.api_key = api_key
         self.base_url = "https://restapi.amap.com/v3"
+        self.cache = cache if cache is not None else get_place_cache()
+        self.http = http or get_http_client()
+        # 地点解析策略：serial（串行，最省配额）/ race（并发）/ hedge（延迟对冲）
+        self.resolve_strategy = (resolve_strategy or os.getenv("PLACE_RESOLVE_STRATEGY", "hedge")).lower()
+        self.hedge_delay = float(os.getenv("PLACE_RESOLVE_HEDGE_DELAY", "0.3"))
+        self.poi_grace = float(os.getenv("PLACE_RESOLVE_POI_GRACE", "0.15"))
+        # 获取当前位置时等待GPS定位的时间预算（秒），与IP定位同时进行
+        self.location_budget = float(os.getenv("CURRENT_LOCATION_BUDGET", "1.0"))
     
     def search_poi(self, keywords: str, city: str = None) -> Optional[Dict]:
         """
@@ -30,7 +51,18 @@ class AmapLocationService:
             包含POI详细信息的字典，包括经纬度、POI类型编码、行政区划代码等
         """
         url = f"{self.base_url}/place/text"
-        
+        params = self._poi_params(keywords, city)
+            
+        try:
+            response = self.http.get(url, params=params)
+            response.raise_for_status()
+            return self._parse_poi_response(response.json())
+                
+        except requests.RequestException as e:
+            logger.error(f"请求错误: {e}")
+            return None
+
+    def _poi_params(self, keywords: str, city: str = None) -> Dict:
         params = {
             'key': self.api_key,
             'keywords': keywords,
@@ -41,87 +73,128 @@ class AmapLocationService:
         
         if city:
             params['city'] = city
-            
+        return params
+
+    @staticmethod
+    def _parse_poi_response(data: Dict) -> Optional[Dict]:
+        if data.get('status') == '1' and data.get('pois'):
+            return data['pois'][0]  # 返回第一个最匹配的结果
+        logger.warning(f"搜索失败: {data.get('info', '未知错误')}")
+        return None
+
+    def input_tips(self, keywords: str, city: str = None) -> List[Dict]:
+        """
+        输入提示：根据输入中的地点片段返回候选地点
+
+        Returns:
+            候选地点列表，每项包含name、district、address，失败时返回空列表
+        """
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(f"{self.base_url}/assistant/inputtips", params=self._input_tips_params(keywords, city))
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') == '1' and data.get('pois'):
-                return data['pois'][0]  # 返回第一个最匹配的结果
-            else:
-                print(f"搜索失败: {data.get('info', '未知错误')}")
-                return None
-                
+            return self._parse_input_tips_response(response.json())
         except requests.RequestException as e:
-            print(f"请求错误: {e}")
-            return None
+            logger.error(f"请求错误: {e}")
+            return []
+
+    def _input_tips_params(self, keywords: str, city: str = None) -> Dict:
+        params = {
+            'key': self.api_key,
+            'keywords': keywords,
+            'output': 'json',
+        }
+        if city:
+            params['city'] = city
+        return params
+
+    @staticmethod
+    def _parse_input_tips_response(data: Dict) -> List[Dict]:
+        if data.get('status') != '1':
+            logger.warning("输入提示失败: %s", data.get('info', '未知错误'))
+            return []
+        # 无结果的字段为空列表
+        return [{'name': tip['name'],
+                 'district': tip.get('district') or '',
+                 'address': tip.get('address') if isinstance(tip.get('address'), str) else ''}
+                for tip in data.get('tips') or [] if tip.get('name')]
     
-    def get_current_location(self, prefer_gps: bool = True) -> Optional[Dict]:
+    def get_current_location(self, prefer_gps: bool = True, budget: float = None) -> Optional[Dict]:
         """
-        获取当前位置（优先GPS定位，失败则使用IP定位）
-        
+        获取当前位置：GPS定位与IP定位同时发起，在时间预算内优先采用GPS定位
+
+        budget秒内GPS有结果即采用；IP定位先返回时GPS至多等到预算到期，之后返回IP定位，
+        需要时再调用upgrade_current_location换成GPS定位。预算到期时两者都没有结果则采用先返回的一个
+
         Args:
-            prefer_gps: 是否优先使用GPS定位，默认True
-        
+            prefer_gps: 是否使用GPS定位，默认True；为False时只使用IP定位
+            budget: 等待GPS定位的时间预算（秒），默认读取CURRENT_LOCATION_BUDGET
+
         Returns:
             包含当前位置信息的字典
         """
-        # 优先尝试GPS定位
-        if prefer_gps:
-            try:
-                from gps_service import GPSService
-                gps = GPSService()
-                
-                if gps.check_gps_available():
-                    logger.info("GPS可用，尝试获取GPS位置")
-                    gps_location = gps.get_location_info()
-                    if gps_location:
-                        logger.info("成功获取GPS位置")
-                        return gps_location
-                    else:
-                        logger.warning("GPS定位失败，回退到IP定位")
-                else:
-                    logger.warning("GPS不可用，使用IP定位")
-            except Exception as e:
-                logger.warning(f"GPS定位异常: {e}，回退到IP定位")
-        
-        # 使用IP定位作为备选方案
+        if not prefer_gps:
+            return self._ip_location()
+        return race_preferred(self._gps_location, self._ip_location, grace=0.0,
+                              budget=self.location_budget if budget is None else budget)
+
+    def _ip_location(self) -> Optional[Dict]:
+        """IP定位，失败时返回None"""
         url = f"{self.base_url}/ip"
         
-        params = {
-            'key': self.api_key,
-            'output': 'json'
-        }
-        
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=self._ip_params())
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') == '1':
-                # 构造标准格式的位置信息
-                location_info = {
-                    'id': '',
-                    'name': '当前位置(IP)',
-                    'lnglat': data.get('rectangle', '').split(';')[0] if data.get('rectangle') else '',
-                    'modxy': data.get('rectangle', '').split(';')[0] if data.get('rectangle') else '',
-                    'poitype': '',
-                    'adcode': data.get('adcode', ''),
-                    'address': data.get('province', '') + data.get('city', ''),
-                    'citycode': data.get('city', ''),
-                    'cityname': data.get('city', ''),
-                    'district': data.get('province', '')
-                }
-                logger.info("IP定位成功")
-                return location_info
-            else:
-                print(f"IP定位失败: {data.get('info', '未知错误')}")
-                return None
+            return self._parse_ip_response(response.json())
                 
         except requests.RequestException as e:
-            print(f"请求错误: {e}")
+            logger.error(f"请求错误: {e}")
             return None
+
+    def upgrade_current_location(self, location: Optional[Dict], timeout: float = None) -> Optional[Dict]:
+        """
+        把IP定位得到的当前位置换成GPS定位，GPS仍不可用时保留原位置
+
+        Args:
+            location: get_current_location的结果
+            timeout: 没有足够新的GPS定位时最多等待的秒数，默认读取GPS_WAIT_TIMEOUT，0表示只用已有定位
+        """
+        if location and location.get('source') == 'gps':
+            return location
+        return self._gps_location(timeout) or location
+
+    @staticmethod
+    def _gps_location(timeout: float = None) -> Optional[Dict]:
+        """尝试获取GPS位置，不可用或失败时返回None"""
+        from gps_service import get_gps_location_info
+        return get_gps_location_info(timeout=timeout)
+
+    def _ip_params(self) -> Dict:
+        return {
+            'key': self.api_key,
+            'output': 'json'
+        }
+
+    @staticmethod
+    def _parse_ip_response(data: Dict) -> Optional[Dict]:
+        if data.get('status') == '1':
+            # 构造标准格式的位置信息
+            location_info = {
+                'id': '',
+                'name': '当前位置(IP)',
+                'lnglat': data.get('rectangle', '').split(';')[0] if data.get('rectangle') else '',
+                'modxy': data.get('rectangle', '').split(';')[0] if data.get('rectangle') else '',
+                'poitype': '',
+                'adcode': data.get('adcode', ''),
+                'address': data.get('province', '') + data.get('city', ''),
+                'citycode': data.get('city', ''),
+                'cityname': data.get('city', ''),
+                'district': data.get('province', ''),
+                'source': 'ip'
+            }
+            logger.info("IP定位成功")
+            return location_info
+        logger.warning(f"IP定位失败: {data.get('info', '未知错误')}")
+        return None
     
     def geocode(self, address: str) -> Optional[Dict]:
         """
@@ -135,30 +208,129 @@ class AmapLocationService:
         """
         url = f"{self.base_url}/geocode/geo"
         
-        params = {
+        try:
+            response = self.http.get(url, params=self._geocode_params(address))
+            response.raise_for_status()
+            return self._parse_geocode_response(response.json())
+                
+        except requests.RequestException as e:
+            logger.error(f"请求错误: {e}")
+            return None
+
+    def _geocode_params(self, address: str) -> Dict:
+        return {
             'key': self.api_key,
             'address': address,
             'output': 'json'
         }
-        
+
+    @staticmethod
+    def _parse_geocode_response(data: Dict) -> Optional[Dict]:
+        if data.get('status') == '1' and data.get('geocodes'):
+            return data['geocodes'][0]
+        logger.warning(f"地理编码失败: {data.get('info', '未知错误')}")
+        return None
+
+    def batch(self, ops: List[Tuple[str, Dict]]) -> List[Optional[Dict]]:
+        """
+        批量请求：将多个子请求打包为一次 /batch 调用
+
+        Args:
+            ops: 子请求列表，每项为(接口路径, 参数)，接口路径如 '/place/text'
+
+        Returns:
+            与ops顺序一致的响应体列表，失败的子请求对应None
+        """
+        url = f"{self.base_url}/batch"
+        body = {
+            'ops': [
+                {'url': f"/v3{path}?{urlencode(params, quote_via=quote)}"}
+                for path, params in ops
+            ]
+        }
+
         try:
-            response = requests.get(url, params=params)
+            response = self.http.post(url, params={'key': self.api_key}, json=body)
             response.raise_for_status()
             data = response.json()
-            
-            if data.get('status') == '1' and data.get('geocodes'):
-                return data['geocodes'][0]
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"批量请求错误: {e}")
+            return [None] * len(ops)
+
+        if not isinstance(data, list):
+            logger.warning(f"批量请求失败: {data.get('info', '未知错误')}")
+            return [None] * len(ops)
+
+        results = []
+        for item in data[:len(ops)]:
+            if item.get('status') == 200 and isinstance(item.get('body'), dict):
+                results.append(item['body'])
             else:
-                print(f"地理编码失败: {data.get('info', '未知错误')}")
-                return None
-                
-        except requests.RequestException as e:
-            print(f"请求错误: {e}")
-            return None
+                results.append(None)
+        results.extend([None] * (len(ops) - len(results)))
+        return results
+
+    def resolve_locations_batch(self, places: List[Tuple[str, Optional[str]]],
+                                include_ip: bool = False) -> Tuple[List[Optional[Dict]], Optional[Dict]]:
+        """
+        批量解析多个地点（以及可选的IP定位），一次往返完成
+
+        缓存未命中的地点与IP定位打包为一次批量请求；POI搜索无结果的地点再打包一次地理编码请求
+
+        Args:
+            places: 地点列表，每项为(地点名称, 城市)
+            include_ip: 是否同时进行IP定位
+
+        Returns:
+            (与places顺序一致的地点信息列表, IP定位结果)
+        """
+        infos: List[Optional[Dict]] = [None] * len(places)
+        pending = []
+        for index, (name, city) in enumerate(places):
+            cached = self.cache.get_place(self.provider, name, city) if self.cache else None
+            if cached:
+                logger.info(f"地点缓存命中: {name}")
+                infos[index] = cached
+            else:
+                pending.append(index)
+
+        ops = [('/place/text', self._poi_params(*places[index])) for index in pending]
+        if include_ip:
+            ops.append(('/ip', self._ip_params()))
+        if not ops:
+            return infos, None
+
+        bodies = self.batch(ops)
+        ip_info = None
+        if include_ip:
+            ip_body = bodies.pop()
+            ip_info = self._parse_ip_response(ip_body) if ip_body else None
+
+        missed = []
+        for index, body in zip(pending, bodies):
+            poi = self._parse_poi_response(body) if body else None
+            infos[index] = self._poi_to_location_info(poi, places[index][0])
+            if infos[index] is None:
+                missed.append(index)
+
+        # POI搜索无结果的地点再批量地理编码
+        if missed:
+            geo_bodies = self.batch([('/geocode/geo', self._geocode_params(places[index][0])) for index in missed])
+            for index, body in zip(missed, geo_bodies):
+                geocode = self._parse_geocode_response(body) if body else None
+                infos[index] = self._geocode_to_location_info(geocode, places[index][0])
+
+        if self.cache:
+            for index in pending:
+                if infos[index]:
+                    name, city = places[index]
+                    self.cache.put_place(self.provider, name, city, infos[index])
+        return infos, ip_info
     
     def get_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
         """
         获取地点的完整信息，包括构建高德地图URL所需的所有参数
+        优先读取本地地点缓存，未命中时请求接口并写回缓存
         
         Args:
             location_name: 地点名称
@@ -167,9 +339,44 @@ class AmapLocationService:
         Returns:
             包含所有URL构建所需信息的字典
         """
-        # 首先尝试POI搜索
-        poi_result = self.search_poi(location_name, city)
-        
+        if self.cache:
+            cached = self.cache.get_place(self.provider, location_name, city)
+            if cached:
+                logger.info(f"地点缓存命中: {location_name}")
+                return cached
+
+        location_info = self._resolve_location_info(location_name, city)
+        if location_info and self.cache:
+            self.cache.put_place(self.provider, location_name, city, location_info)
+        return location_info
+
+    def _resolve_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        """
+        通过接口解析地点信息，按resolve_strategy组织POI搜索与地理编码：
+        serial为POI搜索失败后再地理编码；race为两者同时发起；hedge为POI搜索超过hedge_delay未返回时发起地理编码。
+        并发模式下优先采用POI结果（地理编码先返回时再等待poi_grace秒）。
+        """
+        if self.resolve_strategy == "serial":
+            return (self._poi_location_info(location_name, city)
+                    or self._geocode_location_info(location_name))
+
+        return race_preferred(
+            lambda: self._poi_location_info(location_name, city),
+            lambda: self._geocode_location_info(location_name),
+            grace=self.poi_grace,
+            hedge_delay=self.hedge_delay if self.resolve_strategy == "hedge" else 0.0,
+        )
+
+    def _poi_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        """POI搜索并转换为统一地点信息结构"""
+        return self._poi_to_location_info(self.search_poi(location_name, city), location_name)
+
+    def _geocode_location_info(self, location_name: str) -> Optional[Dict]:
+        """地理编码并转换为统一地点信息结构"""
+        return self._geocode_to_location_info(self.geocode(location_name), location_name)
+
+    @staticmethod
+    def _poi_to_location_info(poi_result: Optional[Dict], location_name: str) -> Optional[Dict]:
         if poi_result:
             location = poi_result.get('location', '').split(',')
             if len(location) == 2:
@@ -187,9 +394,10 @@ class AmapLocationService:
                     'cityname': poi_result.get('cityname', ''),
                     'district': poi_result.get('adname', '')
                 }
-        
-        # 如果POI搜索失败，尝试地理编码
-        geocode_result = self.geocode(location_name)
+        return None
+
+    @staticmethod
+    def _geocode_to_location_info(geocode_result: Optional[Dict], location_name: str) -> Optional[Dict]:
         if geocode_result:
             location = geocode_result.get('location', '').split(',')
             if len(location) == 2:
@@ -207,14 +415,235 @@ class AmapLocationService:
                     'cityname': geocode_result.get('city', ''),
                     'district': geocode_result.get('district', '')
                 }
-        
         return None
 
 
+class AsyncAmapLocationService(AmapLocationService):
+    """AmapLocationService的asyncio版本：接口相同但均为协程，请求经由事件循环共享的异步HTTP客户端发出"""
+
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        response = await get_async_http_client().get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def search_poi(self, keywords: str, city: str = None) -> Optional[Dict]:
+        try:
+            data = await self._get_json(f"{self.base_url}/place/text", self._poi_params(keywords, city))
+            return self._parse_poi_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"请求错误: {e}")
+            return None
+
+    async def input_tips(self, keywords: str, city: str = None) -> List[Dict]:
+        try:
+            data = await self._get_json(f"{self.base_url}/assistant/inputtips", self._input_tips_params(keywords, city))
+            return self._parse_input_tips_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"请求错误: {e}")
+            return []
+
+    async def geocode(self, address: str) -> Optional[Dict]:
+        try:
+            data = await self._get_json(f"{self.base_url}/geocode/geo", self._geocode_params(address))
+            return self._parse_geocode_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"请求错误: {e}")
+            return None
+
+    async def get_current_location(self, prefer_gps: bool = True, budget: float = None) -> Optional[Dict]:
+        if not prefer_gps:
+            return await self._ip_location()
+        # 没有足够新的GPS定位时需要等待位置更新，放到线程中执行
+        return await race_preferred_async(lambda: asyncio.to_thread(self._gps_location), self._ip_location,
+                                          grace=0.0, budget=self.location_budget if budget is None else budget)
+
+    async def upgrade_current_location(self, location: Optional[Dict], timeout: float = None) -> Optional[Dict]:
+        if location and location.get('source') == 'gps':
+            return location
+        return await asyncio.to_thread(self._gps_location, timeout) or location
+
+    async def _ip_location(self) -> Optional[Dict]:
+        try:
+            data = await self._get_json(f"{self.base_url}/ip", self._ip_params())
+            return self._parse_ip_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"请求错误: {e}")
+            return None
+
+    async def get_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        if self.cache:
+            cached = self.cache.get_place(self.provider, location_name, city)
+            if cached:
+                logger.info(f"地点缓存命中: {location_name}")
+                return cached
+
+        location_info = await self._resolve_location_info(location_name, city)
+        if location_info and self.cache:
+            self.cache.put_place(self.provider, location_name, city, location_info)
+        return location_info
+
+    async def _resolve_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        if self.resolve_strategy == "serial":
+            return (await self._poi_location_info(location_name, city)
+                    or await self._geocode_location_info(location_name))
+
+        return await race_preferred_async(
+            lambda: self._poi_location_info(location_name, city),
+            lambda: self._geocode_location_info(location_name),
+            grace=self.poi_grace,
+            hedge_delay=self.hedge_delay if self.resolve_strategy == "hedge" else 0.0,
+        )
+
+    async def _poi_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        return self._poi_to_location_info(await self.search_poi(location_name, city), location_name)
+
+    async def _geocode_location_info(self, location_name: str) -> Optional[Dict]:
+        return self._geocode_to_location_info(await self.geocode(location_name), location_name)
+
+
+@lru_cache(maxsize=None)
+def get_amap_location_service(api_key: str) -> AmapLocationService:
+    """按API密钥复用服务实例（共享连接池与缓存），避免每次导航重新构造"""
+    return AmapLocationService(api_key)
+
+
+@lru_cache(maxsize=None)
+def get_async_amap_location_service(api_key: str) -> AsyncAmapLocationService:
+    """按API密钥复用异步服务实例"""
+    return AsyncAmapLocationService(api_key)
+
+
+def amap_route_type(transport_mode: str = None, route_type: str = 'car') -> str:
+    """交通方式映射为高德URL的type参数"""
+    if transport_mode:
+        try:
+            mode_enum = TransportMode[transport_mode.upper()]
+            route_type = mode_enum.value
+        except KeyError:
+            route_type = TransportMode.DRIVING.value
+    return route_type
+
+
+def _resolve_endpoints_batch(service: AmapLocationService, from_name: str, to_name: str,
+                             from_city: str, to_city: str,
+                             timeout: float) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    批量模式：起点POI、终点POI及（需要时的）IP定位合并为一次批量请求，GPS定位并行进行；
+    IP定位有结果时GPS只等到时间预算（location_budget）到期
+    """
+    from_is_current = from_name in CURRENT_LOCATION_NAMES
+    places = [(to_name, to_city)] if from_is_current else [(from_name, from_city), (to_name, to_city)]
+
+    started = time.monotonic()
+    gps_future = get_executor("request").submit(service._gps_location) if from_is_current else None
+    infos, ip_info = service.resolve_locations_batch(places, include_ip=from_is_current)
+    to_info = infos[-1]
+
+    if not from_is_current:
+        return infos[0], to_info
+
+    from_info = None
+    gps_wait = max(0.0, started + service.location_budget - time.monotonic()) if ip_info else timeout
+    try:
+        from_info = gps_future.result(timeout=gps_wait)
+    except Exception as e:
+        logger.warning(f"GPS定位未完成: {e}")
+    if not from_info:
+        from_info = ip_info
+    if not from_info:
+        logger.warning("无法获取当前位置，尝试使用默认起点")
+        from_info = service.get_location_info("当前位置", from_city)
+    return from_info, to_info
+
+
+def resolve_amap_endpoints(api_key: str, from_name: str, to_name: str,
+                           from_city: str = None, to_city: str = None,
+                           resolve_timeout: float = None,
+                           batch: bool = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    解析起点与终点信息（不组装URL）
+    
+    Args:
+        api_key: 高德地图API密钥
+        from_name: 起点名称，为当前位置类名称时使用GPS/IP定位
+        to_name: 终点名称
+        from_city: 起点城市（可选）
+        to_city: 终点城市（可选）
+        resolve_timeout: 起终点解析的共享截止时间（秒），默认读取PLACE_RESOLVE_TIMEOUT
+        batch: 是否使用批量接口一次解析起终点（及IP定位），默认读取AMAP_BATCH_MODE
+        
+    Returns:
+        (起点信息, 终点信息)，未解析出的一端为None
+    """
+    service = get_amap_location_service(api_key)
+    
+    if batch is None:
+        batch = os.getenv("AMAP_BATCH_MODE", "0") == "1"
+    timeout = resolve_timeout if resolve_timeout is not None else default_resolve_timeout()
+
+    if batch:
+        return _resolve_endpoints_batch(service, from_name, to_name, from_city, to_city, timeout)
+
+    # 起点与终点的解析链路并发执行，共享同一截止时间
+    def resolve_from():
+        if from_name in CURRENT_LOCATION_NAMES:
+            # 使用IP定位获取当前位置
+            info = service.get_current_location()
+            if not info:
+                logger.warning("无法获取当前位置，尝试使用默认起点")
+                info = service.get_location_info("当前位置", from_city)
+            return info
+        return service.get_location_info(from_name, from_city)
+
+    from_info, to_info = run_concurrently(
+        [resolve_from, lambda: service.get_location_info(to_name, to_city)],
+        timeout=timeout
+    )
+    return from_info, to_info
+
+
+async def resolve_amap_endpoints_async(api_key: str, from_name: str, to_name: str,
+                                       from_city: str = None, to_city: str = None,
+                                       resolve_timeout: float = None,
+                                       batch: bool = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    resolve_amap_endpoints的asyncio版本，参数与返回值相同
+    批量模式仍使用同步批量接口（单次往返），在线程中执行
+    """
+    if batch is None:
+        batch = os.getenv("AMAP_BATCH_MODE", "0") == "1"
+    timeout = resolve_timeout if resolve_timeout is not None else default_resolve_timeout()
+
+    if batch:
+        return await asyncio.to_thread(
+            _resolve_endpoints_batch, get_amap_location_service(api_key),
+            from_name, to_name, from_city, to_city, timeout
+        )
+
+    service = get_async_amap_location_service(api_key)
+
+    async def resolve_from():
+        if from_name in CURRENT_LOCATION_NAMES:
+            info = await service.get_current_location()
+            if not info:
+                logger.warning("无法获取当前位置，尝试使用默认起点")
+                info = await service.get_location_info("当前位置", from_city)
+            return info
+        return await service.get_location_info(from_name, from_city)
+
+    from_info, to_info = await gather_with_deadline(
+        [resolve_from(), service.get_location_info(to_name, to_city)],
+        timeout=timeout
+    )
+    return from_info, to_info
+
+
 def build_amap_direction_url_from_names(api_key: str, from_name: str, to_name: str, 
                                        from_city: str = None, to_city: str = None,
                                        route_type: str = 'car', policy: int = 1,
-                                       transport_mode: str = None) -> Optional[str]:
+                                       transport_mode: str = None,
+                                       resolve_timeout: float = None,
+                                       batch: bool = None) -> Optional[str]:
     """
     通过起点终点名称构建高德地图路线规划URL
     
@@ -227,40 +656,59 @@ def build_amap_direction_url_from_names(api_key: str, from_name: str, to_name: s
         route_type: 路线类型（保留兼容性）
         policy: 路线策略
         transport_mode: 交通方式（driving/public_transit/walking）
+        resolve_timeout: 起终点解析的共享截止时间（秒），默认读取PLACE_RESOLVE_TIMEOUT
+        batch: 是否使用批量接口一次解析起终点（及IP定位），默认读取AMAP_BATCH_MODE
         
     Returns:
         完整的高德地图路线规划URL
     """
-    service = AmapLocationService(api_key)
-    
-    if transport_mode:
-        try:
-            mode_enum = TransportMode[transport_mode.upper()]
-            route_type = mode_enum.value
-        except KeyError:
-            route_type = TransportMode.DRIVING.value
-    
-    # 获取起点信息
-    if from_name in ["当前位置", "我的位置", "这里", ""]:
-        # 使用IP定位获取当前位置
-        from_info = service.get_current_location()
-        if not from_info:
-            print("无法获取当前位置，尝试使用默认起点")
-            from_info = service.get_location_info("当前位置", from_city)
-    else:
-        from_info = service.get_location_info(from_name, from_city)
-    
+    from_info, to_info = resolve_amap_endpoints(api_key, from_name, to_name, from_city, to_city,
+                                                resolve_timeout, batch)
+    return _compose_resolved(from_info, to_info, from_name, to_name,
+                             amap_route_type(transport_mode, route_type), policy)
+
+
+async def build_amap_direction_url_from_names_async(api_key: str, from_name: str, to_name: str,
+                                                    from_city: str = None, to_city: str = None,
+                                                    route_type: str = 'car', policy: int = 1,
+                                                    transport_mode: str = None,
+                                                    resolve_timeout: float = None,
+                                                    batch: bool = None) -> Optional[str]:
+    """
+    build_amap_direction_url_from_names的asyncio版本，参数与返回值相同
+    """
+    from_info, to_info = await resolve_amap_endpoints_async(api_key, from_name, to_name, from_city, to_city,
+                                                            resolve_timeout, batch)
+    return _compose_resolved(from_info, to_info, from_name, to_name,
+                             amap_route_type(transport_mode, route_type), policy)
+
+
+def _compose_resolved(from_info: Optional[Dict], to_info: Optional[Dict], from_name: str, to_name: str,
+                      route_type: str, policy: int) -> Optional[str]:
     if not from_info:
-        print(f"无法找到起点: {from_name}")
+        logger.warning(f"无法找到起点: {from_name}")
         return None
     
-    # 获取终点信息
-    to_info = service.get_location_info(to_name, to_city)
     if not to_info:
-        print(f"无法找到终点: {to_name}")
+        logger.warning(f"无法找到终点: {to_name}")
         return None
     
-    # 构建URL参数
+    return compose_amap_direction_url(from_info, to_info, route_type, policy)
+
+
+def compose_amap_direction_url(from_info: Dict, to_info: Dict, route_type: str = 'car', policy: int = 1) -> str:
+    """
+    由已解析的起终点信息组装高德地图路线规划URL
+    
+    Args:
+        from_info: 起点信息
+        to_info: 终点信息
+        route_type: 路线类型（car/bus/walk）
+        policy: 路线策略
+        
+    Returns:
+        完整的高德地图路线规划URL
+    """
     base_url = "https://www.amap.com/dir"
     params = {}
     
@@ -0,0 +1,235 @@
+"""
+常驻麦克风采集模块
+麦克风只打开一次，后台线程持续把PCM写入固定大小的环形缓冲区并随时更新背景噪声估计；
+唤醒词检测与指令识别都按字节位置从同一个缓冲区读取，检测到开口时可附带开口前的音频（pre-roll）
+设备不支持目标采样率时按设备采样率打开，由PCMConverter用NumPy整块转换为16位单声道目标采样率
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+# 背景噪声估计的平滑系数：安静时快速下降，有声音时缓慢上升，避免说话声抬高噪声估计
+NOISE_FALL = 0.1
+NOISE_RISE = 0.002
+
+
+def rms(chunk: bytes) -> float:
+    """16位PCM的均方根能量"""
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    if not len(samples):
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+class PCMConverter:
+    """
+    把任意位宽、声道数与采样率的PCM转换为16位单声道目标采样率
+
+    位宽转换、声道混合与线性插值重采样都按整块向量化计算；分块调用时保留上一块的最后一个采样
+    与插值相位，块与块之间不会出现接缝
+    """
+
+    def __init__(self, from_rate: int, to_rate: int, sample_width: int = 2, channels: int = 1):
+        if sample_width not in (1, 2, 3, 4):
+            raise ValueError(f"不支持的采样位宽: {sample_width}")
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.step = from_rate / to_rate
+        self._phase = 0.0  # 下一个输出采样在本块输入中的位置
+        self._last: Optional[np.ndarray] = None
+
+    @property
+    def passthrough(self) -> bool:
+        return self.from_rate == self.to_rate and self.sample_width == 2 and self.channels == 1
+
+    def _samples(self, data) -> np.ndarray:
+        """解码为float32采样（16位刻度），多声道取平均"""
+        width = self.sample_width
+        if width == 1:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+        elif width == 2:
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        elif width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8)
+            raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+            samples = ((raw[:, 0] << 8 | raw[:, 1] << 16 | raw[:, 2] << 24) >> 16).astype(np.float32)
+        else:
+            samples = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 65536.0
+        if self.channels > 1:
+            samples = samples[:len(samples) - len(samples) % self.channels]
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+    def convert(self, data) -> bytes:
+        if self.passthrough:
+            return bytes(data)
+        samples = self._samples(data)
+        if self.from_rate != self.to_rate and len(samples):
+            if self._last is not None:
+                samples = np.concatenate((self._last, samples))
+            last_index = len(samples) - 1
+            positions = np.arange(self._phase, last_index + 1e-9, self.step)
+            self._last = samples[-1:]
+            if len(positions):
+                # 下一块的输入从本块最后一个采样开始
+                self._phase = positions[-1] + self.step - last_index
+                samples = np.interp(positions, np.arange(len(samples)), samples)
+            else:
+                self._phase -= last_index
+                samples = samples[:0]
+        return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+class AudioRingBuffer:
+    """固定容量的PCM环形缓冲区，按累计写入的字节位置读取"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self.end = 0  # 累计写入的字节数
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def start(self) -> int:
+        """缓冲区中最早仍可读取的位置"""
+        return max(0, self.end - self.capacity)
+
+    def write(self, data: bytes):
+        data = memoryview(data)
+        if len(data) > self.capacity:
+            data = data[-self.capacity:]
+        with self._cond:
+            offset = self.end % self.capacity
+            first = min(len(data), self.capacity - offset)
+            self._buffer[offset:offset + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self.end += len(data)
+            self._cond.notify_all()
+
+    def read(self, start: int, end: int, timeout: float = None) -> Optional[bytes]:
+        """
+        读取[start, end)区间的数据，数据未写入时等待
+
+        Returns:
+            数据；区间起点已被覆盖时从最早可读位置开始返回；超时或缓冲区已关闭时返回None
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.end >= end or self.closed, timeout):
+                return None
+            if self.end < end:
+                return None
+            start = max(start, self.start)
+            if start >= end:
+                return b""
+            begin = start % self.capacity
+            stop = begin + (end - start)
+            with memoryview(self._buffer) as view:
+                if stop <= self.capacity:
+                    return bytes(view[begin:stop])
+                # 跨越缓冲区末尾时两段直接拼接，只复制一次
+                return b"".join((view[begin:], view[:stop - self.capacity]))
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class MicrophoneStream:
+    """常驻的麦克风采集流"""
+
+    def __init__(self, sample_rate: int = 16000, chunk_size: int = 1024, buffer_seconds: float = 30.0,
+                 device_rate: int = None):
+        self.sample_rate = sample_rate
+        # 麦克风的实际采样率，不支持目标采样率的设备按此打开后再转换
+        self.device_rate = device_rate or sample_rate
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_size * 2
+        self.bytes_per_second = sample_rate * 2
+        self.ring = AudioRingBuffer(int(buffer_seconds * self.bytes_per_second) // self.chunk_bytes * self.chunk_bytes)
+        self.noise_floor: Optional[float] = None
+        self._stop = threading.Event()
+        self._opened = threading.Event()
+        self._error: Optional[Exception] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, timeout: float = 5.0):
+        """
+        打开麦克风并开始采集
+
+        Raises:
+            OSError: 无法打开麦克风
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="microphone-stream", daemon=True)
+        self._thread.start()
+        self._opened.wait(timeout)
+        if self._error is not None:
+            raise OSError(f"无法打开麦克风: {self._error}")
+
+    def _run(self):
+        try:
+            device_chunk = self.chunk_size * self.device_rate // self.sample_rate
+            with sr.Microphone(sample_rate=self.device_rate, chunk_size=device_chunk) as source:
+                logger.info("麦克风已打开: 采样率=%s, 每块%s帧", source.SAMPLE_RATE, source.CHUNK)
+                converter = PCMConverter(source.SAMPLE_RATE, self.sample_rate, sample_width=source.SAMPLE_WIDTH)
+                self._opened.set()
+                while not self._stop.is_set():
+                    chunk = converter.convert(source.stream.read(source.CHUNK))
+                    self._update_noise_floor(rms(chunk))
+                    self.ring.write(chunk)
+        except Exception as e:
+            logger.error("麦克风采集出错: %s", e)
+            self._error = e
+        finally:
+            self._opened.set()
+            self.ring.close()
+
+    def _update_noise_floor(self, level: float):
+        if self.noise_floor is None:
+            self.noise_floor = level
+        elif level < self.noise_floor:
+            self.noise_floor += (level - self.noise_floor) * NOISE_FALL
+        else:
+            self.noise_floor += (level - self.noise_floor) * NOISE_RISE
+
+    @property
+    def position(self) -> int:
+        """最新数据的位置（累计字节数）"""
+        return self.ring.end
+
+    def read(self, start: int, size: int) -> bytes:
+        """
+        读取从start开始的size字节，数据未到时等待
+
+        Raises:
+            OSError: 麦克风已关闭或长时间没有数据
+        """
+        data = self.ring.read(start, start + size, timeout=2.0)
+        if data is None:
+            raise OSError(f"麦克风没有数据: {self._error or '采集已停止'}")
+        return data
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+def microphone_settings() -> dict:
+    """读取环境变量MIC_BUFFER_SECONDS（环形缓冲区时长）与MIC_DEVICE_RATE（麦克风实际采样率，默认同目标采样率）"""
+    device_rate = os.getenv("MIC_DEVICE_RATE")
+    return {
+        "buffer_seconds": float(os.getenv("MIC_BUFFER_SECONDS", "30")),
+        "device_rate": int(device_rate) if device_rate else None,
+    }
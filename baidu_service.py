@@ -1,7 +1,16 @@
+import asyncio
+import httpx
 import requests
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote
 import logging
+import os
+from functools import lru_cache
+from concurrency import (default_resolve_timeout, gather_with_deadline, race_preferred,
+                         race_preferred_async, run_concurrently)
+from http_client import HttpClient, get_async_http_client, get_http_client
+from local_cache import PlaceCache, get_place_cache
+from place_names import CURRENT_LOCATION_NAMES
 
 # 配置日志
 logging.basicConfig(
@@ -17,9 +26,20 @@ class BaiduTransportMode:
 
 
 class BaiduLocationService:
-    def __init__(self, api_key: str):
+    provider = "baidu"
+
+    def __init__(self, api_key: str, cache: Optional[PlaceCache] = None,
+                 http: Optional[HttpClient] = None, resolve_strategy: str = None):
         self.api_key = api_key
         self.base_url = "https://api.map.baidu.com"
+        self.cache = cache if cache is not None else get_place_cache()
+        self.http = http or get_http_client()
+        # 地点解析策略：serial（串行，最省配额）/ race（并发）/ hedge（延迟对冲）
+        self.resolve_strategy = (resolve_strategy or os.getenv("PLACE_RESOLVE_STRATEGY", "hedge")).lower()
+        self.hedge_delay = float(os.getenv("PLACE_RESOLVE_HEDGE_DELAY", "0.3"))
+        self.poi_grace = float(os.getenv("PLACE_RESOLVE_POI_GRACE", "0.15"))
+        # 获取当前位置时等待GPS定位的时间预算（秒），与IP定位同时进行
+        self.location_budget = float(os.getenv("CURRENT_LOCATION_BUDGET", "1.0"))
 
     def search_poi(self, keywords: str, city: str = None) -> Optional[Dict]:
         """
@@ -31,25 +51,66 @@ class BaiduLocationService:
             return None
 
         url = f"{self.base_url}/place/v2/search"
-        params = {
+        params = self._poi_params(keywords, city)
+        try:
+            resp = self.http.get(url, params=params)
+            logger.info("POI搜索请求URL：%s, 参数：%s", url, params)
+            resp.raise_for_status()
+            logger.info("POI搜索响应状态码：%s", resp.status_code)
+            return self._parse_poi_response(resp.json())
+        except requests.RequestException as e:
+            logger.error("POI搜索请求失败：%s", str(e))
+            return None
+
+    def _poi_params(self, keywords: str, city: str = None) -> Dict:
+        return {
             "query": keywords,
             "region": city or "全国",
             "output": "json",
             "ak": self.api_key
         }
+
+    @staticmethod
+    def _parse_poi_response(data: Dict) -> Optional[Dict]:
+        if data.get("status") == 0 and data.get("results"):
+            return data["results"][0]
+        logger.warning("POI搜索无结果或状态异常：%s", data.get("status"))
+        return None
+
+    def input_tips(self, keywords: str, city: str = None) -> List[Dict]:
+        """
+        输入提示（百度地点输入提示），需要AK
+
+        Returns:
+            候选地点列表，每项包含name、district、address，失败时返回空列表
+        """
+        if not self.api_key:
+            return []
         try:
-            resp = requests.get(url, params=params)
-            logger.info("POI搜索请求URL：%s, 参数：%s", url, params)
+            resp = self.http.get(f"{self.base_url}/place/v2/suggestion", params=self._input_tips_params(keywords, city))
             resp.raise_for_status()
-            logger.info("POI搜索响应状态码：%s", resp.status_code)
-            data = resp.json()
-            if data.get("status") == 0 and data.get("results"):
-                return data["results"][0]
-            logger.warning("POI搜索无结果或状态异常：%s", data.get("status"))
-            return None
+            return self._parse_input_tips_response(resp.json())
         except requests.RequestException as e:
-            logger.error("POI搜索请求失败：%s", str(e))
-            return None
+            logger.error("输入提示请求失败：%s", str(e))
+            return []
+
+    def _input_tips_params(self, keywords: str, city: str = None) -> Dict:
+        return {
+            "query": keywords,
+            "region": city or "全国",
+            "output": "json",
+            "ak": self.api_key
+        }
+
+    @staticmethod
+    def _parse_input_tips_response(data: Dict) -> List[Dict]:
+        if data.get("status") != 0:
+            logger.warning("输入提示状态异常：%s", data.get("status"))
+            return []
+        return [{"name": item["name"],
+                 "district": item.get("district") or item.get("city") or "",
+                 "address": item.get("address") or ""}
+                for item in data.get("result") or [] if item.get("name")]
 
     def geocode(self, address: str) -> Optional[Dict]:
         """
@@ -60,101 +121,180 @@ class BaiduLocationService:
             return None
 
         url = f"{self.base_url}/geocoding/v3"
-        params = {
-            "address": address,
-            "output": "json",
-            "ak": self.api_key
-        }
+        params = self._geocode_params(address)
         try:
-            resp = requests.get(url, params=params)
+            resp = self.http.get(url, params=params)
             logger.info("地理编码请求URL：%s, 参数：%s", url, params)
             resp.raise_for_status()
             logger.info("地理编码响应状态码：%s", resp.status_code)
-            data = resp.json()
-            if data.get("status") == 0 and data.get("result"):
-                return data["result"]
-            logger.warning("地理编码无结果或状态异常：%s", data.get("status"))
-            return None
+            return self._parse_geocode_response(resp.json())
         except requests.RequestException as e:
             logger.error("地理编码请求失败：%s", str(e))
             return None
 
-    def get_current_location(self, prefer_gps: bool = True) -> Optional[Dict]:
+    def _geocode_params(self, address: str) -> Dict:
+        return {
+            "address": address,
+            "output": "json",
+            "ak": self.api_key
+        }
+
+    @staticmethod
+    def _parse_geocode_response(data: Dict) -> Optional[Dict]:
+        if data.get("status") == 0 and data.get("result"):
+            return data["result"]
+        logger.warning("地理编码无结果或状态异常：%s", data.get("status"))
+        return None
+
+    def get_current_location(self, prefer_gps: bool = True, budget: float = None) -> Optional[Dict]:
         """
-        获取当前位置（优先GPS定位，失败则使用IP定位）
-        
+        获取当前位置：GPS定位与IP定位同时发起，在时间预算内优先采用GPS定位
+
+        budget秒内GPS有结果即采用；IP定位先返回时GPS至多等到预算到期，之后返回IP定位，
+        需要时再调用upgrade_current_location换成GPS定位。预算到期时两者都没有结果则采用先返回的一个
+
         Args:
-            prefer_gps: 是否优先使用GPS定位，默认True
-        
+            prefer_gps: 是否使用GPS定位，默认True；为False时只使用IP定位
+            budget: 等待GPS定位的时间预算（秒），默认读取CURRENT_LOCATION_BUDGET
+
         Returns:
             统一结构的地点信息字典
         """
-        # 优先尝试GPS定位
-        if prefer_gps:
-            try:
-                from gps_service import GPSService
-                gps = GPSService()
-                
-                if gps.check_gps_available():
-                    logger.info("GPS可用，尝试获取GPS位置")
-                    gps_location = gps.get_location_info()
-                    if gps_location:
-                        logger.info("成功获取GPS位置")
-                        return gps_location
-                    else:
-                        logger.warning("GPS定位失败，回退到IP定位")
-                else:
-                    logger.warning("GPS不可用，使用IP定位")
-            except Exception as e:
-                logger.warning(f"GPS定位异常: {e}，回退到IP定位")
-        
-        # 使用IP定位作为备选方案
+        if not prefer_gps:
+            return self._ip_location()
+        return race_preferred(self._gps_location, self._ip_location, grace=0.0,
+                              budget=self.location_budget if budget is None else budget)
+
+    def _ip_location(self) -> Optional[Dict]:
+        """IP定位，失败时返回None"""
         if not self.api_key:
             logger.warning("未提供API密钥，无法获取当前位置")
             return None
 
         url = f"{self.base_url}/location/ip"
-        params = {
-            "ak": self.api_key,
-            "coor": "bd09ll",
-            "output": "json"
-        }
+        params = self._ip_params()
         try:
-            resp = requests.get(url, params=params)
+            resp = self.http.get(url, params=params)
             logger.info("IP定位请求URL：%s, 参数：%s", url, params)
             resp.raise_for_status()
             logger.info("IP定位响应状态码：%s", resp.status_code)
-            data = resp.json()
-            if data.get("status") == 0 and data.get("content"):
-                point = data["content"].get("point", {})
-                city = data["content"].get("address_detail", {}).get("city", "")
-                lng = point.get("x", "")
-                lat = point.get("y", "")
-                logger.info("IP定位成功")
-                return {
-                    "id": "",
-                    "name": "当前位置(IP)",
-                    "lnglat": f"{lng},{lat}",
-                    "modxy": f"{lng},{lat}",
-                    "poitype": "",
-                    "adcode": "",
-                    "address": city,
-                    "citycode": "",
-                    "cityname": city,
-                    "district": ""
-                }
-            logger.warning("IP定位无结果或状态异常：%s", data.get("status"))
-            return None
+            return self._parse_ip_response(resp.json())
         except requests.RequestException as e:
             logger.error("IP定位请求失败：%s", str(e))
             return None
 
+    def upgrade_current_location(self, location: Optional[Dict], timeout: float = None) -> Optional[Dict]:
+        """
+        把IP定位得到的当前位置换成GPS定位，GPS仍不可用时保留原位置
+
+        Args:
+            location: get_current_location的结果
+            timeout: 没有足够新的GPS定位时最多等待的秒数，默认读取GPS_WAIT_TIMEOUT，0表示只用已有定位
+        """
+        if location and location.get("source") == "gps":
+            return location
+        return self._gps_location(timeout) or location
+
+    @staticmethod
+    def _gps_location(timeout: float = None) -> Optional[Dict]:
+        """尝试获取GPS位置，不可用或失败时返回None"""
+        from gps_service import get_gps_location_info
+        return get_gps_location_info(timeout=timeout)
+
+    def _ip_params(self) -> Dict:
+        return {
+            "ak": self.api_key,
+            "coor": "bd09ll",
+            "output": "json"
+        }
+
+    @staticmethod
+    def _parse_ip_response(data: Dict) -> Optional[Dict]:
+        if data.get("status") == 0 and data.get("content"):
+            point = data["content"].get("point", {})
+            city = data["content"].get("address_detail", {}).get("city", "")
+            lng = point.get("x", "")
+            lat = point.get("y", "")
+            logger.info("IP定位成功")
+            return {
+                "id": "",
+                "name": "当前位置(IP)",
+                "lnglat": f"{lng},{lat}",
+                "modxy": f"{lng},{lat}",
+                "poitype": "",
+                "adcode": "",
+                "address": city,
+                "citycode": "",
+                "cityname": city,
+                "district": "",
+                "source": "ip"
+            }
+        logger.warning("IP定位无结果或状态异常：%s", data.get("status"))
+        return None
+
     def get_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
         """
         获取地点统一信息结构：包含名称和经纬度等（优先检索，失败则地理编码）。
+        优先读取本地地点缓存，仅缓存解析出坐标的结果。
         """
-        # 优先使用POI检索
-        poi = self.search_poi(location_name, city)
+        if self.cache:
+            cached = self.cache.get_place(self.provider, location_name, city)
+            if cached:
+                logger.info("地点缓存命中：%s", location_name)
+                return cached
+
+        info = self._resolve_location_info(location_name, city)
+        if info.get("lnglat") and self.cache:
+            self.cache.put_place(self.provider, location_name, city, info)
+        return info
+
+    def _resolve_location_info(self, location_name: str, city: str = None) -> Dict:
+        """
+        通过接口解析地点信息，失败时返回仅含名称的结构。
+        resolve_strategy: serial为检索失败后再地理编码；race为两者同时发起；
+        hedge为检索超过hedge_delay未返回时发起地理编码。并发模式下优先采用检索结果。
+        """
+        if self.resolve_strategy == "serial":
+            info = (self._poi_location_info(location_name, city)
+                    or self._geocode_location_info(location_name, city))
+        else:
+            info = race_preferred(
+                lambda: self._poi_location_info(location_name, city),
+                lambda: self._geocode_location_info(location_name, city),
+                grace=self.poi_grace,
+                hedge_delay=self.hedge_delay if self.resolve_strategy == "hedge" else 0.0,
+            )
+        if info:
+            return info
+
+        # 若无AK或解析失败，返回仅含名称的结构（URL可用名称直接搜索）
+        return self._name_only_location_info(location_name, city)
+
+    @staticmethod
+    def _name_only_location_info(location_name: str, city: str = None) -> Dict:
+        return {
+            "id": "",
+            "name": location_name,
+            "lnglat": "",
+            "modxy": "",
+            "poitype": "",
+            "adcode": "",
+            "address": "",
+            "citycode": "",
+            "cityname": city or "",
+            "district": ""
+        }
+
+    def _poi_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        """POI检索并转换为统一地点信息结构"""
+        return self._poi_to_location_info(self.search_poi(location_name, city), location_name, city)
+
+    def _geocode_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        """地理编码并转换为统一地点信息结构"""
+        return self._geocode_to_location_info(self.geocode(location_name), location_name, city)
+
+    @staticmethod
+    def _poi_to_location_info(poi: Optional[Dict], location_name: str, city: str = None) -> Optional[Dict]:
         if poi:
             loc = poi.get("location", {})
             lng, lat = loc.get("lng"), loc.get("lat")
@@ -171,9 +311,10 @@ class BaiduLocationService:
                     "cityname": city or "",
                     "district": ""
                 }
+        return None
 
-        # 退化到地理编码
-        geo = self.geocode(location_name)
+    @staticmethod
+    def _geocode_to_location_info(geo: Optional[Dict], location_name: str, city: str = None) -> Optional[Dict]:
         if geo and geo.get("location"):
             lng = geo["location"].get("lng")
             lat = geo["location"].get("lat")
@@ -190,38 +331,122 @@ class BaiduLocationService:
                     "cityname": city or "",
                     "district": ""
                 }
+        return None
 
-        # 若无AK或解析失败，返回仅含名称的结构（URL可用名称直接搜索）
-        return {
-            "id": "",
-            "name": location_name,
-            "lnglat": "",
-            "modxy": "",
-            "poitype": "",
-            "adcode": "",
-            "address": "",
-            "citycode": "",
-            "cityname": city or "",
-            "district": ""
-        }
 
+class AsyncBaiduLocationService(BaiduLocationService):
+    """BaiduLocationService的asyncio版本：接口相同但均为协程，请求经由事件循环共享的异步HTTP客户端发出"""
 
-def build_baidu_direction_url_from_names(api_key: str, from_name: str, to_name: str,
-                                         from_city: str = None, to_city: str = None,
-                                         transport_mode: str = None) -> Optional[str]:
-    """
-    通过起终点名称构建百度地图路线规划URL。
-    若提供API密钥则尽量解析坐标；否则退化为名称直链。
-    """
-    # 打印输入参数
-    logger.info(
-        "构建百度地图导航URL，参数：api_key=%s, from_name=%s, to_name=%s, from_city=%s, to_city=%s, transport_mode=%s",
-        "******" if api_key else None, from_name, to_name, from_city, to_city, transport_mode
-    )
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        resp = await get_async_http_client().get(url, params=params)
+        logger.info("请求URL：%s, 参数：%s", url, params)
+        resp.raise_for_status()
+        logger.info("响应状态码：%s", resp.status_code)
+        return resp.json()
+
+    async def search_poi(self, keywords: str, city: str = None) -> Optional[Dict]:
+        if not self.api_key:
+            logger.warning("未提供API密钥，无法执行POI搜索")
+            return None
+        try:
+            data = await self._get_json(f"{self.base_url}/place/v2/search", self._poi_params(keywords, city))
+            return self._parse_poi_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("POI搜索请求失败：%s", str(e))
+            return None
+
+    async def input_tips(self, keywords: str, city: str = None) -> List[Dict]:
+        if not self.api_key:
+            return []
+        try:
+            data = await self._get_json(f"{self.base_url}/place/v2/suggestion", self._input_tips_params(keywords, city))
+            return self._parse_input_tips_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("输入提示请求失败：%s", str(e))
+            return []
+
+    async def geocode(self, address: str) -> Optional[Dict]:
+        if not self.api_key:
+            logger.warning("未提供API密钥，无法执行地理编码")
+            return None
+        try:
+            data = await self._get_json(f"{self.base_url}/geocoding/v3", self._geocode_params(address))
+            return self._parse_geocode_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("地理编码请求失败：%s", str(e))
+            return None
+
+    async def get_current_location(self, prefer_gps: bool = True, budget: float = None) -> Optional[Dict]:
+        if not prefer_gps:
+            return await self._ip_location()
+        # 没有足够新的GPS定位时需要等待位置更新，放到线程中执行
+        return await race_preferred_async(lambda: asyncio.to_thread(self._gps_location), self._ip_location,
+                                          grace=0.0, budget=self.location_budget if budget is None else budget)
+
+    async def upgrade_current_location(self, location: Optional[Dict], timeout: float = None) -> Optional[Dict]:
+        if location and location.get("source") == "gps":
+            return location
+        return await asyncio.to_thread(self._gps_location, timeout) or location
+
+    async def _ip_location(self) -> Optional[Dict]:
+        if not self.api_key:
+            logger.warning("未提供API密钥，无法获取当前位置")
+            return None
+        try:
+            data = await self._get_json(f"{self.base_url}/location/ip", self._ip_params())
+            return self._parse_ip_response(data)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("IP定位请求失败：%s", str(e))
+            return None
 
-    service = BaiduLocationService(api_key)
+    async def get_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        if self.cache:
+            cached = self.cache.get_place(self.provider, location_name, city)
+            if cached:
+                logger.info("地点缓存命中：%s", location_name)
+                return cached
 
-    # 交通方式映射
+        info = await self._resolve_location_info(location_name, city)
+        if info.get("lnglat") and self.cache:
+            self.cache.put_place(self.provider, location_name, city, info)
+        return info
+
+    async def _resolve_location_info(self, location_name: str, city: str = None) -> Dict:
+        if self.resolve_strategy == "serial":
+            info = (await self._poi_location_info(location_name, city)
+                    or await self._geocode_location_info(location_name, city))
+        else:
+            info = await race_preferred_async(
+                lambda: self._poi_location_info(location_name, city),
+                lambda: self._geocode_location_info(location_name, city),
+                grace=self.poi_grace,
+                hedge_delay=self.hedge_delay if self.resolve_strategy == "hedge" else 0.0,
+            )
+        if info:
+            return info
+        return self._name_only_location_info(location_name, city)
+
+    async def _poi_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        return self._poi_to_location_info(await self.search_poi(location_name, city), location_name, city)
+
+    async def _geocode_location_info(self, location_name: str, city: str = None) -> Optional[Dict]:
+        return self._geocode_to_location_info(await self.geocode(location_name), location_name, city)
+
+
+@lru_cache(maxsize=None)
+def get_baidu_location_service(api_key: str) -> BaiduLocationService:
+    """按API密钥复用服务实例（共享连接池与缓存），避免每次导航重新构造"""
+    return BaiduLocationService(api_key)
+
+
+@lru_cache(maxsize=None)
+def get_async_baidu_location_service(api_key: str) -> AsyncBaiduLocationService:
+    """按API密钥复用异步服务实例"""
+    return AsyncBaiduLocationService(api_key)
+
+
+def baidu_route_type(transport_mode: str = None) -> str:
+    """交通方式映射为百度URL的sy参数（路线类型）"""
     mode_map = {
         "driving": "0",  # 驾车
         "car": "0",
@@ -232,23 +457,109 @@ def build_baidu_direction_url_from_names(api_key: str, from_name: str, to_name:
         "walking": "3",  # 步行
         "walk": "3"
     }
-    sy = mode_map.get(transport_mode.lower(), "0") if transport_mode else "0"
-    logger.info("选择的交通方式（sy参数）：%s", sy)
+    return mode_map.get(transport_mode.lower(), "0") if transport_mode else "0"
+
 
+def fill_baidu_endpoints(from_info: Optional[Dict], to_info: Optional[Dict], from_name: str, to_name: str,
+                         from_city: str = None, to_city: str = None) -> Tuple[Dict, Dict]:
+    """未解析出的起终点退化为仅含名称的结构"""
     # 起点
-    if from_name in ["当前位置", "我的位置", "这里", ""]:
-        from_info = service.get_current_location() if api_key else None
-        if not from_info:
+    if not from_info:
+        if from_name in CURRENT_LOCATION_NAMES:
             from_info = {"name": "我的位置", "lnglat": "", "cityname": from_city or "", "id": ""}
-    else:
-        from_info = service.get_location_info(from_name, from_city)
+        else:
+            from_info = {"name": from_name, "lnglat": "", "cityname": from_city or "", "id": ""}
     logger.info("起点信息：%s", from_info)
 
     # 终点
-    to_info = service.get_location_info(to_name, to_city)
     if not to_info:
         to_info = {"name": to_name, "lnglat": "", "cityname": to_city or "", "id": ""}
     logger.info("终点信息：%s", to_info)
+    return from_info, to_info
+
+
+def resolve_baidu_endpoints(api_key: str, from_name: str, to_name: str,
+                            from_city: str = None, to_city: str = None,
+                            resolve_timeout: float = None) -> Tuple[Dict, Dict]:
+    """
+    解析起终点信息（不组装URL），未解析出坐标的一端退化为仅含名称的结构。
+    起终点并发解析，resolve_timeout为两者共享的截止时间（秒）。
+    """
+    service = get_baidu_location_service(api_key)
+
+    # 起点与终点的解析链路并发执行，共享同一截止时间
+    def resolve_from():
+        if from_name in CURRENT_LOCATION_NAMES:
+            return service.get_current_location() if api_key else None
+        return service.get_location_info(from_name, from_city)
+
+    from_info, to_info = run_concurrently(
+        [resolve_from, lambda: service.get_location_info(to_name, to_city)],
+        timeout=resolve_timeout if resolve_timeout is not None else default_resolve_timeout()
+    )
+    return fill_baidu_endpoints(from_info, to_info, from_name, to_name, from_city, to_city)
+
+
+async def resolve_baidu_endpoints_async(api_key: str, from_name: str, to_name: str,
+                                        from_city: str = None, to_city: str = None,
+                                        resolve_timeout: float = None) -> Tuple[Dict, Dict]:
+    """resolve_baidu_endpoints的asyncio版本"""
+    service = get_async_baidu_location_service(api_key)
+
+    async def resolve_from():
+        if from_name in CURRENT_LOCATION_NAMES:
+            return await service.get_current_location() if api_key else None
+        return await service.get_location_info(from_name, from_city)
+
+    from_info, to_info = await gather_with_deadline(
+        [resolve_from(), service.get_location_info(to_name, to_city)],
+        timeout=resolve_timeout if resolve_timeout is not None else default_resolve_timeout()
+    )
+    return fill_baidu_endpoints(from_info, to_info, from_name, to_name, from_city, to_city)
+
+
+def build_baidu_direction_url_from_names(api_key: str, from_name: str, to_name: str,
+                                         from_city: str = None, to_city: str = None,
+                                         transport_mode: str = None,
+                                         resolve_timeout: float = None) -> Optional[str]:
+    """
+    通过起终点名称构建百度地图路线规划URL。
+    若提供API密钥则尽量解析坐标；否则退化为名称直链。
+    起终点并发解析，resolve_timeout为两者共享的截止时间（秒），超时的一端退化为名称直链。
+    """
+    # 打印输入参数
+    logger.info(
+        "构建百度地图导航URL，参数：api_key=%s, from_name=%s, to_name=%s, from_city=%s, to_city=%s, transport_mode=%s",
+        "******" if api_key else None, from_name, to_name, from_city, to_city, transport_mode
+    )
+
+    from_info, to_info = resolve_baidu_endpoints(api_key, from_name, to_name, from_city, to_city, resolve_timeout)
+    return compose_baidu_direction_url(from_info, to_info, from_name, to_name, from_city, to_city, transport_mode)
+
+
+async def build_baidu_direction_url_from_names_async(api_key: str, from_name: str, to_name: str,
+                                                     from_city: str = None, to_city: str = None,
+                                                     transport_mode: str = None,
+                                                     resolve_timeout: float = None) -> Optional[str]:
+    """build_baidu_direction_url_from_names的asyncio版本"""
+    logger.info(
+        "构建百度地图导航URL（异步），参数：api_key=%s, from_name=%s, to_name=%s, from_city=%s, to_city=%s, transport_mode=%s",
+        "******" if api_key else None, from_name, to_name, from_city, to_city, transport_mode
+    )
+
+    from_info, to_info = await resolve_baidu_endpoints_async(api_key, from_name, to_name, from_city, to_city,
+                                                             resolve_timeout)
+    return compose_baidu_direction_url(from_info, to_info, from_name, to_name, from_city, to_city, transport_mode)
+
+
+def compose_baidu_direction_url(from_info: Dict, to_info: Dict, from_name: str, to_name: str,
+                                from_city: str = None, to_city: str = None,
+                                transport_mode: str = None) -> str:
+    """
+    由已解析的起终点信息组装百度地图路线规划URL
+    """
+    sy = baidu_route_type(transport_mode)
+    logger.info("选择的交通方式（sy参数）：%s", sy)
 
     # 构造sn/en参数
     def fmt_node(info: Dict, default_name: str) -> str:
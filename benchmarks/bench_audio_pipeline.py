@@ -0,0 +1,161 @@
+"""
+音频管线基准
+常驻监听时每秒音频在本机消耗的CPU：设备采样率转换 → 环形缓冲区 → 逐帧端点检测 → 切段 → 打包上传消息
+
+旧版: audioop.ratecv重采样、缓冲区跨界读取两次复制、每帧bytes复制并单独计算能量、
+      bytearray切段、gzip默认级别9、bytearray逐段拼接消息
+新版: PCMConverter整块向量化转换、memoryview读写与切段、整块计算帧能量、按级别压缩、一次拼接消息
+
+运行: python benchmarks/bench_audio_pipeline.py [--seconds 60] [--device-rate 48000]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import AudioRingBuffer, PCMConverter, rms  # noqa: E402
+from endpointing import Endpointer  # noqa: E402
+from qiniu_asr_protocol import AUDIO_ONLY_REQUEST, POS_SEQUENCE, encode_audio  # noqa: E402
+
+try:
+    import audioop
+except ImportError:  # Python 3.13起移除
+    audioop = None
+
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1024
+SEGMENT_BYTES = SAMPLE_RATE * 2 * 300 // 1000
+
+
+def device_audio(seconds, device_rate, rng):
+    """设备采样率的"说话-停顿"交替信号，每块一个bytes，模拟麦克风读取"""
+    n = int(seconds * device_rate)
+    t = np.arange(n) / device_rate
+    gate = (np.sin(2 * np.pi * 0.25 * t) > 0).astype(np.float64)
+    signal = gate * 6000 * np.sin(2 * np.pi * 180 * t) + rng.normal(0, 150, n)
+    pcm = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+    chunk = CHUNK_FRAMES * device_rate // SAMPLE_RATE * 2
+    return [pcm[i:i + chunk] for i in range(0, len(pcm), chunk)]
+
+
+class LegacyEndpointer(Endpointer):
+    """旧版逐帧处理：每帧复制为bytes并单独计算能量，判定逻辑相同"""
+
+    def feed(self, chunk):
+        data = self._partial + chunk if self._partial else chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial = data[usable:]
+        out = bytearray()
+        view = memoryview(data)
+        for offset in range(0, usable, self.frame_bytes):
+            frame = bytes(view[offset:offset + self.frame_bytes])
+            self.position += self.frame_bytes
+            if self._is_speech(rms(frame)):
+                self._on_speech(frame, out)
+            else:
+                self._on_silence(frame)
+        self.uploaded_bytes += len(out)
+        return bytes(out)
+
+
+def legacy(chunks, device_rate):
+    ring = AudioRingBuffer(SAMPLE_RATE * 2 * 30)
+    endpointer = LegacyEndpointer(SAMPLE_RATE, noise_floor=150.0, end_silence=1e9, max_end_silence=1e9)
+    state = None
+    cursor = 0
+    buffer = bytearray()
+    seq = 2
+    sent = 0
+    for raw in chunks:
+        if device_rate != SAMPLE_RATE:
+            raw, state = audioop.ratecv(raw, 2, 1, device_rate, SAMPLE_RATE, state)
+        ring.write(raw)
+        # 跨界时两段各复制一次再拼接
+        end = ring.end
+        begin = cursor % ring.capacity
+        stop = begin + (end - cursor)
+        if stop <= ring.capacity:
+            data = bytes(ring._buffer[begin:stop])
+        else:
+            data = bytes(ring._buffer[begin:]) + bytes(ring._buffer[:stop - ring.capacity])
+        cursor = end
+        buffer.extend(endpointer.feed(data))
+        while len(buffer) >= SEGMENT_BYTES:
+            segment = bytes(buffer[:SEGMENT_BYTES])
+            del buffer[:SEGMENT_BYTES]
+            compressed = gzip.compress(segment)
+            msg = bytearray([0x11, (AUDIO_ONLY_REQUEST << 4) | POS_SEQUENCE, 0x11, 0x00])
+            msg.extend(bytearray(seq.to_bytes(4, 'big', signed=True)))
+            msg.extend(len(compressed).to_bytes(4, 'big'))
+            msg.extend(compressed)
+            seq += 1
+            sent += len(msg)
+    return sent
+
+
+def current(chunks, device_rate, compression_level=1):
+    ring = AudioRingBuffer(SAMPLE_RATE * 2 * 30)
+    converter = PCMConverter(device_rate, SAMPLE_RATE)
+    endpointer = Endpointer(SAMPLE_RATE, noise_floor=150.0, end_silence=1e9, max_end_silence=1e9)
+    cursor = 0
+    buffer = bytearray()
+    seq = 2
+    sent = 0
+    for raw in chunks:
+        ring.write(converter.convert(raw))
+        end = ring.end
+        data = ring.read(cursor, end)
+        cursor = end
+        buffer.extend(endpointer.feed(data))
+        ready = len(buffer) - len(buffer) % SEGMENT_BYTES
+        if ready:
+            with memoryview(buffer) as view:
+                for offset in range(0, ready, SEGMENT_BYTES):
+                    msg = encode_audio(bytes(view[offset:offset + SEGMENT_BYTES]), seq, last=False,
+                                       compression_level=compression_level)
+                    seq += 1
+                    sent += len(msg)
+            del buffer[:ready]
+    return sent
+
+
+def measure(run, chunks, seconds, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        sent = run(chunks)
+        best = min(best, time.process_time() - start)
+    tracemalloc.start()
+    run(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best / seconds * 1000, sent, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频管线基准")
+    parser.add_argument("--seconds", type=float, default=60.0, help="模拟的音频时长")
+    parser.add_argument("--device-rate", type=int, default=48000, help="麦克风实际采样率")
+    args = parser.parse_args()
+
+    chunks = device_audio(args.seconds, args.device_rate, np.random.default_rng(0))
+    print(f"{args.seconds:.0f} 秒音频，设备采样率 {args.device_rate} → {SAMPLE_RATE}")
+    print(f"{'':26}{'CPU ms/音频秒':>14}{'上传字节':>12}{'内存峰值KB':>12}")
+    cases = []
+    if audioop is not None or args.device_rate == SAMPLE_RATE:
+        cases.append(("旧版（gzip级别9）", lambda c: legacy(c, args.device_rate)))
+    for level in (9, 1, 0):
+        cases.append((f"新版（压缩级别{level}）", lambda c, level=level: current(c, args.device_rate, level)))
+    for name, run in cases:
+        cpu, sent, peak = measure(run, chunks, args.seconds)
+        print(f"{name:22}{cpu:14.2f}{sent:12d}{peak / 1024:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
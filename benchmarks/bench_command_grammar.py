@@ -0,0 +1,190 @@
+"""
+导航指令解析微基准
+对比旧版两套解析逻辑（语音解析的str.replace+正则、文字备用解析的split链）与command_grammar的一次扫描解析
+
+单次解析不以速度取胜：旧版两套解析只各做几次C实现的字符串操作，却各自维护一套关键词、结果互不一致；
+command_grammar用一套语法给出完整的解析结果（句式、交通方式、唤醒词、歧义词、多余前缀），
+同一句指令在各调用点共用一次扫描
+
+运行: python benchmarks/bench_command_grammar.py [--number 20000]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_grammar import _parse_command, parse_command  # noqa: E402
+from intent_parser import parse_intent  # noqa: E402
+
+# 来自README示例、界面提示与日常使用的真实指令
+CORPUS = [
+    "从上海新天地到中友嘉园",
+    "去天安门",
+    "导航到北京大学",
+    "开车从A到B",
+    "导航步行去崇明岛",
+    "我想驾车从张江人工智能岛到虹桥火车站",
+    "打车去浦东机场",
+    "任意门,我想驾车从张江人工智能岛到虹桥火车站",
+    "任意门，导航到复旦大学",
+    "任意门 步行去静安寺",
+    "任意门。打车去上海虹桥机场",
+    "任意门我想开车从浦东机场到人民广场",
+    "hi 去外滩",
+    "驾车从陆家嘴到虹桥机场T2航站楼",
+    "公交从徐家汇到五角场",
+    "坐地铁去人民广场地铁站",
+    "骑车从复旦大学邯郸校区到同济大学四平路校区",
+    "我要去南京西路步行街",
+    "帮我导航到最近的加油站",
+    "开车回家",
+    "去公司",
+    "明天上午去公司",
+    "怎么去人民广场",
+    "从静安寺到陆家嘴然后去外滩",
+    "今天天气怎么样",
+    "走路去附近的星巴克",
+    "公共交通从上海南站到上海火车站",
+    "导航去上海迪士尼乐园",
+    # 起点名称以"到/去/回"开头
+    "从回龙观到西单",
+    "从到达口到酒店",
+    "从去哪儿网大厦到西单",
+    # 地点名称两端的口语填充词、唤醒词
+    "去公司一下",
+    "帮我导航去一下虹桥火车站",
+    "从家到公司一下",
+    "导航到外滩任意门",
+]
+
+_LEGACY_TRANSPORT_KEYWORDS = {
+    '步行': 'walking',
+    '驾车': 'driving',
+    '自驾': 'driving',
+    '开车': 'driving',
+    '公交': 'public_transit',
+    '地铁': 'public_transit'
+}
+
+
+def legacy_voice_parse(text, wake_word="任意门", require_wake_word=False):
+    """旧版VoiceRecognitionService.parse_navigation_command（去掉日志）"""
+    if not text:
+        return {'valid': False}
+    text = text.replace(" ", "").replace(",", "").replace("。", "").lower()
+    if require_wake_word:
+        if wake_word not in text and "hi" not in text:
+            if not ("任意" in text or "门" in text):
+                return {'valid': False}
+    result = {'valid': True, 'start_point': None, 'end_point': None, 'transport_mode': None}
+    for keyword, mode in _LEGACY_TRANSPORT_KEYWORDS.items():
+        if keyword in text:
+            result['transport_mode'] = mode
+            text = text.replace(keyword, '')
+            break
+    match = re.search(r'从(.+?)到(.+)', text)
+    if match:
+        result['start_point'] = match.group(1).strip()
+        result['end_point'] = match.group(2).strip()
+        return result
+    match = re.search(r'(?:导航)?[到去](.+)', text)
+    if match:
+        result['end_point'] = match.group(1).strip()
+        return result
+    return {'valid': False}
+
+
+_LEGACY_REMOVE = ["步行", "走路", "驾车", "开车", "公交", "公共交通", "地铁", "骑车", "骑行", "打车"]
+
+
+def legacy_fallback_parse(text):
+    """旧版InputApp.fallback_navigation_parse的解析部分"""
+    transport_mode = None
+    if "步行" in text or "走路" in text:
+        transport_mode = "walking"
+    elif "驾车" in text or "开车" in text:
+        transport_mode = "driving"
+    elif "公交" in text or "公共交通" in text or "地铁" in text:
+        transport_mode = "public_transit"
+    elif "骑车" in text or "骑行" in text:
+        transport_mode = "bicycling"
+    elif "打车" in text:
+        transport_mode = "driving"
+
+    if "从" in text and "到" in text:
+        parts = text.split("从")
+        if len(parts) > 1:
+            rest = parts[1]
+            if "到" in rest:
+                from_to = rest.split("到")
+                if len(from_to) >= 2:
+                    start = from_to[0].strip()
+                    end = from_to[1].strip()
+                    for keyword in _LEGACY_REMOVE:
+                        start = start.replace(keyword, "").strip()
+                        end = end.replace(keyword, "").strip()
+                    return start, end, transport_mode
+    elif "去" in text:
+        parts = text.split("去")
+        if len(parts) > 1:
+            destination = parts[1].strip()
+            for keyword in _LEGACY_REMOVE:
+                destination = destination.replace(keyword, "").strip()
+            return "当前位置", destination, transport_mode
+    return None
+
+
+def legacy_pipeline(text):
+    """旧版：语音解析与文字备用解析各自扫描一遍"""
+    legacy_voice_parse(text)
+    legacy_fallback_parse(text)
+
+
+def grammar_pipeline(text):
+    """新版：语音解析、意图打分、备用解析三处共用一次扫描的结果"""
+    parse_command(text)
+    parse_command(text)
+    parse_command(text)
+
+
+def bench(func, number, clear_cache=False):
+    def run():
+        if clear_cache:
+            _parse_command.cache_clear()
+        for text in CORPUS:
+            func(text)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / number / len(CORPUS) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导航指令解析微基准")
+    parser.add_argument("--number", type=int, default=2000, help="每轮重复解析语料的次数")
+    parser.add_argument("--show", action="store_true", help="输出每条语料的解析结果")
+    args = parser.parse_args()
+
+    if args.show:
+        for text in CORPUS:
+            command = parse_command(text)
+            print(f"{text!r:40} → {command['structure']}: {command['start_point']!r} → {command['end_point']!r}"
+                  f" ({command['transport_mode']})")
+        print()
+
+    print(f"语料 {len(CORPUS)} 条，每条平均耗时（微秒，5轮取最优）:")
+    print("单次解析（不使用缓存）:")
+    print(f"  旧版语音解析 parse_navigation_command     {bench(legacy_voice_parse, args.number):8.2f}")
+    print(f"  旧版文字备用解析 fallback_navigation_parse {bench(legacy_fallback_parse, args.number):8.2f}")
+    print(f"  command_grammar 关键词扫描               {bench(_parse_command.__wrapped__, args.number):8.2f}")
+    print("每句指令在各调用点的解析总耗时:")
+    print(f"  旧版（语音解析 + 备用解析）                {bench(legacy_pipeline, args.number):8.2f}")
+    print(f"  新版（语音解析 + 意图打分 + 备用解析）       "
+          f"{bench(grammar_pipeline, args.number, clear_cache=True):8.2f}")
+    print(f"  intent_parser.parse_intent（含打分）     {bench(parse_intent, args.number, clear_cache=True):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+端点检测基准
+对比旧版固定阈值（energy_threshold=4000、pause_threshold=1.0秒、开口前0.5秒全部上传）与
+endpointing.Endpointer逐帧自适应端点检测：上传的音频量、说完到判定句尾的延迟、误截断率
+
+语料为合成的"语音"：带音节包络的谐波信号，音量、句内停顿、背景噪声随机变化，
+只用于比较两种方案与回归检查
+
+运行: python benchmarks/bench_endpointing.py [--count 200]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import rms  # noqa: E402
+from endpointing import Endpointer  # noqa: E402
+
+SAMPLE_RATE = 16000
+RATE = SAMPLE_RATE * 2
+CHUNK = 2048  # 与麦克风流相同，每块1024帧
+
+
+def synthetic_utterance(rng):
+    """
+    Returns:
+        (PCM, 语音开始字节位置, 语音结束字节位置, 背景噪声RMS)
+    """
+    noise_rms = rng.uniform(30, 400)
+    level = rng.uniform(1500, 9000)  # 语音RMS，部分说话人低于旧版固定阈值
+    parts = [np.zeros(int(rng.uniform(0.6, 1.2) * SAMPLE_RATE))]
+    speech_start = len(parts[0])
+    for word in range(rng.integers(2, 6)):
+        for _ in range(rng.integers(1, 4)):
+            n = int(rng.uniform(0.15, 0.3) * SAMPLE_RATE)
+            t = np.arange(n) / SAMPLE_RATE
+            f0 = rng.uniform(110, 260)
+            tone = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 8))
+            envelope = np.sin(np.pi * np.arange(n) / n) ** 0.5
+            parts.append(tone * envelope)
+        if word:
+            parts.append(np.zeros(int(rng.uniform(0.05, 0.45) * SAMPLE_RATE)))  # 句内停顿
+    speech = np.concatenate(parts[1:])
+    speech *= level / np.sqrt(np.mean(speech[speech != 0] ** 2))
+    speech_end = speech_start + len(speech)
+    audio = np.concatenate([parts[0], speech, np.zeros(2 * SAMPLE_RATE)])
+    audio += rng.normal(0, noise_rms, len(audio))
+    pcm = np.clip(audio, -32768, 32767).astype(np.int16).tobytes()
+    return pcm, speech_start * 2, speech_end * 2, noise_rms
+
+
+def legacy(pcm, energy_threshold=4000.0, pause_threshold=1.0, pre_roll=0.5):
+    """旧版按块判定：返回(上传字节, 句尾判定位置)，未检测到语音时为(0, None)"""
+    cursor = 0
+    while cursor + CHUNK <= len(pcm):
+        if rms(pcm[cursor:cursor + CHUNK]) > energy_threshold:
+            break
+        cursor += CHUNK
+    else:
+        return 0, None
+    begin = max(0, cursor - int(pre_roll * RATE))
+    silent = 0
+    while cursor + CHUNK <= len(pcm) and silent <= pause_threshold * RATE:
+        silent = 0 if rms(pcm[cursor:cursor + CHUNK]) > energy_threshold else silent + CHUNK
+        cursor += CHUNK
+    return cursor - begin, cursor
+
+
+def adaptive(pcm, noise_rms):
+    endpointer = Endpointer(SAMPLE_RATE, noise_floor=noise_rms)
+    uploaded = 0
+    for offset in range(0, len(pcm), CHUNK):
+        uploaded += len(endpointer.feed(pcm[offset:offset + CHUNK]))
+        if endpointer.ended:
+            break
+    if not endpointer.started:
+        return 0, None
+    uploaded += len(endpointer.finish())
+    return uploaded, endpointer.position
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端点检测基准")
+    parser.add_argument("--count", type=int, default=200, help="合成语句数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = [synthetic_utterance(rng) for _ in range(args.count)]
+    speech_seconds = sum((end - start) / RATE for _, start, end, _ in corpus)
+
+    print(f"合成语句 {len(corpus)} 条，语音共 {speech_seconds:.1f} 秒")
+    print(f"{'':22}{'漏检':>6}{'误截断':>8}{'上传(秒音频)':>14}{'句尾判定延迟(ms)':>18}")
+    for name, run in (("旧版固定阈值", lambda item: legacy(item[0])),
+                      ("自适应端点检测", lambda item: adaptive(item[0], item[3]))):
+        missed = truncated = 0
+        uploaded = 0
+        delays = []
+        for item in corpus:
+            size, endpoint = run(item)
+            if endpoint is None:
+                missed += 1
+                continue
+            uploaded += size
+            if endpoint < item[2]:
+                truncated += 1
+            else:
+                delays.append((endpoint - item[2]) / RATE * 1000)
+        detected = len(corpus) - missed
+        print(f"{name:18}{missed / len(corpus):8.1%}{truncated / max(detected, 1):8.1%}"
+              f"{uploaded / RATE:14.1f}{np.mean(delays) if delays else float('nan'):18.0f}")
+
+
+if __name__ == "__main__":
+    main()
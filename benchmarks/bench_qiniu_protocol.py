@@ -0,0 +1,162 @@
+"""
+七牛云ASR协议编解码基准
+对比旧版逐字节拼接/切片解析（每条消息都解压、解析JSON并格式化DEBUG日志）与qiniu_asr_protocol：
+  - 音频消息编码（300ms分段），以及不含压缩的消息封装
+  - 中间结果解码并取出识别文本
+  - 只需判断标志位的确认消息（新版不解压负载）
+
+运行: python benchmarks/bench_qiniu_protocol.py [--number 20000]
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qiniu_asr_protocol import (  # noqa: E402
+    AUDIO_ONLY_REQUEST, FULL_SERVER_RESPONSE, GZIP_COMPRESSION, JSON_SERIALIZATION, LAST_PACKAGE, POS_SEQUENCE,
+    SERVER_ACK, SERVER_ERROR_RESPONSE, decode_response, encode_audio, encode_response,
+)
+
+logger = logging.getLogger("bench_qiniu_protocol")
+
+
+# ---- 旧版实现（拆分编解码模块前voice_recognition_service/qiniu_asr_client中的写法） ----
+
+def legacy_gen_header(message_type, flags):
+    header = bytearray()
+    header.append((0b0001 << 4) | 1)
+    header.append((message_type << 4) | flags)
+    header.append((JSON_SERIALIZATION << 4) | GZIP_COMPRESSION)
+    header.append(0x00)
+    return header
+
+
+def legacy_audio_message(pcm_bytes, seq, last, compress=True):
+    compressed_chunk = gzip.compress(pcm_bytes) if compress else pcm_bytes
+    flags = POS_SEQUENCE | LAST_PACKAGE if last else POS_SEQUENCE
+    msg = legacy_gen_header(AUDIO_ONLY_REQUEST, flags)
+    msg.extend(bytearray(seq.to_bytes(4, 'big', signed=True)))
+    msg.extend(len(compressed_chunk).to_bytes(4, 'big'))
+    msg.extend(compressed_chunk)
+    return msg
+
+
+def legacy_parse_response(res):
+    if not isinstance(res, bytes):
+        return {'payload_msg': res}
+    header_size = res[0] & 0x0f
+    message_type = res[1] >> 4
+    flags = res[1] & 0x0f
+    serial = res[2] >> 4
+    comp = res[2] & 0x0f
+    payload = res[header_size * 4:]
+    result = {}
+    if flags & 0x01:
+        result['payload_sequence'] = int.from_bytes(payload[:4], 'big', signed=True)
+        payload = payload[4:]
+    result['is_last_package'] = bool(flags & 0x02)
+    if message_type == FULL_SERVER_RESPONSE:
+        payload_size = int.from_bytes(payload[:4], 'big', signed=True)
+        payload_msg = payload[4:4 + payload_size]
+    elif message_type == SERVER_ACK:
+        result['seq'] = int.from_bytes(payload[:4], 'big', signed=True)
+        if len(payload) >= 8:
+            payload_size = int.from_bytes(payload[4:8], 'big', signed=False)
+            payload_msg = payload[8:8 + payload_size]
+        else:
+            payload_msg = b""
+    elif message_type == SERVER_ERROR_RESPONSE:
+        result['code'] = int.from_bytes(payload[:4], 'big', signed=False)
+        payload_size = int.from_bytes(payload[4:8], 'big', signed=False)
+        payload_msg = payload[8:8 + payload_size]
+    else:
+        payload_msg = payload
+    if comp == GZIP_COMPRESSION:
+        try:
+            payload_msg = gzip.decompress(payload_msg)
+        except Exception as e:
+            logger.error(f"GZIP 解压失败: {e}")
+    if serial == JSON_SERIALIZATION:
+        try:
+            payload_msg = json.loads(payload_msg.decode('utf-8'))
+        except Exception as e:
+            logger.error(f"JSON 解析失败: {e}")
+    else:
+        payload_msg = payload_msg.decode('utf-8', errors='ignore')
+    result['payload_msg'] = payload_msg
+    return result
+
+
+def legacy_response_text(msg):
+    if not isinstance(msg, dict):
+        return None
+    if 'result' in msg and 'text' in msg['result']:
+        return msg['result']['text']
+    if 'data' in msg and 'result' in msg['data'] and 'text' in msg['data']['result']:
+        return msg['data']['result']['text']
+    return None
+
+
+def legacy_receive(frame):
+    parsed = legacy_parse_response(frame)
+    logger.debug(f"收到响应: {parsed}")
+    if 'code' in parsed and parsed['code'] != 0:
+        return None
+    return legacy_response_text(parsed.get('payload_msg')), parsed.get('is_last_package')
+
+
+def current_receive(frame):
+    response = decode_response(frame)
+    logger.debug("收到响应: %r", response)
+    if response.failed:
+        return None
+    return response.text, response.is_last_package
+
+
+def legacy_ack(frame):
+    return legacy_parse_response(frame).get('is_last_package')
+
+
+def current_ack(frame):
+    return decode_response(frame).is_last_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description="七牛云ASR协议编解码基准")
+    parser.add_argument("--number", type=int, default=20000, help="每项的执行次数")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)  # 与线上一致，不输出DEBUG
+
+    rng = np.random.default_rng(0)
+    pcm = (np.sin(np.arange(4800) / 5) * 6000 + rng.normal(0, 150, 4800)).astype(np.int16).tobytes()
+    partial = encode_response(FULL_SERVER_RESPONSE, {
+        "result": {"text": "任意门，从人民广场到外滩，步行", "utterances": [{"definite": False}]},
+        "audio_info": {"duration": 2300}, "reqid": "5f1c7a0e-2d0b-4c5e-9a1b-8a3c1d2e4f5a",
+    }, sequence=7)
+    ack = encode_response(SERVER_ACK, {"status": "ok"}, ack_sequence=7)
+
+    print(f"{'':28}{'旧版 µs':>10}{'新版 µs':>10}{'加速':>8}")
+    cases = (
+        ("音频消息编码(300ms)", lambda: legacy_audio_message(pcm, 5, False), lambda: encode_audio(pcm, 5, False, 9)),
+        ("音频消息封装(不含压缩)", lambda: legacy_audio_message(pcm, 5, False, compress=False),
+         lambda: encode_audio(pcm, 5, False, 0)),
+        ("中间结果解码+取文本", lambda: legacy_receive(partial), lambda: current_receive(partial)),
+        ("确认消息判断最后包", lambda: legacy_ack(ack), lambda: current_ack(ack)),
+    )
+    for name, old, new in cases:
+        number = args.number // 10 if "编码" in name else args.number
+        old_us = min(timeit.repeat(old, number=number, repeat=3)) / number * 1e6
+        new_us = min(timeit.repeat(new, number=number, repeat=3)) / number * 1e6
+        print(f"{name:24}{old_us:10.2f}{new_us:10.2f}{old_us / new_us:7.1f}x")
+    print("\n音频编码两边都使用gzip级别9以对齐负载；默认级别1的开销见bench_audio_pipeline.py")
+
+
+if __name__ == "__main__":
+    main()
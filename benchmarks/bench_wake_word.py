@@ -0,0 +1,165 @@
+"""
+本地唤醒词检测基准
+统计误唤醒率（FA）、漏唤醒率（FR）、发送到云端的片段比例，以及每秒音频消耗的CPU时间
+
+默认使用合成语料：按元音共振峰合成的三音节"唤醒词"（语速、音高、噪声随机变化）与其他音节组合、
+长句、纯噪声等负样本。合成语料只用于比较参数与回归检查，实际效果请用真实录音评估：
+
+运行: python benchmarks/bench_wake_word.py [--positives DIR --negatives DIR] [--enroll 5]
+      目录中为16kHz单声道16位WAV文件，正样本前--enroll个用于录入模板
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wake_word import WakeWordDetector  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+# 元音的前两个共振峰（Hz）
+VOWELS = {
+    "e": (500, 1500),
+    "i": (300, 2300),
+    "en": (480, 1700),
+    "a": (750, 1200),
+    "o": (550, 900),
+    "u": (350, 800),
+    "ü": (300, 1900),
+}
+WAKE_SYLLABLES = [("e", 210, 190), ("i", 240, 225), ("en", 200, 170)]  # "任意门"：元音、起止音高
+NEGATIVE_PATTERNS = [
+    [("a", 220, 200), ("o", 200, 190)],
+    [("u", 230, 210), ("a", 240, 200), ("i", 210, 180)],
+    [("a", 180, 220), ("i", 220, 240), ("u", 240, 200)],
+    [("o", 200, 180), ("e", 190, 210), ("ü", 210, 190), ("a", 200, 170)],
+    [("i", 250, 230), ("e", 220, 200), ("a", 200, 180)],
+]
+
+
+def _syllable(rng, vowel, f0_start, f0_end, seconds, pitch_scale):
+    n = int(seconds * SAMPLE_RATE)
+    f0 = np.linspace(f0_start, f0_end, n) * pitch_scale
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    formant1, formant2 = VOWELS[vowel]
+    signal = np.zeros(n)
+    for k in range(1, 30):
+        frequency = k * f0.mean()
+        if frequency > SAMPLE_RATE / 2:
+            break
+        amplitude = np.exp(-((frequency - formant1) / 150) ** 2) + 0.6 * np.exp(-((frequency - formant2) / 200) ** 2)
+        signal += (amplitude + 0.02) / k * np.sin(k * phase + rng.uniform(0, 2 * np.pi))
+    envelope = np.minimum(1.0, np.minimum(np.arange(n), np.arange(n)[::-1]) / (0.03 * SAMPLE_RATE))
+    return signal * envelope
+
+
+def _utterance(rng, pattern, speed=1.0, pitch=1.0, snr_db=25.0, padding=0.4):
+    parts = [np.zeros(int(padding * SAMPLE_RATE))]
+    for vowel, f0_start, f0_end in pattern:
+        parts.append(_syllable(rng, vowel, f0_start, f0_end, rng.uniform(0.18, 0.24) / speed, pitch))
+        parts.append(np.zeros(int(rng.uniform(0.02, 0.05) / speed * SAMPLE_RATE)))
+    parts.append(np.zeros(int(padding * SAMPLE_RATE)))
+    speech = np.concatenate(parts)
+    speech = speech / np.abs(speech).max() * 0.3
+    noise = rng.normal(0, 0.3 * 10 ** (-snr_db / 20), len(speech))
+    return _to_pcm(speech + noise)
+
+
+def _to_pcm(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def synthetic_corpus(rng, positives=100, negatives=200):
+    def wake():
+        return _utterance(rng, WAKE_SYLLABLES, speed=rng.uniform(0.85, 1.15), pitch=rng.uniform(0.85, 1.15),
+                          snr_db=rng.uniform(15, 30))
+
+    pos = [wake() for _ in range(positives)]
+    neg = []
+    for i in range(negatives):
+        kind = i % 4
+        if kind in (0, 1):
+            pattern = NEGATIVE_PATTERNS[rng.integers(len(NEGATIVE_PATTERNS))]
+            neg.append(_utterance(rng, pattern, speed=rng.uniform(0.85, 1.15), pitch=rng.uniform(0.85, 1.15),
+                                  snr_db=rng.uniform(15, 30)))
+        elif kind == 2:
+            # 长句
+            pattern = [NEGATIVE_PATTERNS[j][0] for j in rng.integers(len(NEGATIVE_PATTERNS), size=12)]
+            neg.append(_utterance(rng, pattern, snr_db=rng.uniform(15, 30)))
+        else:
+            # 背景噪声
+            neg.append(_to_pcm(rng.normal(0, 0.01, 3 * SAMPLE_RATE)))
+    enroll = [wake() for _ in range(5)]
+    return enroll, pos, neg
+
+
+def read_wavs(directory):
+    clips = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with wave.open(path) as f:
+            if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+                print(f"跳过 {path}: 需要16kHz单声道16位")
+                continue
+            clips.append(f.readframes(f.getnframes()))
+    return clips
+
+
+def evaluate(detector, positives, negatives):
+    audio_seconds = sum(len(clip) for clip in positives + negatives) / 2 / SAMPLE_RATE
+    start = time.process_time()
+    pos_accepted = sum(detector.detect(clip)["accepted"] for clip in positives)
+    neg_accepted = sum(detector.detect(clip)["accepted"] for clip in negatives)
+    cpu = time.process_time() - start
+    return {
+        "fr": 1 - pos_accepted / len(positives) if positives else float("nan"),
+        "fa": neg_accepted / len(negatives) if negatives else float("nan"),
+        "escalated": (pos_accepted + neg_accepted) / (len(positives) + len(negatives)),
+        "cpu_per_second": cpu / audio_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地唤醒词检测基准")
+    parser.add_argument("--positives", help="唤醒词录音目录")
+    parser.add_argument("--negatives", help="非唤醒词录音目录")
+    parser.add_argument("--enroll", type=int, default=5, help="用于录入模板的正样本数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.positives and args.negatives:
+        positives = read_wavs(args.positives)
+        enroll, positives = positives[:args.enroll], positives[args.enroll:]
+        negatives = read_wavs(args.negatives)
+        source = "录音"
+    else:
+        enroll, positives, negatives = synthetic_corpus(np.random.default_rng(args.seed))
+        source = "合成语料"
+
+    print(f"{source}: 正样本 {len(positives)}，负样本 {len(negatives)}，模板 {len(enroll)}")
+    gate_only = WakeWordDetector(sample_rate=SAMPLE_RATE)
+    matcher = WakeWordDetector(sample_rate=SAMPLE_RATE)
+    matcher.enroll(enroll)
+
+    print(f"{'':24}{'FR':>8}{'FA':>8}{'发送云端':>10}{'CPU秒/音频秒':>14}")
+    print(f"{'旧版（每段都发送云端）':20}{0:8.1%}{'-':>8}{1:10.1%}{0:14.4f}")
+    for name, detector in (("VAD+时长过滤", gate_only), (f"模板匹配(阈值{matcher.threshold:.2f})", matcher)):
+        r = evaluate(detector, positives, negatives)
+        print(f"{name:22}{r['fr']:8.1%}{r['fa']:8.1%}{r['escalated']:10.1%}{r['cpu_per_second']:14.4f}")
+
+    # 阈值扫描，便于按场景在FA与FR之间取舍（WAKE_WORD_THRESHOLD）
+    print("\n阈值扫描（模板匹配）:")
+    base = matcher.threshold
+    for scale in (0.6, 0.8, 1.0, 1.2, 1.5):
+        matcher.threshold = base * scale
+        r = evaluate(matcher, positives, negatives)
+        print(f"  阈值 {matcher.threshold:6.2f}  FR {r['fr']:6.1%}  FA {r['fa']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
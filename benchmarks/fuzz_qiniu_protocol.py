@@ -0,0 +1,180 @@
+"""
+七牛云ASR协议编解码往返模糊测试
+  - 随机生成配置、音频与各类服务端消息，编码后再解码，逐字段核对
+  - 与旧版parse_response（见bench_qiniu_protocol.py）对同一条合法消息的解析结果做差异比对
+  - 随机截断、翻转字节与随机数据：只允许返回消息或抛出ProtocolError，访问payload/text不得抛异常
+
+运行: python benchmarks/fuzz_qiniu_protocol.py [--iterations 20000] [--seed 0]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_qiniu_protocol import legacy_parse_response  # noqa: E402
+from qiniu_asr_protocol import (  # noqa: E402
+    AUDIO_ONLY_REQUEST, FULL_CLIENT_REQUEST, FULL_SERVER_RESPONSE, GZIP_COMPRESSION, JSON_SERIALIZATION,
+    NO_COMPRESSION, NO_SERIALIZATION, SERVER_ACK, SERVER_ERROR_RESPONSE, ProtocolError, decode_response,
+    encode_audio, encode_config, encode_response,
+)
+
+ALPHABET = "任意门从到去外滩人民广场步行骑车驾车，。abcXYZ0123 \"\\\n"
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def random_text(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+
+
+def random_json(rng, depth=0):
+    kind = rng.randint(0, 6 if depth < 3 else 3)
+    if kind == 0:
+        return random_text(rng)
+    if kind == 1:
+        return rng.randint(INT32_MIN, INT32_MAX)
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind == 3:
+        return rng.random()
+    if kind == 4:
+        return [random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_text(rng): random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def random_payload(rng):
+    """服务端负载：多数带识别文本，位于result.text或data.result.text"""
+    text = random_text(rng)
+    shape = rng.randint(0, 3)
+    if shape == 0:
+        return {"result": {"text": text}, "extra": random_json(rng)}, text
+    if shape == 1:
+        return {"data": {"result": {"text": text}}}, text
+    if shape == 2:
+        return {"error": random_text(rng)}, None
+    return random_json(rng), None
+
+
+def check_server_message(rng):
+    message_type = rng.choice([FULL_SERVER_RESPONSE, SERVER_ACK, SERVER_ERROR_RESPONSE])
+    serial = rng.choice([JSON_SERIALIZATION, NO_SERIALIZATION])
+    comp = rng.choice([GZIP_COMPRESSION, NO_COMPRESSION])
+    sequence = rng.choice([None, rng.randint(INT32_MIN, INT32_MAX)])
+    last = rng.random() < 0.3
+    code = rng.randint(1, 2 ** 32 - 1) if message_type == SERVER_ERROR_RESPONSE else 0
+    ack_sequence = rng.randint(INT32_MIN, INT32_MAX)
+    if serial == JSON_SERIALIZATION:
+        payload, text = random_payload(rng)
+    else:
+        payload, text = random_text(rng), None
+    frame = encode_response(message_type, payload, sequence=sequence, last=last, code=code,
+                            ack_sequence=ack_sequence, serial=serial, comp=comp)
+    response = decode_response(frame)
+    assert response.message_type == message_type
+    assert response.sequence == sequence
+    assert response.is_last_package == last
+    assert response.serial == serial and response.comp == comp
+    if message_type == SERVER_ERROR_RESPONSE:
+        assert response.code == code and response.failed
+        assert str(code) in response.error_message()
+    else:
+        assert response.code is None and not response.failed
+    if message_type == SERVER_ACK:
+        assert response.ack_sequence == ack_sequence
+    # 空负载（JSON的null或空字符串文本）解码为None
+    empty = payload is None or (serial != JSON_SERIALIZATION and payload == "")
+    expected = None if empty else payload
+    assert response.payload == expected, (response.payload, expected)
+    if serial == JSON_SERIALIZATION:
+        assert response.text == text, (response.text, text)
+
+    # 与旧版解析结果比对（旧版把空负载解析为b""或报错，只比对非空负载）
+    legacy = legacy_parse_response(frame)
+    assert legacy['is_last_package'] == response.is_last_package
+    assert legacy.get('payload_sequence') == response.sequence
+    assert legacy.get('code') == response.code
+    assert legacy.get('seq') == response.ack_sequence
+    if expected is not None:
+        assert legacy['payload_msg'] == expected
+
+
+def check_client_message(rng):
+    if rng.random() < 0.2:
+        sample_rate, bits, channels = rng.choice([8000, 16000, 48000]), rng.choice([8, 16]), rng.randint(1, 2)
+        uid = random_text(rng) or "uid"
+        response = decode_response(encode_config(sample_rate, bits, channels, uid=uid))
+        assert response.message_type == FULL_CLIENT_REQUEST and response.sequence == 1
+        assert not response.is_last_package
+        assert response.payload["audio"] == {"format": "pcm", "sample_rate": sample_rate, "bits": bits,
+                                             "channel": channels, "codec": "raw"}
+        assert response.payload["user"]["uid"] == uid
+        return
+    pcm = rng.randbytes(rng.choice([0, 1, 2, 640, 9600, rng.randint(0, 20000)]))
+    seq = rng.randint(2, 10000)
+    last = rng.random() < 0.3
+    level = rng.randint(0, 9)
+    response = decode_response(encode_audio(pcm, -seq if last else seq, last, compression_level=level))
+    assert response.message_type == AUDIO_ONLY_REQUEST
+    assert response.sequence == (-seq if last else seq)
+    assert response.is_last_package == last
+    if level:
+        assert response.comp == GZIP_COMPRESSION and zlib.decompress(response.raw, 31) == pcm
+    else:
+        assert response.comp == NO_COMPRESSION and response.raw == pcm
+
+
+def check_malformed(rng, frames):
+    frame = bytearray(rng.choice(frames))
+    mutation = rng.randint(0, 3)
+    if mutation == 0:
+        frame = frame[:rng.randint(0, len(frame))]
+    elif mutation == 1 and frame:
+        for _ in range(rng.randint(1, 4)):
+            frame[rng.randrange(len(frame))] = rng.randrange(256)
+    elif mutation == 2:
+        frame = bytearray(rng.randbytes(rng.randint(0, 64)))
+    else:
+        frame.extend(rng.randbytes(rng.randint(1, 16)))
+    try:
+        response = decode_response(bytes(frame))
+    except ProtocolError:
+        return
+    response.payload
+    response.text
+    repr(response)
+    if response.failed:
+        response.error_message()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="七牛云ASR协议编解码往返模糊测试")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # 畸形消息会触发解压/解析失败的错误日志，这里不输出
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    frames = [encode_response(FULL_SERVER_RESPONSE, {"result": {"text": "任意门去外滩"}}, sequence=3, last=True),
+              encode_response(SERVER_ACK, {"status": "ok"}, ack_sequence=4),
+              encode_response(SERVER_ERROR_RESPONSE, {"error": "mismatch sequence"}, code=45000000),
+              encode_audio(b"\x01\x02" * 100, 2, False),
+              encode_config(16000, 16, 1, uid="u")]
+    for i in range(args.iterations):
+        try:
+            check_server_message(rng)
+            check_client_message(rng)
+            check_malformed(rng, frames)
+        except Exception:
+            print(f"第 {i} 轮失败（--seed {args.seed}）")
+            raise
+    # 文本帧原样作为负载
+    assert decode_response("hello").payload == "hello"
+    print(f"通过 {args.iterations} 轮：往返编解码、与旧版比对、畸形消息")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Claude CLI会话池模块
+以streaming-input模式常驻若干Claude CLI进程，MCP工具在进程启动时完成握手，
+每条导航指令只需写入一条消息，不再为每个请求启动新进程
+"""
+import collections
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ClaudeSessionError(Exception):
+    """会话进程退出、响应超时或返回错误"""
+
+
+class ClaudeSession:
+    """一个常驻的Claude CLI进程，按轮次收发stream-json消息"""
+
+    def __init__(self, config_path: str, system_prompt: str, env: dict = None):
+        self.cmd = [
+            "claude",
+            "--mcp-config", config_path,
+            "--dangerously-skip-permissions",
+            "--print",
+            "--input-format", "stream-json",
+            "--output-format", "stream-json",
+            "--verbose",
+            "--append-system-prompt", system_prompt,
+        ]
+        self.env = env
+        self.turns = 0
+        self.completed_turns = 0  # 已输出result事件的轮数
+        self._turn_tools: List[str] = []  # 正在进行的一轮中已调用的工具名
+        self.process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stderr = collections.deque(maxlen=20)
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, bufsize=1, env=self.env,
+        )
+        threading.Thread(target=self._read_stdout, name="claude-session-stdout", daemon=True).start()
+        threading.Thread(target=self._read_stderr, name="claude-session-stderr", daemon=True).start()
+        logger.info("Claude会话已启动: pid=%s", self.process.pid)
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self._track(line)
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _track(self, line: str):
+        """记录本轮进度（已调用的工具、是否已输出result事件），调用方无需读取输出即可查询"""
+        if '"result"' not in line and '"tool_use"' not in line:
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        if event.get("type") == "result":
+            self._turn_tools = []
+            self.completed_turns += 1
+        elif event.get("type") == "assistant":
+            for block in (event.get("message") or {}).get("content") or []:
+                if isinstance(block, dict) and block.get("type") == "tool_use":
+                    self._turn_tools.append(str(block.get("name", "")))
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self._stderr.append(line.rstrip())
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def send(self, text: str):
+        """写入一条用户消息，开始新的一轮"""
+        self._write({"type": "user", "message": {"role": "user", "content": [{"type": "text", "text": text}]}})
+        self.turns += 1
+
+    def interrupt(self):
+        """请求中断正在进行的一轮，会话保留，本轮随后以result事件结束"""
+        self._write({"type": "control_request", "request_id": f"interrupt-{self.turns}",
+                     "request": {"subtype": "interrupt"}})
+
+    def _write(self, message: dict):
+        if not self.is_alive():
+            raise ClaudeSessionError(self._exit_message())
+        try:
+            self.process.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ClaudeSessionError(f"写入会话失败: {e}") from e
+
+    def turn_finished(self) -> bool:
+        """最近一轮是否已输出result事件"""
+        return self.completed_turns >= self.turns
+
+    def turn_tools(self) -> Tuple[str, ...]:
+        """正在进行的一轮中已调用的工具名"""
+        return tuple(self._turn_tools)
+
+    def receive(self, timeout: float, check_error: bool = True) -> List[str]:
+        """
+        读取本轮输出直到result事件
+
+        Args:
+            timeout: 超时（秒）
+            check_error: 是否把错误结果（如被中断的一轮）当作异常
+
+        Returns:
+            本轮的stream-json输出行
+
+        Raises:
+            ClaudeSessionError: 超时、进程退出或返回错误结果
+        """
+        deadline = time.monotonic() + timeout
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ClaudeSessionError("Claude CLI响应超时")
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise ClaudeSessionError("Claude CLI响应超时")
+            if line is None:
+                raise ClaudeSessionError(self._exit_message())
+            lines.append(line)
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict) and event.get("type") == "result":
+                if check_error and event.get("is_error"):
+                    raise ClaudeSessionError(event.get("result") or event.get("subtype") or "命令执行失败")
+                return lines
+
+    def _exit_message(self) -> str:
+        code = self.process.poll() if self.process else None
+        detail = "\n".join(self._stderr) or "命令执行失败"
+        return f"Claude会话已退出(code={code}): {detail}"
+
+    def close(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        logger.info("Claude会话已关闭: pid=%s", self.process.pid)
+
+
+class ClaudeSessionPool:
+    """
+    Claude CLI会话池：预先启动会话，按请求借出并归还；
+    进程退出、请求超时或达到最大轮数的会话会被关闭并在后台补充新会话
+    """
+
+    def __init__(self, factory: Callable[[], ClaudeSession], size: int = 1, max_turns: int = 20):
+        self.factory = factory
+        self.size = size
+        self.max_turns = max_turns
+        self._idle: "queue.Queue[ClaudeSession]" = queue.Queue()
+        self._closed = False
+        self._spawn_error = None
+
+    def warm_up(self):
+        """在后台启动全部会话"""
+        for _ in range(self.size):
+            self._spawn(background=True)
+
+    def _spawn(self, background: bool = True):
+        def run():
+            if self._closed:
+                return
+            session = self.factory()
+            try:
+                session.start()
+            except OSError as e:
+                logger.warning("启动Claude会话失败: %s", e)
+                self._spawn_error = f"启动Claude会话失败: {e}"
+                return
+            self._spawn_error = None
+            self._idle.put(session)
+
+        if background:
+            threading.Thread(target=run, name="claude-session-spawn", daemon=True).start()
+        else:
+            run()
+
+    def acquire(self, timeout: float) -> ClaudeSession:
+        """
+        借出一个健康的会话
+
+        Raises:
+            ClaudeSessionError: 超时内没有可用会话
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ClaudeSessionError("没有可用的Claude会话")
+            try:
+                # 分段等待，会话启动失败（例如未安装CLI）时尽快返回
+                session = self._idle.get(timeout=min(remaining, 0.2))
+            except queue.Empty:
+                if self._spawn_error:
+                    raise ClaudeSessionError(self._spawn_error)
+                continue
+            if session.is_alive():
+                return session
+            logger.warning("Claude会话已失效，重新启动: %s", session._exit_message())
+            session.close()
+            self._spawn()
+
+    def release(self, session: ClaudeSession):
+        """归还会话，达到最大轮数的会话被替换以免上下文无限增长"""
+        if self._closed or not session.is_alive() or session.turns >= self.max_turns:
+            self.discard(session)
+            return
+        self._idle.put(session)
+
+    def interrupt(self, session: ClaudeSession, timeout: float):
+        """
+        中断会话正在进行的一轮（例如本地解析已先完成导航），在后台读完本轮输出后归还；
+        中断失败或timeout秒内本轮未结束时替换会话
+        """
+        def run():
+            try:
+                if not session.turn_finished():
+                    session.interrupt()
+                session.receive(timeout, check_error=False)
+            except ClaudeSessionError as e:
+                logger.warning("中断Claude会话失败，替换会话: %s", e)
+                self.discard(session)
+                return
+            self.release(session)
+
+        threading.Thread(target=run, name="claude-session-interrupt", daemon=True).start()
+
+    def discard(self, session: ClaudeSession):
+        """关闭会话（例如请求超时或中断失败）并在后台补充新会话"""
+        if session.is_alive():
+            session.process.kill()
+        session.close()
+        if not self._closed:
+            self._spawn()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def claude_pool_settings() -> dict:
+    """
+    会话池配置，读取自环境变量CLAUDE_SESSION_POOL_SIZE（0为不使用会话池）、CLAUDE_SESSION_MAX_TURNS、
+    CLAUDE_INTERRUPT_TIMEOUT（中断一轮后等待其结束的秒数，超时则替换会话）
+    """
+    return {
+        "size": int(os.getenv("CLAUDE_SESSION_POOL_SIZE", "1")),
+        "max_turns": int(os.getenv("CLAUDE_SESSION_MAX_TURNS", "20")),
+        "interrupt_timeout": float(os.getenv("CLAUDE_INTERRUPT_TIMEOUT", "3")),
+    }
@@ -0,0 +1,267 @@
+"""
+导航指令语法模块
+所有关键词在导入时编译成一个前缀树正则，一次扫描识别唤醒词、交通方式、从/到/去/导航句式、口语填充词和歧义词，
+语音识别与文字输入的导航解析共用同一套语法，调用时不再编译正则
+"""
+import re
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 词元类型
+WAKE = "wake"                  # 完整唤醒词
+WAKE_PARTIAL = "wake_partial"  # 部分唤醒词（识别不完整时）
+FROM = "from"
+TO = "to"
+GO = "go"
+NAV = "nav"
+FILLER = "filler"              # 口语填充词（句首、地点名称两端）
+MODE = "mode"                  # 交通方式
+PUNCT = "punct"
+MARKER = "marker"              # 疑问、否定、途经等歧义词
+LITERAL = "literal"            # 含交通方式关键词的地名片段，整体保留
+
+# 交通方式关键词
+TRANSPORT_KEYWORDS = {
+    "步行": "walking",
+    "走路": "walking",
+    "驾车": "driving",
+    "自驾": "driving",
+    "开车": "driving",
+    "打车": "driving",
+    "公共交通": "public_transit",
+    "公交": "public_transit",
+    "地铁": "public_transit",
+    "骑车": "bicycling",
+    "骑行": "bicycling",
+}
+
+GRAMMAR = {
+    WAKE: ("任意门", "hi"),
+    WAKE_PARTIAL: ("任意", "门"),
+    FROM: ("从",),
+    TO: ("到",),
+    GO: ("去", "回", "前往"),
+    NAV: ("导航",),
+    FILLER: ("我想", "我要", "想", "要", "请", "帮我", "麻烦", "一下"),
+    PUNCT: (" ", "\t", ",", "，", "。", ".", "!", "！", "?", "？", "、"),
+    MARKER: ("吗", "呢", "怎么", "什么", "哪", "多远", "多久", "不要", "别", "不去",
+             "然后", "再去", "顺路", "经过", "途经", "或者", "还是"),
+    LITERAL: ("地铁站", "地铁口", "公交站", "公交车站", "步行街"),
+}
+
+# 句式之前允许出现的词元，除此之外的内容记为多余前缀
+_LEADING_DROP = frozenset((WAKE, WAKE_PARTIAL, FILLER, NAV, MODE, PUNCT))
+# 地点名称两端去掉的词元（去公司一下、去一下公司）；单字的"想/要/请/门"多是地名用字，不去掉
+_SPAN_DROP = frozenset((WAKE, WAKE_PARTIAL, FILLER))
+
+
+class KeywordScanner:
+    """
+    多模式关键词扫描器
+
+    构造时把所有关键词合并成一棵前缀树，再把前缀树编译成一个正则：每个位置沿前缀树逐字匹配，
+    重叠时取最左最长的关键词。扫描在re模块内完成，一次split得到普通文本与关键词交替排列的片段
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, str, Optional[str]]]):
+        """
+        Args:
+            keywords: (关键词, 词元类型, 附加值) 序列，关键词重复时以后出现的为准；英文关键词不区分大小写
+        """
+        self.keywords: Dict[str, Tuple[str, Optional[str]]] = {}  # 关键词原文（含各种大小写写法） -> (词元类型, 附加值)
+        trie: Dict = {}
+        for keyword, kind, value in keywords:
+            # 大小写写法逐一展开成关键词，正则保持纯文字分支，re才能按首字快速跳过无关位置
+            for variant in map("".join, product(*({ch.lower(), ch.upper()} for ch in keyword))):
+                self.keywords[variant] = (kind, value)
+                node = trie
+                for ch in variant:
+                    node = node.setdefault(ch, {})
+                node[""] = None  # 关键词在此结束
+        self._pattern = re.compile("(" + self._trie_pattern(trie) + ")")
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict) -> str:
+        """
+        前缀树转成正则：每个子节点一个分支；可在此结束的节点后缀可选（贪婪，先试更长的关键词）
+
+        re按顺序逐个尝试分支，分支保持关键词的登记顺序，GRAMMAR中靠前的句式词先被尝试
+        """
+        branches = [re.escape(ch) + cls._trie_pattern(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    def split(self, text: str) -> List[str]:
+        """
+        找出文本中的关键词，重叠时取最左最长匹配
+
+        Returns:
+            片段列表：偶数位置为关键词之间的普通文本（可能为空），奇数位置为关键词原文（self.keywords的键）
+        """
+        return self._pattern.split(text)
+
+
+def _grammar_keywords():
+    for kind, keywords in GRAMMAR.items():
+        for keyword in keywords:
+            yield keyword, kind, None
+    for keyword, mode in TRANSPORT_KEYWORDS.items():
+        yield keyword, MODE, mode
+
+
+_scanner = KeywordScanner(_grammar_keywords())
+
+
+def _ascii_glued(parts: List[str], i: int) -> bool:
+    """英文关键词紧挨着英文字母或数字时是单词的一部分（Hilton中的hi）"""
+    if not parts[i].isascii():
+        return False
+    around = parts[i - 1][-1:] + parts[i + 1][:1]
+    return any(ch.isascii() and ch.isalnum() for ch in around)
+
+
+def _join_place(parts: List[str], kept: List[str], start: int, end: int, droppable: Tuple[int, ...]) -> str:
+    """
+    拼接kept[start:end]得到地点名称，去掉两端的多字填充词与唤醒词
+
+    droppable为_SPAN_DROP类词元在parts中的下标；kept中交通方式与标点已置空
+    """
+    if not droppable or droppable[-1] < start:  # 常见情况：填充词、唤醒词都在句式之前
+        return "".join(kept[start:end])
+    droppable = [i for i in droppable if start < i < end and len(parts[i]) > 1 and not _ascii_glued(parts, i)]
+    if not droppable:
+        return "".join(kept[start:end])
+    span = kept[start:end]
+    for order in (range(len(span)), range(len(span) - 1, -1, -1)):
+        for j in order:
+            if span[j] and start + j not in droppable:
+                break
+            span[j] = ""
+    return "".join(span)
+
+
+# 不含任何关键词的文本的解析结果
+_EMPTY_COMMAND = {
+    "structure": None,
+    "start_point": None,
+    "end_point": None,
+    "transport_mode": None,
+    "modes": (),
+    "wake_word": False,
+    "partial_wake_word": False,
+    "leading": "",
+    "markers": (),
+}
+
+
+def parse_command(text: str) -> Dict:
+    """
+    一次扫描解析导航指令
+
+    同一句指令会先后经过语音解析、意图打分和备用解析，解析结果按原文缓存，每句只扫描一次
+
+    Args:
+        text: 用户输入或语音识别文本
+
+    Returns:
+        字典，包含：
+        structure: "from_to"（从A到B）、"go_to"（去/到/导航到B）或None（未识别出导航句式）
+        start_point / end_point: 起点/终点名称，未识别时为None
+        transport_mode: 第一个出现的交通方式
+        modes: 出现的所有交通方式（元组）
+        wake_word / partial_wake_word: 是否包含完整/部分唤醒词
+        leading: 句式之前未识别的多余内容
+        markers: 出现的歧义词（元组）
+    """
+    return dict(_parse_command(text))
+
+
+@lru_cache(maxsize=256)
+def _parse_command(text: str) -> Dict:
+    parts = _scanner.split(text)
+    if len(parts) == 1:
+        return dict(_EMPTY_COMMAND)
+
+    # 以下位置均为关键词在parts中的下标
+    from_at = None
+    to_at = None    # "从"之后的第一个"到"
+    from_go = None  # "从"之后的第一个"去/回/前往"，没有"到"时作分隔
+    go_at = None
+    modes = ()
+    markers = ()
+    wake_word = False
+    partial_wake_word = False
+    droppable = ()  # 可从地点名称两端去掉的填充词、唤醒词
+    kept = None  # 地点片段中去掉交通方式、标点后的片段，没有需要去掉的词元时直接用parts
+    keywords = _scanner.keywords
+    for i in range(1, len(parts), 2):
+        kind, value = keywords[parts[i]]
+        if kind == MODE or kind == PUNCT:
+            if kind == MODE:
+                modes += (value,)
+            if kept is None:
+                kept = list(parts)
+            kept[i] = ""
+        elif kind == TO or kind == GO:
+            # 紧跟"从"的"到/去/回"是起点名称的首字（从到达口…、从回龙观…），不作分隔
+            if from_at is not None and i == from_at + 2 and not parts[i - 1]:
+                continue
+            if go_at is None:
+                go_at = i
+            if from_at is not None:
+                if kind == TO:
+                    if to_at is None:
+                        to_at = i
+                elif from_go is None:
+                    from_go = i
+        elif kind == FROM:
+            if from_at is None:
+                from_at = i
+        elif kind == MARKER:
+            markers += (parts[i],)
+        elif kind == WAKE:
+            wake_word = True
+        elif kind == WAKE_PARTIAL:
+            partial_wake_word = True
+        if kind in _SPAN_DROP:
+            droppable += (i,)
+    if kept is None:
+        kept = parts
+
+    if to_at is None:
+        to_at = from_go
+    if to_at is not None:
+        structure = "from_to"
+        head = from_at
+        start_point = _join_place(parts, kept, from_at + 1, to_at, droppable)
+        end_point = _join_place(parts, kept, to_at + 1, len(kept), droppable)
+    elif go_at is not None:
+        structure = "go_to"
+        head = go_at
+        start_point = None
+        end_point = _join_place(parts, kept, go_at + 1, len(kept), droppable)
+    else:
+        structure = head = start_point = end_point = None
+
+    leading = ""
+    if head is not None and (head > 1 or parts[0]):
+        leading = [parts[0]]
+        for i in range(1, head, 2):
+            if keywords[parts[i]][0] not in _LEADING_DROP:
+                leading.append(parts[i])
+            leading.append(parts[i + 1])
+        leading = "".join(leading)
+    return {
+        "structure": structure,
+        "start_point": start_point,
+        "end_point": end_point,
+        "transport_mode": modes[0] if modes else None,
+        "modes": modes,
+        "wake_word": wake_word,
+        "partial_wake_word": partial_wake_word,
+        "leading": leading,
+        "markers": markers,
+    }
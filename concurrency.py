@@ -0,0 +1,257 @@
+"""
+并发工具模块
+提供地点解析共享的线程池、带共享截止时间的并发执行工具以及主备请求竞速工具（含asyncio版本）
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# resolve: 编排解析链路（会等待其他任务）；request: 只执行单个接口请求（不等待其他任务）
+# 两类任务分池执行，避免嵌套等待占满同一线程池导致死锁
+_EXECUTOR_WORKERS_ENV = {
+    "resolve": ("RESOLVE_MAX_WORKERS", "8"),
+    "request": ("REQUEST_MAX_WORKERS", "16"),
+}
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(name: str = "resolve") -> ThreadPoolExecutor:
+    """
+    获取进程内共享的线程池
+
+    Args:
+        name: 线程池名称，resolve用于解析链路编排，request用于单个接口请求
+    """
+    with _executor_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            env_name, default = _EXECUTOR_WORKERS_ENV[name]
+            executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv(env_name, default)),
+                thread_name_prefix=name,
+            )
+            _executors[name] = executor
+        return executor
+
+
+def default_resolve_timeout() -> float:
+    """地点解析的默认共享截止时间（秒），由环境变量PLACE_RESOLVE_TIMEOUT配置"""
+    return float(os.getenv("PLACE_RESOLVE_TIMEOUT", "15"))
+
+
+def run_concurrently(calls: Sequence[Callable[[], T]], timeout: Optional[float] = None) -> List[Optional[T]]:
+    """
+    并发执行多个无参调用，所有调用共享同一个截止时间
+
+    Args:
+        calls: 待执行的调用列表
+        timeout: 共享截止时间（秒），None表示不限时
+
+    Returns:
+        与calls顺序一致的结果列表，超时或抛出异常的调用对应None
+    """
+    executor = get_executor()
+    started = time.monotonic()
+    futures = [executor.submit(call) for call in calls]
+    done, not_done = wait(futures, timeout=timeout)
+
+    results = []
+    for future in futures:
+        if future in not_done:
+            # 已在运行的调用无法中断，任其在后台完成（结果仍会写入地点缓存）
+            future.cancel()
+            logger.warning("并发调用超过截止时间 %.1fs，放弃等待", timeout)
+            results.append(None)
+            continue
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.error("并发调用出错: %s", e)
+            results.append(None)
+    logger.info("并发调用完成，耗时 %.3fs", time.monotonic() - started)
+    return results
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _bounded(seconds: float, deadline: Optional[float]) -> float:
+    remaining = _remaining(deadline)
+    return seconds if remaining is None else min(seconds, remaining)
+
+
+def _grace_window(grace: float, started: float, budget: Optional[float]) -> float:
+    if budget is None:
+        return grace
+    return max(grace, started + budget - time.monotonic())
+
+
+def _result_or_none(future: Future):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("竞速调用出错: %s", e)
+        return None
+
+
+def race_preferred(primary: Callable[[], Optional[T]], fallback: Callable[[], Optional[T]],
+                   grace: float = 0.15, hedge_delay: float = 0.0,
+                   timeout: Optional[float] = None, budget: Optional[float] = None) -> Optional[T]:
+    """
+    主备请求竞速：优先采用primary的结果，fallback作为对冲请求
+
+    - hedge_delay为0时两者同时发起；否则先发起primary，hedge_delay秒内未返回结果再发起fallback
+    - primary返回有效结果即采用，fallback结果被忽略
+    - fallback先返回有效结果时，再等待primary至多grace秒，期间primary有结果则仍优先采用
+    - 给出budget时，fallback先返回后primary至少可以等到发起后budget秒；
+      budget到期时两者都没有结果则继续等待先返回的有效结果（受timeout限制）
+
+    Args:
+        primary: 首选调用，返回None表示未命中
+        fallback: 备选调用，返回None表示未命中
+        grace: fallback先返回时等待primary的宽限时间（秒）
+        hedge_delay: 发起fallback前等待primary的时间（秒）
+        timeout: 总截止时间（秒），None表示不限时
+        budget: 自发起起计算的等待primary的时间预算（秒）
+
+    Returns:
+        选中的结果，两者均未命中或超时返回None
+    """
+    executor = get_executor("request")
+    started = time.monotonic()
+    deadline = None if timeout is None else started + timeout
+    primary_future = executor.submit(primary)
+
+    if hedge_delay > 0:
+        wait([primary_future], timeout=_bounded(hedge_delay, deadline))
+        if primary_future.done():
+            result = _result_or_none(primary_future)
+            if result is not None:
+                return result
+            # 首选已明确未命中，直接执行备选
+            fallback_future = executor.submit(fallback)
+            wait([fallback_future], timeout=_remaining(deadline))
+            return _result_or_none(fallback_future) if fallback_future.done() else None
+        logger.debug("首选请求 %.2fs 内未返回，发起对冲请求", hedge_delay)
+
+    fallback_future = executor.submit(fallback)
+    pending = {primary_future, fallback_future}
+    while pending:
+        done, pending = wait(pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        if not done:
+            logger.warning("竞速调用超过截止时间 %.1fs", timeout)
+            break
+        if primary_future in done:
+            result = _result_or_none(primary_future)
+            if result is not None:
+                fallback_future.cancel()
+                return result
+        if fallback_future in done:
+            fallback_result = _result_or_none(fallback_future)
+            if fallback_result is None:
+                continue
+            if primary_future in pending:
+                wait([primary_future], timeout=_bounded(_grace_window(grace, started, budget), deadline))
+                if primary_future.done():
+                    result = _result_or_none(primary_future)
+                    if result is not None:
+                        return result
+            return fallback_result
+    return None
+
+
+async def gather_with_deadline(awaitables: Sequence[Awaitable[T]], timeout: Optional[float] = None) -> List[Optional[T]]:
+    """
+    run_concurrently的asyncio版本：并发等待多个协程，共享同一截止时间
+
+    Returns:
+        与awaitables顺序一致的结果列表，超时（已被取消）或抛出异常的协程对应None
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+        logger.warning("并发协程超过截止时间 %.1fs，已取消", timeout)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(None)
+        elif task.exception() is not None:
+            logger.error("并发协程出错: %s", task.exception())
+            results.append(None)
+        else:
+            results.append(task.result())
+    return results
+
+
+async def _awaited_or_none(awaitable: Awaitable[Optional[T]]) -> Optional[T]:
+    try:
+        return await awaitable
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error("竞速协程出错: %s", e)
+        return None
+
+
+async def race_preferred_async(primary: Callable[[], Awaitable[Optional[T]]],
+                               fallback: Callable[[], Awaitable[Optional[T]]],
+                               grace: float = 0.15, hedge_delay: float = 0.0,
+                               timeout: Optional[float] = None, budget: Optional[float] = None) -> Optional[T]:
+    """
+    race_preferred的asyncio版本，语义相同；落选的协程会被取消
+    """
+    started = time.monotonic()
+
+    async def race():
+        primary_task = asyncio.ensure_future(_awaited_or_none(primary()))
+        fallback_task = None
+        try:
+            if hedge_delay > 0:
+                done, _ = await asyncio.wait([primary_task], timeout=hedge_delay)
+                if done:
+                    result = primary_task.result()
+                    if result is not None:
+                        return result
+                    # 首选已明确未命中，直接执行备选
+                    return await _awaited_or_none(fallback())
+                logger.debug("首选请求 %.2fs 内未返回，发起对冲请求", hedge_delay)
+
+            fallback_task = asyncio.ensure_future(_awaited_or_none(fallback()))
+            pending = {primary_task, fallback_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary_task in done and primary_task.result() is not None:
+                    return primary_task.result()
+                if fallback_task in done:
+                    fallback_result = fallback_task.result()
+                    if fallback_result is None:
+                        continue
+                    if primary_task in pending:
+                        done, _ = await asyncio.wait([primary_task], timeout=_grace_window(grace, started, budget))
+                        if done and primary_task.result() is not None:
+                            return primary_task.result()
+                    return fallback_result
+            return None
+        finally:
+            for task in (primary_task, fallback_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    try:
+        return await asyncio.wait_for(race(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("竞速协程超过截止时间 %.1fs", timeout)
+        return None
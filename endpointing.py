@@ -0,0 +1,146 @@
+"""
+语音端点检测模块
+逐帧（20ms）判断语音/静音：开口与结束使用不同的能量门限（滞回），句尾所需的静音时长随本句中
+观察到的句内停顿自适应调整；前导与尾部静音只保留少量余量，其余不上传
+"""
+import collections
+import os
+
+import numpy as np
+
+FRAME_MS = 20
+# 开口需高出背景噪声的倍数，说话中低于该倍数才算静音（滞回，避免在音节之间抖动）
+ONSET_RATIO = 3.0
+OFFSET_RATIO = 2.0
+MIN_SPEECH_RMS = 200.0
+# 连续多少帧语音才算开口，过滤按键声等短促噪声
+ONSET_FRAMES = 3
+# 句尾静音时长 = 本句最长句内停顿 × 该系数，再限制在[end_silence, max_end_silence]之间
+PAUSE_FACTOR = 1.5
+
+
+class Endpointer:
+    """
+    一句话的端点检测与静音裁剪
+
+    feed()接收连续的PCM块，返回可以上传的音频：开口前只保留lead_pad秒，
+    句内停顿在语音恢复后补上，句尾静音只保留trail_pad秒
+    """
+
+    def __init__(self, sample_rate: int = 16000, noise_floor: float = None, end_silence: float = 0.5,
+                 max_end_silence: float = 1.0, lead_pad: float = 0.2, trail_pad: float = 0.15):
+        self.frame_bytes = sample_rate * FRAME_MS // 1000 * 2
+        self.bytes_per_second = sample_rate * 2
+        self.noise_floor = noise_floor
+        self.end_silence = int(end_silence * self.bytes_per_second)
+        self.max_end_silence = int(max(max_end_silence, end_silence) * self.bytes_per_second)
+        self.lead_bytes = int(lead_pad * self.bytes_per_second) // self.frame_bytes * self.frame_bytes
+        self.trail_bytes = int(trail_pad * self.bytes_per_second) // self.frame_bytes * self.frame_bytes
+
+        self.started = False
+        self.ended = False
+        self.position = 0           # 已处理的字节数
+        self.onset = None           # 开口位置
+        self.speech_end = None      # 最后一个语音帧的结束位置
+        self.uploaded_bytes = 0
+        self.longest_pause = 0
+        self._partial = b""
+        self._lead = collections.deque()  # 开口前的帧
+        self._candidate = []        # 疑似开口的连续语音帧
+        self._pending = bytearray() # 最后一个语音帧之后的静音
+
+    def required_silence(self) -> int:
+        """当前判定句尾所需的静音字节数"""
+        adaptive = int(self.longest_pause * PAUSE_FACTOR)
+        return min(max(self.end_silence, adaptive), self.max_end_silence)
+
+    def _is_speech(self, level: float) -> bool:
+        floor = self.noise_floor if self.noise_floor is not None else level
+        ratio = OFFSET_RATIO if self.started else ONSET_RATIO
+        speech = level > max(floor * ratio, MIN_SPEECH_RMS)
+        if not speech:
+            # 静音帧持续更新本句的背景噪声估计
+            self.noise_floor = floor + (level - floor) * (0.1 if level < floor else 0.01)
+        return speech
+
+    def feed(self, chunk: bytes) -> bytearray:
+        """
+        处理一块PCM，返回可以上传的音频
+
+        整块的帧能量一次算出；帧以memoryview切片传递，只在写入返回的缓冲区时复制
+        """
+        data = self._partial + chunk if self._partial else chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial = bytes(data[usable:])
+        out = bytearray()
+        if not usable:
+            return out
+        samples = np.frombuffer(data, dtype=np.int16, count=usable // 2).reshape(-1, self.frame_bytes // 2)
+        samples = samples.astype(np.float32)
+        levels = np.sqrt(np.einsum("ij,ij->i", samples, samples) / samples.shape[1]).tolist()
+        view = memoryview(data)
+        for index, level in enumerate(levels):
+            if self.ended:
+                break
+            offset = index * self.frame_bytes
+            frame = view[offset:offset + self.frame_bytes]
+            self.position += self.frame_bytes
+            if self._is_speech(level):
+                self._on_speech(frame, out)
+            else:
+                self._on_silence(frame)
+        self.uploaded_bytes += len(out)
+        return out
+
+    def _on_speech(self, frame: memoryview, out: bytearray):
+        if not self.started:
+            self._candidate.append(frame)
+            if len(self._candidate) < ONSET_FRAMES:
+                return
+            self.started = True
+            self.onset = self.position - len(self._candidate) * self.frame_bytes
+            for lead in self._lead:
+                out.extend(lead)
+            for candidate in self._candidate:
+                out.extend(candidate)
+            self._lead.clear()
+            self._candidate = []
+        else:
+            if self._pending:
+                # 句内停顿，语音恢复后补上
+                self.longest_pause = max(self.longest_pause, len(self._pending))
+                out.extend(self._pending)
+                self._pending.clear()
+            out.extend(frame)
+        self.speech_end = self.position
+
+    def _on_silence(self, frame: memoryview):
+        if not self.started:
+            # 未满足开口条件的短促声音并入开口前的帧
+            for candidate in self._candidate:
+                self._lead.append(candidate)
+            self._candidate = []
+            self._lead.append(frame)
+            while len(self._lead) * self.frame_bytes > self.lead_bytes:
+                self._lead.popleft()
+            return
+        self._pending.extend(frame)
+        if len(self._pending) >= self.required_silence():
+            self.ended = True
+
+    def finish(self) -> bytes:
+        """
+        结束本句（检测到句尾或被强制结束时调用），返回句尾保留的静音
+        """
+        self.ended = True
+        if not self.started:
+            return b""
+        tail = bytes(self._pending[:self.trail_bytes])
+        self._pending.clear()
+        self.uploaded_bytes += len(tail)
+        return tail
+
+
+def endpoint_settings() -> dict:
+    """读取环境变量VOICE_END_SILENCE_MS（句尾静音的最短时长）"""
+    return {"end_silence": float(os.getenv("VOICE_END_SILENCE_MS", "500")) / 1000}
@@ -1,143 +1,220 @@
 """
 GPS定位服务模块
 提供设备GPS位置获取功能
+
+位置信息源在专用的Qt线程中常驻并持续接收位置更新，保存最近一次定位（时间戳与精度）；
+读取时由调用方给出可接受的定位时效，足够新的定位立即返回，否则在限定时间内等待下一次更新
 """
 import logging
+import os
+import threading
+import time
 from typing import Optional, Dict, Tuple
 import platform
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 致命错误（无权限、信息源关闭）后不再等待定位
+_FATAL_ERRORS = ("AccessError", "ClosedError")
+
 
 class GPSService:
     """GPS定位服务类"""
 
-    def __init__(self):
+    def __init__(self, update_interval_ms: int = None, max_age: float = None, wait_timeout: float = None):
         self.system = platform.system()
-        self.last_position = None
+        settings = gps_settings()
+        self.update_interval_ms = update_interval_ms or settings["update_interval_ms"]
+        # 默认可接受的定位时效与等待新定位的最长时间（秒）
+        self.max_age = max_age if max_age is not None else settings["max_age"]
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings["wait_timeout"]
+        self.last_fix = None  # 最近一次定位：lng、lat、accuracy（米，未知为None）、timestamp（Unix秒）
+        self.available = None  # None表示尚未启动订阅
+        self._condition = threading.Condition()
+        self._thread = None
+        self._source = None
+        self._accuracy_attr = None
         logger.info(f"GPS服务初始化，系统: {self.system}")
 
-    def check_gps_available(self) -> bool:
+    @property
+    def last_position(self) -> Optional[Tuple[float, float]]:
+        fix = self.last_fix
+        return (fix["lng"], fix["lat"]) if fix else None
+
+    def start(self, timeout: float = 2.0) -> bool:
         """
-        检查GPS是否可用
+        启动常驻的位置订阅（重复调用无副作用）
+
+        需要已创建QCoreApplication/QApplication；位置信息源在专用线程中创建并持续更新
 
         Returns:
-            bool: GPS是否可用
+            bool: 位置信息源是否可用
         """
+        with self._condition:
+            if self._thread is not None:
+                return bool(self.available)
+            try:
+                from PySide6.QtCore import QCoreApplication, Qt, QThread
+            except ImportError:
+                logger.warning("PySide6.QtPositioning模块不可用，GPS功能受限")
+                self.available = False
+                return False
+            if QCoreApplication.instance() is None:
+                logger.warning("未创建Qt应用，无法订阅GPS位置")
+                self.available = False
+                return False
+            self._thread = QThread()
+            self._thread.setObjectName("gps")
+        created = threading.Event()
+
+        def run():
+            # 在GPS线程中执行，信息源及其信号都属于该线程
+            try:
+                self._create_source()
+            finally:
+                created.set()
+
+        # 槽函数不是QObject的方法，显式直接连接才会在发出信号的GPS线程中执行
+        self._thread.started.connect(run, Qt.ConnectionType.DirectConnection)
+        self._thread.start()
+        created.wait(timeout)
+        return bool(self.available)
+
+    def _create_source(self):
         try:
-            # 尝试导入QtPositioning模块
-            from PySide6.QtPositioning import QGeoPositionInfoSource
-
-            # 创建位置信息源
+            from PySide6.QtCore import Qt
+            from PySide6.QtPositioning import QGeoPositionInfo, QGeoPositionInfoSource
             source = QGeoPositionInfoSource.createDefaultSource(None)
+        except ImportError:
+            logger.warning("PySide6.QtPositioning模块不可用，GPS功能受限")
+            source = None
+        except Exception as e:
+            logger.error(f"创建GPS位置信息源时出错: {e}")
+            source = None
+        if source is None or source.error() != QGeoPositionInfoSource.Error.NoError:
+            logger.warning("无法创建GPS位置信息源")
+            with self._condition:
+                self.available = False
+                self._condition.notify_all()
+            return
+        self._accuracy_attr = QGeoPositionInfo.Attribute.HorizontalAccuracy
+        source.setUpdateInterval(self.update_interval_ms)
+        source.positionUpdated.connect(self._on_position_updated, Qt.ConnectionType.DirectConnection)
+        source.errorOccurred.connect(self._on_error, Qt.ConnectionType.DirectConnection)
+        self._thread.finished.connect(source.stopUpdates)
+        source.startUpdates()
+        self._source = source
+        with self._condition:
+            self.available = True
+        logger.info(f"GPS位置订阅已启动，更新间隔 {self.update_interval_ms} ms")
+
+    def _on_position_updated(self, position):
+        if not position.isValid():
+            return
+        coord = position.coordinate()
+        if not coord.isValid():
+            return
+        accuracy_attr = self._accuracy_attr
+        stamp = position.timestamp()
+        fix = {
+            "lng": coord.longitude(),
+            "lat": coord.latitude(),
+            "accuracy": position.attribute(accuracy_attr) if position.hasAttribute(accuracy_attr) else None,
+            "timestamp": stamp.toMSecsSinceEpoch() / 1000 if stamp.isValid() else time.time(),
+        }
+        with self._condition:
+            self.last_fix = fix
+            self._condition.notify_all()
+        logger.debug(f"GPS位置更新: {fix}")
+
+    def _on_error(self, error):
+        logger.error(f"GPS定位错误: {error}")
+        if getattr(error, "name", str(error)).split(".")[-1] in _FATAL_ERRORS:
+            with self._condition:
+                self.available = False
+                self._condition.notify_all()
+
+    def stop(self):
+        """停止位置订阅"""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self.available = None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.quit()
+            thread.wait(2000)
+        self._source = None
 
-            if source is None:
-                logger.warning("无法创建GPS位置信息源")
-                return False
+    def check_gps_available(self) -> bool:
+        """
+        检查GPS是否可用（未启动订阅时启动）
 
-            # 检查是否有可用的定位方法
-            available = source.error() == QGeoPositionInfoSource.Error.NoError
+        Returns:
+            bool: GPS是否可用
+        """
+        try:
+            available = self.start()
             logger.info(f"GPS可用性检查结果: {available}")
             return available
-
-        except ImportError:
-            logger.warning("PySide6.QtPositioning模块不可用，GPS功能受限")
-            return False
         except Exception as e:
             logger.error(f"检查GPS可用性时出错: {e}")
             return False
 
-    def get_current_gps_location(self) -> Optional[Tuple[float, float]]:
-        """
-        获取当前GPS位置（经纬度）
+    def _fresh_fix(self, max_age: float) -> Optional[Dict]:
+        fix = self.last_fix
+        if fix and time.time() - fix["timestamp"] <= max_age:
+            return fix
+        return None
 
-        Returns:
-            Optional[Tuple[float, float]]: (经度, 纬度) 或 None
+    def get_fix(self, max_age: float = None, timeout: float = None) -> Optional[Dict]:
         """
-        try:
-            from PySide6.QtPositioning import QGeoPositionInfoSource
-            from PySide6.QtCore import QEventLoop, QTimer
+        获取不超过max_age秒的定位
 
-            # 创建位置信息源
-            source = QGeoPositionInfoSource.createDefaultSource(None)
+        已有足够新的定位时立即返回；否则最多等待timeout秒的下一次位置更新，GPS不可用时不等待
 
-            if source is None:
-                logger.warning("无法创建GPS位置信息源")
-                return None
-
-            # 设置更新间隔
-            source.setUpdateInterval(5000)  # 5秒
-
-            # 用于存储位置信息的容器
-            position_data = {'position': None, 'received': False}
-
-            def on_position_updated(position):
-                """位置更新回调"""
-                if position.isValid():
-                    coord = position.coordinate()
-                    if coord.isValid():
-                        position_data['position'] = (coord.longitude(), coord.latitude())
-                        position_data['received'] = True
-                        logger.info(f"GPS位置获取成功: {coord.longitude()}, {coord.latitude()}")
-
-            def on_error(error):
-                """错误回调"""
-                logger.error(f"GPS定位错误: {error}")
-                position_data['received'] = True  # 标记为已完成，即使是错误
-
-            # 连接信号
-            source.positionUpdated.connect(on_position_updated)
-            source.errorOccurred.connect(on_error)
-
-            # 请求单次更新
-            source.requestUpdate(10000)  # 10秒超时
-
-            # 等待位置更新或超时
-            loop = QEventLoop()
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.timeout.connect(loop.quit)
-            timer.start(10000)  # 10秒超时
-
-            # 当收到位置或发生错误时退出循环
-            def check_and_quit():
-                if position_data['received']:
-                    loop.quit()
-
-            timer2 = QTimer()
-            timer2.timeout.connect(check_and_quit)
-            timer2.start(100)  # 每100ms检查一次
-
-            loop.exec()
-            timer.stop()
-            timer2.stop()
-
-            if position_data['position']:
-                self.last_position = position_data['position']
-                return position_data['position']
-            else:
-                logger.warning("GPS定位超时或失败")
-                return None
+        Returns:
+            Optional[Dict]: 定位（lng、lat、accuracy、timestamp）或 None
+        """
+        max_age = self.max_age if max_age is None else max_age
+        timeout = self.wait_timeout if timeout is None else timeout
+        if self.available is None:
+            self.start()
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                fix = self._fresh_fix(max_age)
+                if fix or not self.available:
+                    return fix
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # timeout<=0是不等待的查询（每次生成导航链接都会检查），未命中属于正常情况
+                    log = logger.debug if timeout <= 0 else logger.warning
+                    log(f"{timeout:g} 秒内未获得 {max_age:g} 秒内的GPS定位")
+                    return None
+                self._condition.wait(remaining)
+
+    def get_current_gps_location(self, max_age: float = None, timeout: float = None) -> Optional[Tuple[float, float]]:
+        """
+        获取当前GPS位置（经纬度），时效与等待时间同get_fix
 
-        except ImportError:
-            logger.warning("PySide6.QtPositioning模块不可用")
-            return None
-        except Exception as e:
-            logger.error(f"获取GPS位置时出错: {e}")
-            return None
+        Returns:
+            Optional[Tuple[float, float]]: (经度, 纬度) 或 None
+        """
+        fix = self.get_fix(max_age, timeout)
+        return (fix["lng"], fix["lat"]) if fix else None
 
-    def get_location_info(self) -> Optional[Dict]:
+    def get_location_info(self, max_age: float = None, timeout: float = None) -> Optional[Dict]:
         """
         获取当前位置信息，返回标准格式
 
         Returns:
             Optional[Dict]: 位置信息字典，与地图服务格式兼容
         """
-        coords = self.get_current_gps_location()
+        fix = self.get_fix(max_age, timeout)
 
-        if coords:
-            lng, lat = coords
+        if fix:
+            lng, lat = fix["lng"], fix["lat"]
             return {
                 'id': '',
                 'name': '我的位置',
@@ -148,13 +225,16 @@ class GPSService:
                 'address': 'GPS定位',
                 'citycode': '',
                 'cityname': '',
-                'district': ''
+                'district': '',
+                'accuracy': fix["accuracy"],
+                'timestamp': fix["timestamp"],
+                'source': 'gps',
             }
         return None
 
     def get_last_known_position(self) -> Optional[Tuple[float, float]]:
         """
-        获取上次已知的位置
+        获取上次已知的位置（不论时效）
 
         Returns:
             Optional[Tuple[float, float]]: (经度, 纬度) 或 None
@@ -162,19 +242,70 @@ class GPSService:
         return self.last_position
 
 
+def gps_settings() -> Dict:
+    """
+    读取环境变量GPS_MAX_AGE（可接受的定位时效，秒）、GPS_WAIT_TIMEOUT（没有足够新的定位时最多等待的秒数）、
+    GPS_UPDATE_INTERVAL_MS（位置订阅的更新间隔）
+    """
+    return {
+        "max_age": float(os.getenv("GPS_MAX_AGE", "60")),
+        "wait_timeout": float(os.getenv("GPS_WAIT_TIMEOUT", "3")),
+        "update_interval_ms": int(os.getenv("GPS_UPDATE_INTERVAL_MS", "5000")),
+    }
+
+
+_gps_service = None
+_gps_service_lock = threading.Lock()
+
+
+def get_gps_service() -> GPSService:
+    """获取进程内共享的GPS服务（常驻位置订阅）"""
+    global _gps_service
+    with _gps_service_lock:
+        if _gps_service is None:
+            _gps_service = GPSService()
+        return _gps_service
+
+
+def get_gps_location_info(max_age: float = None, timeout: float = None) -> Optional[Dict]:
+    """
+    从共享的位置订阅读取当前位置信息
+
+    Args:
+        max_age: 可接受的定位时效（秒），默认读取GPS_MAX_AGE
+        timeout: 没有足够新的定位时最多等待的秒数，默认读取GPS_WAIT_TIMEOUT
+
+    Returns:
+        Optional[Dict]: 与地图服务格式兼容的位置信息，GPS不可用或定位失败时返回None
+    """
+    try:
+        gps_location = get_gps_service().get_location_info(max_age, timeout)
+        if gps_location:
+            logger.info("成功获取GPS位置")
+            return gps_location
+        log = logger.debug if timeout is not None and timeout <= 0 else logger.warning
+        log("GPS不可用或定位失败，回退到IP定位")
+    except Exception as e:
+        logger.warning(f"GPS定位异常: {e}，回退到IP定位")
+    return None
+
+
 if __name__ == "__main__":
     # 测试GPS服务
-    gps = GPSService()
+    from PySide6.QtCore import QCoreApplication
+    app = QCoreApplication([])
+    gps = get_gps_service()
 
     print("检查GPS可用性...")
     if gps.check_gps_available():
         print("✅ GPS可用")
 
         print("\n获取GPS位置...")
-        location = gps.get_current_gps_location()
+        location = gps.get_current_gps_location(timeout=10)
         if location:
             print(f"✅ GPS位置: 经度={location[0]}, 纬度={location[1]}")
         else:
             print("❌ 无法获取GPS位置")
     else:
         print("❌ GPS不可用，请检查设备设置")
+    gps.stop()
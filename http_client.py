@@ -0,0 +1,169 @@
+"""
+HTTP客户端模块
+提供进程内共享的连接池HTTP会话（keep-alive、超时、可选DNS缓存与TLS预热），
+以及供asyncio代码使用的异步HTTP客户端
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+from typing import Iterable, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# 地图服务接口地址，用于启动时预热连接
+PROVIDER_ENDPOINTS = (
+    "https://restapi.amap.com",
+    "https://api.map.baidu.com",
+)
+
+
+class HttpClient:
+    """带连接池的HTTP客户端，所有地图服务共享同一实例以复用TCP/TLS连接"""
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, retries: int = 1):
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=0.1,
+                      allowed_methods=frozenset(["GET", "HEAD", "POST"]))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # 共享实例会被多个服务对象预热，同一进程只需预热一次
+        self._warmed = False
+        self._warm_up_lock = threading.Lock()
+        logger.info("HTTP客户端初始化: 连接池=%s, 超时=%s", pool_size, self.timeout)
+
+    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, params=params, **kwargs)
+
+    def post(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(url, params=params, **kwargs)
+
+    def warm_up(self, urls: Iterable[str] = PROVIDER_ENDPOINTS, background: bool = True):
+        """
+        预热连接：提前完成DNS解析与TCP/TLS握手，连接保留在连接池中；每个客户端只预热一次
+
+        Args:
+            urls: 需要预热的地址
+            background: 是否在后台线程执行
+        """
+        def run():
+            for url in urls:
+                try:
+                    self.session.head(url, timeout=self.timeout, allow_redirects=False)
+                    logger.info("连接预热完成: %s", url)
+                except requests.RequestException as e:
+                    logger.warning("连接预热失败: %s, %s", url, e)
+
+        with self._warm_up_lock:
+            if self._warmed:
+                return
+            self._warmed = True
+        if background:
+            threading.Thread(target=run, name="http-warm-up", daemon=True).start()
+        else:
+            run()
+
+    def close(self):
+        self.session.close()
+
+
+_dns_cache = {}
+_dns_cache_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def enable_dns_cache(ttl: float = 300):
+    """
+    启用进程内DNS缓存，相同主机在TTL内不再重复解析
+
+    Args:
+        ttl: 缓存有效期（秒）
+    """
+    def cached_getaddrinfo(host, port, *args, **kwargs):
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _dns_cache_lock:
+            entry = _dns_cache.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        result = _original_getaddrinfo(host, port, *args, **kwargs)
+        with _dns_cache_lock:
+            _dns_cache[key] = (now + ttl, result)
+        return result
+
+    socket.getaddrinfo = cached_getaddrinfo
+    logger.info("DNS缓存已启用，TTL=%ss", ttl)
+
+
+def _http_settings() -> dict:
+    return {
+        "pool_size": int(os.getenv("HTTP_POOL_SIZE", "10")),
+        "connect_timeout": float(os.getenv("HTTP_CONNECT_TIMEOUT", "3")),
+        "read_timeout": float(os.getenv("HTTP_READ_TIMEOUT", "10")),
+        "retries": int(os.getenv("HTTP_RETRIES", "1")),
+    }
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    获取进程内共享的HTTP客户端，配置读取自环境变量：
+    HTTP_POOL_SIZE、HTTP_CONNECT_TIMEOUT、HTTP_READ_TIMEOUT、HTTP_RETRIES、HTTP_DNS_CACHE_TTL
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            dns_ttl = float(os.getenv("HTTP_DNS_CACHE_TTL", "0"))
+            if dns_ttl > 0:
+                enable_dns_cache(dns_ttl)
+            _http_client = HttpClient(**_http_settings())
+        return _http_client
+
+
+# 异步客户端绑定到创建它的事件循环，每个事件循环各持有一个
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    获取当前事件循环共享的异步HTTP客户端（连接池、keep-alive与超时配置同get_http_client）
+
+    必须在运行中的事件循环内调用
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        settings = _http_settings()
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=settings["pool_size"],
+                                max_keepalive_connections=settings["pool_size"]),
+            timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+            transport=httpx.AsyncHTTPTransport(retries=settings["retries"]),
+        )
+        _async_clients[loop] = client
+        logger.info("异步HTTP客户端初始化: 连接池=%s", settings["pool_size"])
+    return client
+
+
+async def aclose_async_http_client():
+    """关闭当前事件循环的异步HTTP客户端"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
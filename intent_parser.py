@@ -0,0 +1,165 @@
+"""
+导航意图本地解析模块
+在调用Claude CLI之前先用本地规则解析导航指令并给出置信度，
+结构明确的指令直接交给NavigationService处理，只有不明确的指令才升级到大模型
+"""
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from command_grammar import parse_command
+
+logger = logging.getLogger(__name__)
+
+# 地点名称的合理长度上限（字符）
+_MAX_PLACE_LENGTH = 20
+
+
+def local_parse_threshold() -> float:
+    """本地解析直接执行所需的最低置信度，读取环境变量NAV_LOCAL_PARSE_THRESHOLD"""
+    return float(os.getenv("NAV_LOCAL_PARSE_THRESHOLD", "0.8"))
+
+
+def parse_intent(text: str) -> Dict:
+    """
+    用本地规则解析导航指令
+
+    Args:
+        text: 用户输入或语音识别文本
+
+    Returns:
+        包含start_point、end_point、transport_mode、confidence（0~1）及reasons（扣分原因）的字典；
+        未识别出终点时confidence为0
+    """
+    intent = {
+        "start_point": "",
+        "end_point": None,
+        "transport_mode": None,
+        "confidence": 0.0,
+        "reasons": [],
+    }
+    if not text:
+        return intent
+
+    command = parse_command(text)
+    if command["structure"] is None:
+        intent["reasons"].append("未匹配到导航句式")
+        return intent
+
+    intent["start_point"] = command["start_point"] or ""
+    intent["end_point"] = command["end_point"]
+    intent["transport_mode"] = command["transport_mode"]
+    confidence = 0.95 if command["structure"] == "from_to" else 0.9
+    if command["leading"]:
+        # 句式前面还有未识别的内容，例如"明天上午去某地"
+        confidence -= 0.2
+        intent["reasons"].append(f"句式前有多余内容: {command['leading']}")
+
+    confidence -= _penalties(intent, command)
+    intent["confidence"] = round(max(confidence, 0.0), 2)
+    return intent
+
+
+def _penalties(intent: Dict, command: Dict) -> float:
+    reasons = intent["reasons"]
+    penalty = 0.0
+
+    if len(set(command["modes"])) > 1:
+        penalty += 0.3
+        reasons.append("包含多种交通方式")
+
+    if command["markers"]:
+        penalty += 0.5
+        reasons.append(f"包含疑问/否定/途经词: {'、'.join(command['markers'])}")
+
+    for place in (intent["start_point"], intent["end_point"]):
+        if not place:
+            continue
+        if len(place) > _MAX_PLACE_LENGTH:
+            penalty += 0.3
+            reasons.append(f"地点名称过长: {place}")
+        if "到" in place or "去" in place or "从" in place:
+            penalty += 0.3
+            reasons.append(f"地点中仍含有句式关键词: {place}")
+
+    if not intent["end_point"]:
+        penalty += 1.0
+        reasons.append("终点为空")
+    elif intent["start_point"] and intent["start_point"] == intent["end_point"]:
+        penalty += 0.5
+        reasons.append("起点与终点相同")
+    return penalty
+
+
+def is_confident(intent: Dict, threshold: float = None) -> bool:
+    """本地解析结果是否足够明确，可以不经大模型直接导航"""
+    if threshold is None:
+        threshold = local_parse_threshold()
+    return bool(intent.get("end_point")) and intent.get("confidence", 0.0) >= threshold
+
+
+# 缓存意图时保留的navigate工具参数
+INTENT_FIELDS = ("start_point", "end_point", "start_city", "end_city", "transport_mode", "provider")
+
+
+def is_navigate_tool(name: str) -> bool:
+    """工具名是否为导航MCP服务的navigate工具（CLI中的名称带有mcp__<服务名>__前缀）"""
+    return str(name).split("__")[-1] == "navigate"
+
+
+def navigate_called(output: str) -> bool:
+    """stream-json输出中是否已出现navigate工具调用（不论是否执行完成）"""
+    for line in output.splitlines():
+        if '"tool_use"' not in line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(event, dict) or event.get("type") != "assistant":
+            continue
+        for block in (event.get("message") or {}).get("content") or []:
+            if isinstance(block, dict) and block.get("type") == "tool_use" and is_navigate_tool(block.get("name", "")):
+                return True
+    return False
+
+
+def parse_claude_stream(output: str) -> Tuple[str, Optional[Dict]]:
+    """
+    解析Claude CLI的stream-json输出
+
+    Args:
+        output: `claude --print --output-format stream-json --verbose`的标准输出，每行一个JSON事件
+
+    Returns:
+        (最终回复文本, 成功执行的navigate工具参数)；未调用navigate工具或调用失败时参数为None
+    """
+    response = ""
+    calls = {}
+    intent = None
+    for line in output.splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(event, dict):
+            continue
+        event_type = event.get("type")
+        if event_type == "result":
+            response = event.get("result") or response
+            continue
+        if event_type not in ("assistant", "user"):
+            continue
+        for block in (event.get("message") or {}).get("content") or []:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "tool_use" and is_navigate_tool(block.get("name", "")):
+                calls[block.get("id")] = block.get("input") or {}
+            elif block.get("type") == "tool_result" and block.get("tool_use_id") in calls:
+                content = block.get("content")
+                text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+                if not block.get("is_error") and "失败" not in text:
+                    tool_input = calls[block["tool_use_id"]]
+                    intent = {field: tool_input.get(field) for field in INTENT_FIELDS}
+    return response, intent
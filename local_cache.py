@@ -0,0 +1,325 @@
+"""
+本地持久化缓存模块
+基于SQLite(WAL)实现跨进程共享的TTL + LRU缓存，用于缓存地点解析结果和大模型解析出的导航意图
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".renyimen", "cache.sqlite3")
+
+
+class PersistentLRUCache:
+    """基于SQLite的持久化缓存，支持逐条TTL、LRU容量上限和显式失效"""
+
+    # 命中时最近访问时间距今超过该秒数才回写，LRU按此粒度近似
+    TOUCH_INTERVAL = 300
+    # 每写入这么多条至少核对一次条目数（其他进程也会写入同一张表）
+    EVICT_INTERVAL = 100
+
+    def __init__(self, path: str, table: str, ttl: float, max_entries: int):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._count = None    # 最近一次核对时的条目数
+        self._pending = 0     # 此后写入的条数（覆盖写入也计入，只会让核对提前）
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 多线程共享同一连接，由锁保证串行访问；多进程通过WAL并发读写
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)")
+        logger.info("本地缓存初始化: %s (表: %s, TTL: %ss, 容量: %s)", path, table, ttl, max_entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存，过期条目视为未命中并被删除
+
+        Returns:
+            缓存的值，未命中返回None
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, expires_at, last_access FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, expires_at, last_access = row
+                if expires_at <= now:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    return None
+                if now - last_access > self.TOUCH_INTERVAL:
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key)
+                    )
+            return json.loads(value)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("读取缓存失败: %s", e)
+            return None
+
+    def set(self, key: str, value: Any, ttl: float = None):
+        """
+        写入缓存，超过容量上限时淘汰最久未使用的条目
+
+        条目数在内存中累计，估计超出上限或每写入EVICT_INTERVAL条时才查询实际条目数并淘汰
+
+        Args:
+            key: 缓存键
+            value: 可JSON序列化的值
+            ttl: 有效期（秒），默认使用实例TTL
+        """
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now)
+                )
+                self._pending += 1
+                if (self._count is None or self._count + self._pending > self.max_entries
+                        or self._pending >= self.EVICT_INTERVAL):
+                    self._evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning("写入缓存失败: %s", e)
+
+    def _evict(self):
+        """核对实际条目数并淘汰超出上限的最久未使用条目，调用方需持有锁"""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            count = self.max_entries
+        self._count = count
+        self._pending = 0
+
+    def invalidate(self, key: str):
+        """删除指定缓存条目"""
+        try:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("删除缓存失败: %s", e)
+
+    def invalidate_prefix(self, prefix: str):
+        """删除所有以指定前缀开头的缓存条目"""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+                )
+        except sqlite3.Error as e:
+            logger.warning("删除缓存失败: %s", e)
+
+    def recent_keys(self, prefix: str, limit: int = 10) -> List[str]:
+        """以指定前缀开头、未过期的键，最近使用的在前"""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key FROM {self.table} WHERE key LIKE ? ESCAPE '\\' AND expires_at > ? "
+                    "ORDER BY last_access DESC LIMIT ?", (escaped + "%", time.time(), limit)
+                ).fetchall()
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            logger.warning("读取缓存失败: %s", e)
+            return []
+
+    def purge_expired(self):
+        """清理所有已过期的条目"""
+        try:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning("清理过期缓存失败: %s", e)
+
+    def clear(self):
+        """清空缓存"""
+        try:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self._count = 0
+                self._pending = 0
+        except sqlite3.Error as e:
+            logger.warning("清空缓存失败: %s", e)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_text(text: str) -> str:
+    """统一全半角、大小写并去除空白，用作缓存键"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return "".join(text.split()).lower()
+
+
+class PlaceCache(PersistentLRUCache):
+    """地点解析结果缓存，键为(地图提供方, 规范化地点名, 城市)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 7 * 24 * 3600, max_entries: int = 5000):
+        super().__init__(path, "places", ttl, max_entries)
+
+    @staticmethod
+    def make_key(provider: str, name: str, city: str = None) -> str:
+        return f"{provider}|{normalize_text(name)}|{normalize_text(city)}"
+
+    def get_place(self, provider: str, name: str, city: str = None) -> Optional[Dict]:
+        """读取地点信息，未命中返回None"""
+        return self.get(self.make_key(provider, name, city))
+
+    def put_place(self, provider: str, name: str, city: str, info: Dict, ttl: float = None):
+        """写入地点信息"""
+        self.set(self.make_key(provider, name, city), info, ttl)
+
+    def invalidate_place(self, provider: str, name: str, city: str = None):
+        """
+        使地点缓存失效
+
+        Args:
+            provider: 地图提供方（amap/baidu）
+            name: 地点名称
+            city: 城市，为None时删除该地点在所有城市下的缓存
+        """
+        if city is None:
+            self.invalidate_prefix(f"{provider}|{normalize_text(name)}|")
+        else:
+            self.invalidate(self.make_key(provider, name, city))
+
+    def recent_names(self, provider: str, prefix: str, limit: int = 10) -> List[str]:
+        """以prefix开头的已解析地点名（规范化后的形式），最近使用的在前，用于输入补全"""
+        names = []
+        for key in self.recent_keys(f"{provider}|{normalize_text(prefix)}", limit * 2):
+            name = key.split("|")[1]
+            if name and name not in names:
+                names.append(name)
+        return names[:limit]
+
+
+_place_cache = None
+_place_cache_lock = threading.Lock()
+
+
+def get_place_cache() -> Optional[PlaceCache]:
+    """
+    获取进程内共享的地点缓存实例，配置读取自环境变量：
+    PLACE_CACHE_DISABLED、PLACE_CACHE_PATH、PLACE_CACHE_TTL、PLACE_CACHE_MAX_ENTRIES
+
+    Returns:
+        PlaceCache实例，禁用或初始化失败时返回None
+    """
+    global _place_cache
+    if os.getenv("PLACE_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _place_cache_lock:
+        if _place_cache is None:
+            try:
+                _place_cache = PlaceCache(
+                    path=os.getenv("PLACE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    ttl=float(os.getenv("PLACE_CACHE_TTL", str(7 * 24 * 3600))),
+                    max_entries=int(os.getenv("PLACE_CACHE_MAX_ENTRIES", "5000")),
+                )
+            except (sqlite3.Error, OSError, ValueError) as e:
+                logger.warning("地点缓存初始化失败，将不使用缓存: %s", e)
+                return None
+        return _place_cache
+
+
+# 指令文本中的唤醒词前缀，不影响意图
+_WAKE_PREFIXES = ("任意门", "hi")
+
+
+def normalize_command(text: str) -> str:
+    """在normalize_text基础上去掉标点和句首唤醒词，使口语上等价的指令得到相同的缓存键"""
+    text = "".join(ch for ch in normalize_text(text) if not unicodedata.category(ch).startswith("P"))
+    for prefix in _WAKE_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    return text
+
+
+class IntentCache(PersistentLRUCache):
+    """大模型解析出的导航意图缓存，键为规范化后的指令文本"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 30 * 24 * 3600, max_entries: int = 1000):
+        super().__init__(path, "intents", ttl, max_entries)
+
+    def get_intent(self, text: str) -> Optional[Dict]:
+        """读取指令对应的导航意图，未命中返回None"""
+        key = normalize_command(text)
+        return self.get(key) if key else None
+
+    def put_intent(self, text: str, intent: Dict, ttl: float = None):
+        """
+        写入导航意图
+
+        Args:
+            text: 用户原始指令
+            intent: 包含start_point、end_point、start_city、end_city、transport_mode、provider的字典
+            ttl: 有效期（秒），默认使用实例TTL
+        """
+        key = normalize_command(text)
+        if key:
+            self.set(key, intent, ttl)
+
+    def invalidate_intent(self, text: str):
+        """删除指令对应的导航意图"""
+        self.invalidate(normalize_command(text))
+
+
+_intent_cache = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache() -> Optional[IntentCache]:
+    """
+    获取进程内共享的意图缓存实例，配置读取自环境变量：
+    INTENT_CACHE_DISABLED、INTENT_CACHE_PATH（默认同PLACE_CACHE_PATH）、INTENT_CACHE_TTL、INTENT_CACHE_MAX_ENTRIES
+
+    Returns:
+        IntentCache实例，禁用或初始化失败时返回None
+    """
+    global _intent_cache
+    if os.getenv("INTENT_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _intent_cache_lock:
+        if _intent_cache is None:
+            try:
+                _intent_cache = IntentCache(
+                    path=os.getenv("INTENT_CACHE_PATH", os.getenv("PLACE_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                    ttl=float(os.getenv("INTENT_CACHE_TTL", str(30 * 24 * 3600))),
+                    max_entries=int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "1000")),
+                )
+            except (sqlite3.Error, OSError, ValueError) as e:
+                logger.warning("意图缓存初始化失败，将不使用缓存: %s", e)
+                return None
+        return _intent_cache
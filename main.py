@@ -3,13 +3,19 @@ import logging
 import subprocess
 import json
 import os
-import asyncio
+from concurrent.futures import CancelledError
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QPushButton, QTextEdit, QProgressBar, QComboBox, QMessageBox
 from PySide6.QtCore import Qt, QThread, Signal, QTimer
 from PySide6.QtGui import QIcon
 from navigation_service import NavigationService
 from voice_recognition_service import VoiceRecognitionService
-from gps_service import GPSService
+from gps_service import get_gps_service
+from place_speculation import PlaceSpeculator, speculation_settings
+from type_ahead import TypeAheadEngine, type_ahead_settings
+from command_grammar import parse_command
+from intent_parser import is_confident, is_navigate_tool, navigate_called, parse_claude_stream, parse_intent
+from local_cache import get_intent_cache
+from claude_session import ClaudeSession, ClaudeSessionError, ClaudeSessionPool, claude_pool_settings
 
 # 配置日志
 logging.basicConfig(level=logging.DEBUG)
@@ -17,42 +23,83 @@ logging.basicConfig(level=logging.DEBUG)
 # macOS 事件循环优化
 os.environ["QT_MAC_WANTS_LAYER"] = "1"
 
+NAVIGATION_INSTRUCTIONS = """请分析用户输入是否包含导航需求。如果包含导航需求，请使用已注册的MCP导航工具来处理：
+
+1. 识别起点和终点信息
+   - 如果不指定起点，则起点参数为空字符串 ""
+   - 空起点会自动使用设备GPS位置（如果可用）或IP定位
+2. 识别交通方式（如果用户在输入中指定了交通方式）
+3. 调用navigate工具，参数格式：
+   - start_point: 起点名称（如果没有起点，传空字符串 ""）
+   - end_point: 终点名称
+   - start_city: 起点城市（可选）
+   - end_city: 终点城市（可选）
+   - transport_mode: 交通方式（如果用户指定了交通方式）
+
+支持的导航格式：
+- "从A到B" - 明确起点和终点
+- "去某地" - 只有终点，起点使用当前GPS位置
+- "导航到某地" - 只有终点，起点使用当前GPS位置
+- "驾车从A到B"
+- "打车去某地"
+- "骑车从A到B"
+
+支持的交通方式识别（从用户输入中提取）：
+- 驾车/开车 → driving
+- 公共交通/公交/地铁 → public_transit
+- 步行/走路 → walking
+
+如果无法识别为导航请求，请简单回复"这不是导航请求"。
+如果是导航请求，请直接调用navigate工具，不要只是回复文字。
+如果提供了地图类型(provider)，调用navigate工具时一并传入provider参数。
+每条用户输入都是独立的请求，不要参考之前的对话。"""
+
+
 class VoiceRecognitionWorker(QThread):
     finished = Signal(str)
     error = Signal(str)
+    partial = Signal(str)  # 流式识别的中间结果
 
-    def __init__(self, voice_service, is_wake_word=False):
+    def __init__(self, voice_service, is_wake_word=False, speculator=None):
         super().__init__()
         self.voice_service = voice_service
         self.is_wake_word = is_wake_word
-        self.loop = None
+        self.speculator = speculator
+        self.future = None
 
     def run(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
+        # 识别在语音服务的常驻事件循环中进行，本线程只等待结果
         try:
             if self.is_wake_word:
-                result = self.loop.run_until_complete(self.voice_service.listen_for_wake_word(timeout=5, phrase_time_limit=3))
-                if result:
+                self.future = self.voice_service.submit(
+                    self.voice_service.listen_for_wake_word(timeout=5, phrase_time_limit=3))
+                if self.future.result():
                     self.finished.emit("唤醒词检测成功")
                 else:
                     self.error.emit("未检测到唤醒词")
             else:
-                text = self.loop.run_until_complete(self.voice_service.listen_and_recognize(timeout=5, phrase_time_limit=10))
+                self.future = self.voice_service.submit(self.voice_service.listen_and_recognize(
+                    timeout=5, phrase_time_limit=10, on_partial=self.on_partial))
+                text = self.future.result()
                 if text:
                     self.finished.emit(text)
                 else:
                     self.error.emit("未识别到语音或识别失败")
+        except CancelledError:
+            logging.info("语音识别已取消")
         except Exception as e:
             self.error.emit(f"语音识别出错: {str(e)}")
-        finally:
-            self.loop.close()
-            self.loop = None
+
+    def on_partial(self, text):
+        # 在语音服务的事件循环线程中调用：显示中间结果，并据此提前解析起终点
+        self.partial.emit(text)
+        if self.speculator is not None:
+            self.speculator.update(text)
 
     def stop(self):
         logging.info("停止 VoiceRecognitionWorker 线程")
-        if self.loop and self.loop.is_running():
-            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.future:
+            self.future.cancel()
         self.quit()
         self.wait(1000)
 
@@ -60,79 +107,227 @@ class NavigationWorker(QThread):
     finished = Signal(str)
     error = Signal(str)
 
-    def __init__(self, text):
+    def __init__(self, text, nav_service, intent_service):
         super().__init__()
         self.text = text
+        self.nav_service = nav_service
+        self.intent_service = intent_service
 
     def run(self):
         try:
-            config_path = os.path.join(os.path.dirname(__file__), "claude_desktop_config.json")
-            prompt = f"""用户输入："{self.text}"
-
-请分析这段文字是否包含导航需求。如果包含导航需求，请使用已注册的MCP导航工具来处理：
+            # 先用本地规则解析，结构明确的指令不必等待Claude CLI
+            intent = parse_intent(self.text)
+            if is_confident(intent):
+                logging.info(f"本地解析命中: {intent}")
+                if self.navigate_locally(intent):
+                    return
+                logging.info("本地解析结果导航失败，交给Claude CLI")
+            # 之前由Claude CLI解析过的相同指令直接复用缓存的意图
+            if self.navigate_cached():
+                return
+            if intent["end_point"] and os.getenv("NAV_INTENT_RACE", "1") != "0" \
+                    and intent["confidence"] >= float(os.getenv("NAV_INTENT_RACE_THRESHOLD", "0.5")):
+                logging.info(f"本地解析不确定，与Claude CLI并行处理: {intent}")
+                self.race_with_claude(intent)
+                return
+            logging.info(f"本地解析不确定，交给Claude CLI: {intent['reasons']}")
+            self.finish_claude(self.start_claude())
 
-1. 识别起点和终点信息
-   - 如果不指定起点，则起点参数为空字符串 ""
-   - 空起点会自动使用设备GPS位置（如果可用）或IP定位
-2. 识别交通方式（如果用户在输入中指定了交通方式）
-3. 调用navigate工具，参数格式：
-   - start_point: 起点名称（如果没有起点，传空字符串 ""）
-   - end_point: 终点名称
-   - start_city: 起点城市（可选）
-   - end_city: 终点城市（可选）
-   - transport_mode: 交通方式（如果用户指定了交通方式）
+        except Exception as e:
+            self.error.emit(f"❌ 调用Claude CLI失败: {str(e)}")
 
-支持的导航格式：
-- "从A到B" - 明确起点和终点
-- "去某地" - 只有终点，起点使用当前GPS位置
-- "导航到某地" - 只有终点，起点使用当前GPS位置
-- "驾车从A到B"
-- "打车去某地"
-- "骑车从A到B"
+    def navigate_locally(self, intent) -> bool:
+        start, end, mode = intent["start_point"] or "当前位置", intent["end_point"], intent["transport_mode"]
+        if not self.nav_service.navigate(start, end, transport_mode=mode):
+            return False
+        mode_text = f" ({mode})" if mode else ""
+        self.finished.emit(f"⚡ 本地解析: {start} → {end}{mode_text}")
+        return True
+
+    def navigate_cached(self) -> bool:
+        cache = get_intent_cache()
+        intent = cache.get_intent(self.text) if cache else None
+        if not intent or not intent.get("end_point"):
+            return False
+        logging.info(f"意图缓存命中: {intent}")
+        start = intent.get("start_point") or "当前位置"
+        end, mode = intent["end_point"], intent.get("transport_mode")
+        if not self.nav_service.navigate(start, end, intent.get("start_city"), intent.get("end_city"),
+                                         transport_mode=mode, provider=intent.get("provider")):
+            # 缓存的意图已无法导航（例如地点不再存在），删除后重新交给Claude CLI
+            cache.invalidate_intent(self.text)
+            return False
+        mode_text = f" ({mode})" if mode else ""
+        self.finished.emit(f"⚡ 缓存意图: {start} → {end}{mode_text}")
+        return True
+
+    def race_with_claude(self, intent):
+        """
+        本地解析与Claude CLI同时进行：本地先生成导航链接则取消CLI调用并直接打开，
+        否则等待CLI的结果；CLI已调用navigate工具（浏览器由它打开）时不再打开本地链接
+        """
+        call = self.start_claude()
+        start, end, mode = intent["start_point"] or "当前位置", intent["end_point"], intent["transport_mode"]
+        plan = self.nav_service.plan(start, end, transport_mode=mode)
+        if plan and not call.done() and not call.navigating():
+            mode_text = f" ({mode})" if mode else ""
+            if call.cancel():
+                logging.info("Claude CLI在取消前已调用navigate工具，不再打开本地生成的链接")
+                self.finished.emit(f"✅ Claude CLI已处理导航: {self.text}")
+                return
+            if self.nav_service.open_plan(plan, start, end):
+                self.finished.emit(f"⚡ 本地解析: {start} → {end}{mode_text}")
+            else:
+                self.error.emit(f"❌ 导航失败: {start} → {end}{mode_text}")
+            return
+        self.finish_claude(call)
 
-支持的交通方式识别（从用户输入中提取）：
-- 驾车/开车 → driving
-- 公共交通/公交/地铁 → public_transit
-- 步行/走路 → walking
+    def start_claude(self) -> "ClaudeCall":
+        return self.intent_service.submit(self.text, self.nav_service.provider)
 
-如果无法识别为导航请求，请简单回复"这不是导航请求"。
-如果是导航请求，请直接调用navigate工具，不要只是回复文字。"""
+    def finish_claude(self, call: "ClaudeCall"):
+        try:
+            response, intent = call.result()
+        except ClaudeSessionError as e:
+            self.error.emit(f"❌ 执行失败: {e}")
+            return
 
+        cache = get_intent_cache()
+        if intent and intent.get("end_point") and cache:
+            cache.put_intent(self.text, intent)
+            logging.info(f"已缓存导航意图: {intent}")
+        self.finished.emit(f"✅ Claude回复: {response.strip()}")
+
+
+class ClaudeCall:
+    """一次进行中的Claude CLI调用，可等待结果或取消"""
+
+    def __init__(self, service: "ClaudeIntentService", message: str):
+        self.service = service
+        self.session = None
+        self.process = None
+        if service.pool is not None:
+            self.session = service.pool.acquire(service.timeout)
+            try:
+                self.session.send(message)
+            except ClaudeSessionError:
+                service.pool.discard(self.session)
+                raise
+        else:
             cmd = [
                 "claude",
-                "--mcp-config", config_path,
+                "--mcp-config", service.config_path,
                 "--dangerously-skip-permissions",
                 "--print",
-                prompt
+                "--output-format", "stream-json",
+                "--verbose",
+                f"{message}\n\n{NAVIGATION_INSTRUCTIONS}"
             ]
+            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                            text=True, env=service.env)
+
+    def done(self) -> bool:
+        """调用是否已结束：会话池中的会话本轮已输出result事件，或独立的CLI进程已退出"""
+        if self.session is not None:
+            return self.session.turn_finished()
+        return self.process.poll() is not None
+
+    def navigating(self) -> bool:
+        """Claude是否已在本轮调用navigate工具（只有会话池模式能在调用结束前得知）"""
+        return self.session is not None and any(map(is_navigate_tool, self.session.turn_tools()))
+
+    def result(self):
+        """
+        等待调用结束
+
+        Returns:
+            (回复文本, 成功执行的navigate工具参数或None)
+        """
+        if self.session is not None:
+            try:
+                lines = self.session.receive(self.service.timeout)
+            except ClaudeSessionError:
+                self.service.pool.discard(self.session)
+                raise
+            self.service.pool.release(self.session)
+            return parse_claude_stream("".join(lines))
 
-            env = os.environ.copy()
-            env["CLAUDE_MCP_CONFIG"] = config_path
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                env=env
-            )
-
-            if result.returncode == 0:
-                response = result.stdout.strip()
-                self.finished.emit(f"✅ Claude回复: {response}")
-            else:
-                error_msg = result.stderr.strip() or "命令执行失败"
-                self.error.emit(f"❌ 执行失败: {error_msg}")
+        try:
+            stdout, stderr = self.process.communicate(timeout=self.service.timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.communicate()
+            raise ClaudeSessionError("Claude CLI响应超时")
+        if self.process.returncode != 0:
+            raise ClaudeSessionError(stderr.strip() or "命令执行失败")
+        return parse_claude_stream(stdout)
+
+    def cancel(self) -> bool:
+        """
+        取消调用：会话池中的会话中断本轮后归还（进程与MCP连接保留），独立的CLI进程被终止
+
+        Returns:
+            bool: 取消前Claude是否已调用navigate工具（浏览器可能已由Claude打开）
+        """
+        if self.session is not None:
+            navigated = self.navigating()
+            self.service.pool.interrupt(self.session, self.service.interrupt_timeout)
+            return navigated
+        if self.process.poll() is None:
+            self.process.kill()
+        stdout, _ = self.process.communicate()
+        return navigate_called(stdout)
+
+
+class ClaudeIntentService:
+    """
+    Claude CLI意图服务：默认使用常驻会话池（进程启动与MCP握手只做一次），
+    CLAUDE_SESSION_POOL_SIZE=0时每个请求启动一个新进程
+    """
 
-        except Exception as e:
-            self.error.emit(f"❌ 调用Claude CLI失败: {str(e)}")
+    def __init__(self):
+        # NAV_MCP_CONFIG可指向常驻HTTP服务的配置（如claude_mcp_http_config.json），避免每次拉起MCP进程
+        self.config_path = os.getenv("NAV_MCP_CONFIG") or os.path.join(
+            os.path.dirname(__file__), "claude_desktop_config.json")
+        self.env = os.environ.copy()
+        self.env["CLAUDE_MCP_CONFIG"] = self.config_path
+        self.timeout = float(os.getenv("CLAUDE_REQUEST_TIMEOUT", "30"))
+
+        settings = claude_pool_settings()
+        self.interrupt_timeout = settings["interrupt_timeout"]
+        self.pool = None
+        if settings["size"] > 0:
+            self.pool = ClaudeSessionPool(
+                lambda: ClaudeSession(self.config_path, NAVIGATION_INSTRUCTIONS, self.env),
+                size=settings["size"], max_turns=settings["max_turns"])
+            self.pool.warm_up()
+
+    def submit(self, text: str, provider: str = None) -> ClaudeCall:
+        message = f'用户输入："{text}"'
+        if provider:
+            message += f"\n地图类型(provider): {provider}"
+        return ClaudeCall(self, message)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
 
 class InputApp(QWidget):
     def __init__(self):
         super().__init__()
         self.nav_service = NavigationService()
+        # 启动时预热Claude CLI会话，首条指令无需等待进程启动与MCP握手
+        self.intent_service = ClaudeIntentService()
         self.voice_service = VoiceRecognitionService()
-        self.gps_service = GPSService()
+        # 流式识别的中间结果出现稳定的起终点时，提前在语音服务的事件循环中解析地点
+        self.speculator = None
+        settings = speculation_settings()
+        if settings["enabled"]:
+            self.speculator = PlaceSpeculator(self.nav_service, self.voice_service.loop,
+                                              settings["stable_partials"], settings["max_lookups"])
+            self.nav_service.speculator = self.speculator
+        # 共享的常驻GPS位置订阅，启动时检查GPS状态时开始订阅
+        self.gps_service = get_gps_service()
         self.is_listening_wake_word = False
         self.active_threads = []
         self.gps_available = False
@@ -158,6 +353,13 @@ class InputApp(QWidget):
         self.input_field.setPlaceholderText("例如：驾车从张江人工智能岛到虹桥火车站")
         self.input_field.returnPressed.connect(self.on_enter_pressed)
         input_layout.addWidget(self.input_field)
+        # 输入联想：停止输入后提前解析起终点，并显示地点补全
+        self.type_ahead = None
+        settings = type_ahead_settings()
+        if settings["enabled"]:
+            self.type_ahead = TypeAheadEngine(self.input_field, self.nav_service, self.current_provider,
+                                              self.speculator, settings["debounce_ms"],
+                                              settings["max_suggestions"])
 
         self.map_provider_combo = QComboBox()
         self.map_provider_combo.addItems(["高德", "百度"])
@@ -257,12 +459,21 @@ class InputApp(QWidget):
         self.submit_button.setEnabled(False)
         self.wake_word_button.setEnabled(False)
 
-        self.voice_worker = VoiceRecognitionWorker(self.voice_service)
+        if self.type_ahead:
+            self.type_ahead.cancel()
+        if self.speculator:
+            self.speculator.reset(self.current_provider())
+        self.voice_worker = VoiceRecognitionWorker(self.voice_service, speculator=self.speculator)
+        self.voice_worker.partial.connect(self.on_voice_recognition_partial)
         self.voice_worker.finished.connect(self.on_voice_recognition_finished)
         self.voice_worker.error.connect(self.on_voice_recognition_error)
         self.active_threads.append(self.voice_worker)
         self.voice_worker.start()
 
+    def on_voice_recognition_partial(self, text):
+        # 边说边显示识别中的文字
+        self.input_field.setText(text)
+
     def on_voice_recognition_finished(self, text):
         self.output_text.append(f"🎤 识别到: {text}")
         result = self.voice_service.parse_navigation_command(text, require_wake_word=False)
@@ -272,6 +483,8 @@ class InputApp(QWidget):
             self.output_text.append("✅ 检测到导航指令，正在处理...")
             self.start_navigation_process(command_text)
         else:
+            if self.speculator:
+                self.speculator.discard()
             self.output_text.append("❌ 未检测到有效的导航指令")
             self.output_text.append("💡 请使用格式: 驾车/公交/步行从A到B 或 去某地")
             logging.warning(f"解析失败，输入文本: {text}")
@@ -284,6 +497,8 @@ class InputApp(QWidget):
         self.finish_voice_process()
 
     def on_voice_recognition_error(self, error):
+        if self.speculator:
+            self.speculator.discard()
         self.output_text.append(f"❌ {error}")
         if "Qiniu API 认证失败或配额超限" in str(error):
             self.output_text.append("⚠️ Qiniu ASR 认证失败，请检查 API 密钥或配额限制（登录 Qiniu 控制台或联系支持）")
@@ -315,6 +530,8 @@ class InputApp(QWidget):
             self.input_field.clear()
 
     def start_navigation_process(self, text):
+        if self.type_ahead:
+            self.type_ahead.cancel()
         self.input_field.setEnabled(False)
         self.submit_button.setEnabled(False)
         self.submit_button.setText("处理中...")
@@ -328,16 +545,19 @@ class InputApp(QWidget):
 
         self.output_text.append("🤖 正在分析导航请求...")
 
-        provider = "amap" if self.map_provider_combo.currentText() == "高德" else "baidu"
+        provider = self.current_provider()
         os.environ["MAP_PROVIDER"] = provider
         self.nav_service.provider = provider
 
-        self.worker = NavigationWorker(text)
+        self.worker = NavigationWorker(text, self.nav_service, self.intent_service)
         self.worker.finished.connect(self.on_navigation_finished)
         self.worker.error.connect(self.on_navigation_error)
         self.active_threads.append(self.worker)
         self.worker.start()
 
+    def current_provider(self) -> str:
+        return "amap" if self.map_provider_combo.currentText() == "高德" else "baidu"
+
     def update_progress(self):
         self.progress_value = (self.progress_value + 5) % 100
         if self.progress_bar.maximum() != 0:
@@ -363,6 +583,9 @@ class InputApp(QWidget):
                 self.active_threads.remove(thread)
 
     def finish_navigation_process(self):
+        # 未经plan取用的预解析（如交给Claude处理的指令）在此取消
+        if self.speculator:
+            self.speculator.discard()
         self.progress_timer.stop()
         self.progress_bar.setVisible(False)
         self.input_field.setEnabled(True)
@@ -399,56 +622,20 @@ class InputApp(QWidget):
         msg.exec()
 
     def fallback_navigation_parse(self, text):
-        text_lower = text.lower()
-
-        # 识别交通方式
-        transport_mode = None
-        if "步行" in text or "走路" in text:
-            transport_mode = "walking"
-        elif "驾车" in text or "开车" in text:
-            transport_mode = "driving"
-        elif "公交" in text or "公共交通" in text or "地铁" in text:
-            transport_mode = "public_transit"
-        elif "骑车" in text or "骑行" in text:
-            transport_mode = "bicycling"
-        elif "打车" in text:
-            transport_mode = "driving"
-
-        if "从" in text and "到" in text:
-            parts = text.split("从")
-            if len(parts) > 1:
-                rest = parts[1]
-                if "到" in rest:
-                    from_to = rest.split("到")
-                    if len(from_to) >= 2:
-                        start = from_to[0].strip()
-                        end = from_to[1].strip()
-                        # 移除交通方式关键词
-                        for keyword in ["步行", "走路", "驾车", "开车", "公交", "公共交通", "地铁", "骑车", "骑行", "打车"]:
-                            start = start.replace(keyword, "").strip()
-                            end = end.replace(keyword, "").strip()
-                        success = self.nav_service.navigate(start, end, transport_mode=transport_mode)
-                        mode_text = f"({transport_mode})" if transport_mode else ""
-                        if success:
-                            self.output_text.append(f"🗺️ 备用解析成功: {start} → {end} {mode_text}")
-                        else:
-                            self.output_text.append(f"❌ 导航失败: {start} → {end} {mode_text}")
-                        return
-        elif "去" in text:
-            parts = text.split("去")
-            if len(parts) > 1:
-                destination = parts[1].strip()
-                # 移除交通方式关键词
-                for keyword in ["步行", "走路", "驾车", "开车", "公交", "公共交通", "地铁", "骑车", "骑行", "打车"]:
-                    destination = destination.replace(keyword, "").strip()
-                success = self.nav_service.navigate("当前位置", destination, transport_mode=transport_mode)
-                mode_text = f"({transport_mode})" if transport_mode else ""
-                if success:
-                    self.output_text.append(f"🗺️ 备用解析成功: 当前位置 → {destination} {mode_text}")
-                else:
-                    self.output_text.append(f"❌ 导航失败: 当前位置 → {destination} {mode_text}")
-                return
-        self.output_text.append("❓ 无法识别导航请求，请使用'从A到B'或'去某地'的格式")
+        command = parse_command(text)
+        if command["structure"] is None or not command["end_point"]:
+            self.output_text.append("❓ 无法识别导航请求，请使用'从A到B'或'去某地'的格式")
+            return
+
+        start = command["start_point"] or "当前位置"
+        end = command["end_point"]
+        transport_mode = command["transport_mode"]
+        success = self.nav_service.navigate(start, end, transport_mode=transport_mode)
+        mode_text = f"({transport_mode})" if transport_mode else ""
+        if success:
+            self.output_text.append(f"🗺️ 备用解析成功: {start} → {end} {mode_text}")
+        else:
+            self.output_text.append(f"❌ 导航失败: {start} → {end} {mode_text}")
 
     def closeEvent(self, event):
         logging.info("窗口关闭，停止所有线程")
@@ -456,6 +643,11 @@ class InputApp(QWidget):
         for thread in self.active_threads[:]:
             thread.stop()
             self.active_threads.remove(thread)
+        self.intent_service.close()
+        if self.speculator:
+            self.speculator.close()
+        self.voice_service.close()
+        self.gps_service.stop()
         event.accept()
 
 if __name__ == "__main__":
@@ -4,12 +4,17 @@ MCP服务器：高德地图导航服务
 提供起点到终点的导航链接生成功能
 """
 
+import argparse
 import asyncio
+import contextlib
+import json
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
 from navigation_service import NavigationService
+from http_client import aclose_async_http_client
+from place_names import CURRENT_LOCATION_NAMES
 import os
 
 
@@ -28,7 +33,7 @@ async def handle_list_tools() -> list[types.Tool]:
     return [
         types.Tool(
             name="navigate",
-            description="根据起点和终点打开地图导航链接（高德/百度），支持多种交通方式",
+            description="根据起点和终点生成地图导航链接（高德/百度）并返回链接，可选在浏览器中打开，支持多种交通方式",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -57,11 +62,57 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "地图类型：amap(高德) 或 baidu(百度)。不填则用环境变量MAP_PROVIDER",
                         "enum": ["amap", "baidu"]
+                    },
+                    "open_browser": {
+                        "type": "boolean",
+                        "description": "是否在本机浏览器中打开链接（可选）。不填则由环境变量NAV_HEADLESS决定"
                     }
                 },
                 "required": ["end_point"],
             },
-        )
+        ),
+        types.Tool(
+            name="navigate_batch",
+            description="批量生成导航链接（不打开浏览器）：整批中相同地点只解析一次，返回每项的链接和状态（JSON）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "导航项列表",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "start_point": {
+                                    "type": "string",
+                                    "description": "起点名称，为空或'当前位置'时使用当前定位"
+                                },
+                                "end_point": {"type": "string", "description": "终点名称"},
+                                "start_city": {"type": "string", "description": "起点城市（可选）"},
+                                "end_city": {"type": "string", "description": "终点城市（可选）"},
+                                "transport_mode": {
+                                    "type": "string",
+                                    "description": "交通方式，默认为driving",
+                                    "enum": ["driving", "public_transit", "walking"]
+                                },
+                                "provider": {
+                                    "type": "string",
+                                    "description": "地图类型，不填则用环境变量MAP_PROVIDER",
+                                    "enum": ["amap", "baidu"]
+                                }
+                            },
+                            "required": ["end_point"],
+                        },
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "地点解析最大并发数（可选）",
+                        "minimum": 1
+                    }
+                },
+                "required": ["items"],
+            },
+        ),
     ]
 
 
@@ -72,59 +123,173 @@ async def handle_call_tool(
     """
     处理工具调用
     """
-    if name != "navigate":
-        raise ValueError(f"Unknown tool: {name}")
-
     if not arguments:
         raise ValueError("Missing arguments")
 
+    if name == "navigate":
+        return await handle_navigate(arguments)
+    if name == "navigate_batch":
+        return await handle_navigate_batch(arguments)
+    raise ValueError(f"Unknown tool: {name}")
+
+
+async def handle_navigate(arguments: dict) -> list[types.TextContent]:
+    """
+    处理单个导航请求
+    """
     start_point = arguments.get("start_point", "")
     end_point = arguments.get("end_point")
     start_city = arguments.get("start_city")
     end_city = arguments.get("end_city")
     transport_mode = arguments.get("transport_mode")
     provider = arguments.get("provider")
+    open_browser = arguments.get("open_browser")
 
     if not end_point:
         raise ValueError("end_point is required")
 
     # 如果没有起点或起点为"当前位置"，使用IP定位自动获取
-    if not start_point or start_point.strip() in ["", "当前位置", "我的位置", "这里"]:
+    if not start_point or start_point.strip() in CURRENT_LOCATION_NAMES:
         start_point = "当前位置"
         start_city = None  # IP定位时不需要指定城市
 
-    # 如果传入provider，动态切换导航服务地图类型
-    if provider:
-        nav_service.provider = provider
+    # 调用导航服务（异步执行，不阻塞事件循环；provider按请求传入，不修改共享实例）
+    plan = await nav_service.plan_async(start_point, end_point, start_city, end_city,
+                                        transport_mode, provider=provider)
+    success = await asyncio.to_thread(nav_service.open_plan, plan, start_point, end_point, open_browser)
 
-    # 调用导航服务
-    success = nav_service.navigate(start_point, end_point, start_city, end_city, transport_mode)
-    
     if success:
         mode_text = f" ({transport_mode})" if transport_mode else ""
-        message = f"已成功打开从 {start_point} 到 {end_point} 的导航链接{mode_text}"
+        message = f"已生成从 {start_point} 到 {end_point} 的导航链接{mode_text}: {plan['url']}"
+    elif plan:
+        message = f"已生成导航链接，但打开浏览器失败：{plan['url']}"
     else:
-        message = f"打开导航链接失败：从 {start_point} 到 {end_point}"
+        message = f"生成导航链接失败：从 {start_point} 到 {end_point}"
 
     return [types.TextContent(type="text", text=message)]
 
 
-async def main():
-    # 使用标准输入输出运行服务器
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="navigation-server",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
-                ),
-            ),
-        )
+async def handle_navigate_batch(arguments: dict) -> list[types.TextContent]:
+    """
+    处理批量导航请求，返回JSON格式的逐项结果
+    """
+    items = arguments.get("items")
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list")
+
+    results = await nav_service.navigate_batch_async(items, arguments.get("max_concurrency"))
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    summary = {"total": len(results), "succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+    return [types.TextContent(type="text", text=json.dumps(summary, ensure_ascii=False))]
+
+
+def initialization_options() -> InitializationOptions:
+    return InitializationOptions(
+        server_name="navigation-server",
+        server_version="1.0.0",
+        capabilities=server.get_capabilities(
+            notification_options=NotificationOptions(),
+            experimental_capabilities={},
+        ),
+    )
+
+
+async def run_stdio():
+    # 使用标准输入输出运行服务器（由客户端按需拉起，每次调用都是新进程）
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, initialization_options())
+    finally:
+        await aclose_async_http_client()
+
+
+class _StreamableHTTPApp:
+    """把Streamable HTTP请求转交给会话管理器的ASGI应用"""
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send):
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_http_app(transport: str):
+    """
+    创建常驻HTTP服务使用的Starlette应用：导航服务实例、连接池与缓存在请求之间保持
+
+    Args:
+        transport: sse 或 streamable-http
+
+    Returns:
+        Starlette应用。streamable-http的端点为 /mcp，sse的端点为 /sse（消息提交到 /messages/）
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+
+    if transport == "sse":
+        from mcp.server.sse import SseServerTransport
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request):
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, initialization_options())
+            return Response()
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            try:
+                yield
+            finally:
+                await aclose_async_http_client()
+
+        routes = [
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+        ]
+        return Starlette(routes=routes, lifespan=lifespan)
+
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+    session_manager = StreamableHTTPSessionManager(app=server)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            try:
+                yield
+            finally:
+                await aclose_async_http_client()
+
+    routes = [Route("/mcp", endpoint=_StreamableHTTPApp(session_manager))]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="导航MCP服务器")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default=os.getenv("MCP_TRANSPORT", "stdio"),
+                        help="传输方式，默认读取环境变量MCP_TRANSPORT（stdio）")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"),
+                        help="HTTP监听地址，默认127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8765")),
+                        help="HTTP监听端口，默认8765")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.transport == "stdio":
+        asyncio.run(run_stdio())
+        return
+
+    import uvicorn
+
+    # 常驻模式：导航服务实例在模块加载时创建并预热连接，连接池与缓存在请求之间复用
+    print(f"导航MCP服务器已启动: {args.transport} http://{args.host}:{args.port}")
+    uvicorn.run(create_http_app(args.transport), host=args.host, port=args.port, log_level="info")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
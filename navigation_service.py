@@ -1,62 +1,314 @@
+import asyncio
+import logging
 import os
 import webbrowser
-from amap_service import build_amap_direction_url_from_names
-from baidu_service import build_baidu_direction_url_from_names
+from typing import Dict, List, Optional
+from amap_service import (amap_route_type, compose_amap_direction_url, get_amap_location_service,
+                          get_async_amap_location_service, resolve_amap_endpoints, resolve_amap_endpoints_async)
+from baidu_service import (compose_baidu_direction_url, fill_baidu_endpoints, get_async_baidu_location_service,
+                           get_baidu_location_service, resolve_baidu_endpoints, resolve_baidu_endpoints_async)
+from concurrency import default_resolve_timeout
+from http_client import get_http_client
+from local_cache import normalize_text
+from place_names import CURRENT_LOCATION_NAMES
+
+logger = logging.getLogger(__name__)
 
 
 class NavigationService:
-    def __init__(self, api_key: str = None, provider: str = None):
+    def __init__(self, api_key: str = None, provider: str = None, headless: bool = None):
         # 读取环境变量中的API Key和地图提供方
         self.amap_api_key = api_key or os.getenv("AMAP_API_KEY", "3b16354b4a04610cf4873088846dfcb6")
         self.baidu_api_key = os.getenv("BAIDU_MAP_AK", "vE2HgtbueyifzmUlFy09ev6lzktj2ifF")
         self.provider = (provider or os.getenv("MAP_PROVIDER", "amap")).lower()
-    
-    def navigate(self, start_point: str, end_point: str, start_city: str = None, end_city: str = None, transport_mode: str = None):
+        # 无头模式：只生成导航链接，不打开浏览器
+        self.headless = headless if headless is not None else os.getenv("NAV_HEADLESS", "0") == "1"
+        # 异步导航的最大并发数，超出的请求排队等待
+        self.max_concurrency = int(os.getenv("NAV_MAX_CONCURRENCY", "8"))
+        self._semaphore = None
+        # 地点预解析器（place_speculation.PlaceSpeculator），由语音输入端设置
+        self.speculator = None
+        # 启动时在后台预热地图接口连接，首个导航请求无需再握手
+        if os.getenv("HTTP_WARM_UP", "1") != "0":
+            get_http_client().warm_up()
+
+    def plan(self, start_point: str, end_point: str, start_city: str = None, end_city: str = None,
+             transport_mode: str = None, provider: str = None) -> Optional[Dict]:
         """
-        根据起点和终点打开高德地图导航链接
-        
+        解析起终点并生成导航链接，不打开浏览器
+
         Args:
             start_point: 起点名称
             end_point: 终点名称
             start_city: 起点城市（可选）
             end_city: 终点城市（可选）
             transport_mode: 交通方式（可选）
-        
+            provider: 地图类型（可选，默认使用实例的provider）
+
         Returns:
-            bool: 是否成功打开链接
-        """
-        if self.provider == "baidu":
-
-            url = build_baidu_direction_url_from_names(
-                api_key=self.baidu_api_key,
-                from_name=start_point,
-                to_name=end_point,
-                from_city=start_city,
-                to_city=end_city,
-                transport_mode=transport_mode,
-            )
-        elif self.provider == "amap":
-            url = build_amap_direction_url_from_names(
-                api_key=self.amap_api_key,
-                from_name=start_point,
-                to_name=end_point,
-                from_city=start_city,
-                to_city=end_city,
-                transport_mode=transport_mode,
-            )
-        
-        if url:
-            try:
-                webbrowser.open(url)
-                print(f"已打开导航: {start_point} → {end_point}")
-                return True
-            except Exception as e:
-                print(f"打开浏览器失败: {e}")
-                return False
+            包含url、origin（起点信息）、destination（终点信息）、provider、transport_mode的字典，
+            生成失败返回None
+        """
+        provider = (provider or self.provider).lower()
+        speculated = {}
+        if self.speculator is not None and provider in ("amap", "baidu"):
+            speculated = self.speculator.take(provider, start_point, end_point, start_city, end_city)
+        if speculated:
+            # 预解析命中的一端直接使用，另一端在此解析
+            from_info = speculated.get("start")
+            if from_info is None:
+                from_info = self.resolve_place(provider, start_point, start_city)
+            if from_info is not None and from_info.get("source") == "ip":
+                # 预解析较早完成，之后已有GPS定位时改用GPS（不等待）
+                service = (get_baidu_location_service(self.baidu_api_key) if provider == "baidu"
+                           else get_amap_location_service(self.amap_api_key))
+                from_info = service.upgrade_current_location(from_info, timeout=0)
+            to_info = speculated.get("end")
+            if to_info is None:
+                to_info = self.resolve_place(provider, end_point, end_city)
+            if provider == "baidu":
+                from_info, to_info = fill_baidu_endpoints(from_info, to_info, start_point, end_point,
+                                                          start_city, end_city)
+        elif provider == "baidu":
+            from_info, to_info = resolve_baidu_endpoints(
+                self.baidu_api_key, start_point, end_point, start_city, end_city)
+        elif provider == "amap":
+            from_info, to_info = resolve_amap_endpoints(
+                self.amap_api_key, start_point, end_point, start_city, end_city)
         else:
-            print("生成导航链接失败")
+            logger.warning("不支持的地图类型: %s", provider)
+            return None
+        return self._compose_plan(provider, from_info, to_info, start_point, end_point,
+                                  start_city, end_city, transport_mode)
+
+    async def plan_async(self, start_point: str, end_point: str, start_city: str = None, end_city: str = None,
+                         transport_mode: str = None, provider: str = None) -> Optional[Dict]:
+        """
+        plan的asyncio版本，并发数受NAV_MAX_CONCURRENCY限制
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        provider = (provider or self.provider).lower()
+        async with self._semaphore:
+            if provider == "baidu":
+                from_info, to_info = await resolve_baidu_endpoints_async(
+                    self.baidu_api_key, start_point, end_point, start_city, end_city)
+            elif provider == "amap":
+                from_info, to_info = await resolve_amap_endpoints_async(
+                    self.amap_api_key, start_point, end_point, start_city, end_city)
+            else:
+                logger.warning("不支持的地图类型: %s", provider)
+                return None
+        return self._compose_plan(provider, from_info, to_info, start_point, end_point,
+                                  start_city, end_city, transport_mode)
+
+    @staticmethod
+    def _compose_plan(provider: str, from_info: Optional[Dict], to_info: Optional[Dict],
+                      start_point: str, end_point: str, start_city: str = None, end_city: str = None,
+                      transport_mode: str = None) -> Optional[Dict]:
+        if provider == "baidu":
+            url = compose_baidu_direction_url(from_info, to_info, start_point, end_point,
+                                              start_city, end_city, transport_mode)
+        else:
+            if not from_info:
+                logger.warning("无法找到起点: %s", start_point)
+                return None
+            if not to_info:
+                logger.warning("无法找到终点: %s", end_point)
+                return None
+            url = compose_amap_direction_url(from_info, to_info, amap_route_type(transport_mode))
+        return {
+            "url": url,
+            "origin": from_info,
+            "destination": to_info,
+            "provider": provider,
+            "transport_mode": transport_mode,
+        }
+
+    def navigate(self, start_point: str, end_point: str, start_city: str = None, end_city: str = None,
+                 transport_mode: str = None, provider: str = None, open_browser: bool = None):
+        """
+        根据起点和终点生成地图导航链接，非无头模式下在浏览器中打开
+
+        Args:
+            start_point: 起点名称
+            end_point: 终点名称
+            start_city: 起点城市（可选）
+            end_city: 终点城市（可选）
+            transport_mode: 交通方式（可选）
+            provider: 地图类型（可选，默认使用实例的provider）
+            open_browser: 是否打开浏览器（可选，默认非无头模式时打开）
+
+        Returns:
+            bool: 是否成功生成（并打开）链接
+        """
+        plan = self.plan(start_point, end_point, start_city, end_city, transport_mode, provider)
+        return self.open_plan(plan, start_point, end_point, open_browser)
+
+    async def navigate_async(self, start_point: str, end_point: str, start_city: str = None, end_city: str = None,
+                             transport_mode: str = None, provider: str = None, open_browser: bool = None):
+        """
+        navigate的asyncio版本：地点解析使用异步客户端，打开浏览器放到线程中执行，
+        并发数受NAV_MAX_CONCURRENCY限制
+
+        Returns:
+            bool: 是否成功生成（并打开）链接
+        """
+        plan = await self.plan_async(start_point, end_point, start_city, end_city, transport_mode, provider)
+        return await asyncio.to_thread(self.open_plan, plan, start_point, end_point, open_browser)
+
+    def open_plan(self, plan: Optional[Dict], start_point: str, end_point: str, open_browser: bool = None) -> bool:
+        """
+        按需在浏览器中打开plan生成的导航链接
+
+        Args:
+            plan: plan/plan_async的返回值
+            start_point: 起点名称（用于日志）
+            end_point: 终点名称（用于日志）
+            open_browser: 是否打开浏览器（可选，默认非无头模式时打开）
+
+        Returns:
+            bool: 是否成功生成（并打开）链接
+        """
+        if not plan:
+            logger.warning("生成导航链接失败")
+            return False
+
+        if open_browser is None:
+            open_browser = not self.headless
+        if not open_browser:
+            logger.info("已生成导航链接: %s → %s: %s", start_point, end_point, plan["url"])
+            return True
+
+        try:
+            webbrowser.open(plan["url"])
+            logger.info("已打开导航: %s → %s", start_point, end_point)
+            return True
+        except Exception as e:
+            logger.error("打开浏览器失败: %s", e)
             return False
 
+    async def navigate_batch_async(self, items: List[Dict], max_concurrency: int = None) -> List[Dict]:
+        """
+        批量生成导航链接（不打开浏览器）：整批中相同的(地图类型, 地点, 城市)只解析一次，
+        解析请求按max_concurrency限制并发
+
+        Args:
+            items: 导航项列表，每项包含start_point、end_point，以及可选的start_city、end_city、
+                   transport_mode、provider
+            max_concurrency: 地点解析最大并发数，默认NAV_MAX_CONCURRENCY
+
+        Returns:
+            与items顺序一致的结果列表，每项包含index、start_point、end_point、provider、url、status、error
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        timeout = default_resolve_timeout()
+
+        normalized = []
+        for item in items:
+            start_point = (item.get("start_point") or "").strip()
+            if start_point in CURRENT_LOCATION_NAMES:
+                start_point = ""
+            normalized.append({
+                "start_point": start_point,
+                "end_point": (item.get("end_point") or "").strip(),
+                "start_city": None if not start_point else item.get("start_city"),
+                "end_city": item.get("end_city"),
+                "transport_mode": item.get("transport_mode"),
+                "provider": (item.get("provider") or self.provider).lower(),
+            })
+
+        # 收集整批中需要解析的不同地点（按规范化名称去重）
+        def place_key(provider, name, city):
+            return provider, normalize_text(name), normalize_text(city)
+
+        places = {}
+        for item in normalized:
+            if item["provider"] not in ("amap", "baidu") or not item["end_point"]:
+                continue
+            for name, city in ((item["start_point"], item["start_city"]), (item["end_point"], item["end_city"])):
+                places.setdefault(place_key(item["provider"], name, city), (item["provider"], name, city))
+        logger.info("批量导航: %s 项，去重后需解析 %s 个地点", len(items), len(places))
+
+        async def resolve(key):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.resolve_place_async(*key), timeout=timeout)
+                except Exception as e:
+                    logger.warning("地点解析失败: %s, %s", key, e)
+                    return None
+
+        infos = dict(zip(places, await asyncio.gather(*(resolve(place) for place in places.values()))))
+
+        results = []
+        for index, item in enumerate(normalized):
+            provider = item["provider"]
+            result = {
+                "index": index,
+                "start_point": item["start_point"] or "当前位置",
+                "end_point": item["end_point"],
+                "provider": provider,
+                "url": None,
+                "status": "error",
+                "error": None,
+            }
+            results.append(result)
+
+            if provider not in ("amap", "baidu"):
+                result["error"] = f"不支持的地图类型: {provider}"
+                continue
+            if not item["end_point"]:
+                result["error"] = "缺少终点"
+                continue
+
+            from_info = infos.get(place_key(provider, item["start_point"], item["start_city"]))
+            to_info = infos.get(place_key(provider, item["end_point"], item["end_city"]))
+            if provider == "amap":
+                if not from_info or not to_info:
+                    result["error"] = f"无法找到{'起点' if not from_info else '终点'}"
+                    continue
+                result["url"] = compose_amap_direction_url(
+                    from_info, to_info, amap_route_type(item["transport_mode"]))
+            else:
+                from_info, to_info = fill_baidu_endpoints(
+                    from_info, to_info, item["start_point"], item["end_point"],
+                    item["start_city"], item["end_city"])
+                result["url"] = compose_baidu_direction_url(
+                    from_info, to_info, item["start_point"], item["end_point"],
+                    item["start_city"], item["end_city"], item["transport_mode"])
+            result["status"] = "ok"
+        return results
+
+    def resolve_place(self, provider: str, name: str, city: str = None) -> Optional[Dict]:
+        """解析单个地点，名称为空时获取当前位置"""
+        if provider == "baidu":
+            service = get_baidu_location_service(self.baidu_api_key)
+            if name in CURRENT_LOCATION_NAMES:
+                return service.get_current_location() if self.baidu_api_key else None
+            return service.get_location_info(name, city)
+
+        service = get_amap_location_service(self.amap_api_key)
+        if name in CURRENT_LOCATION_NAMES:
+            return service.get_current_location() or service.get_location_info("当前位置", city)
+        return service.get_location_info(name, city)
+
+    async def resolve_place_async(self, provider: str, name: str, city: str = None) -> Optional[Dict]:
+        """resolve_place的asyncio版本"""
+        if provider == "baidu":
+            service = get_async_baidu_location_service(self.baidu_api_key)
+            if name in CURRENT_LOCATION_NAMES:
+                return await service.get_current_location() if self.baidu_api_key else None
+            return await service.get_location_info(name, city)
+
+        service = get_async_amap_location_service(self.amap_api_key)
+        if name in CURRENT_LOCATION_NAMES:
+            info = await service.get_current_location()
+            if not info:
+                info = await service.get_location_info("当前位置", city)
+            return info
+        return await service.get_location_info(name, city)
+
 
 if __name__ == "__main__":
     nav_service = NavigationService(provider=os.getenv("MAP_PROVIDER", "amap"))
@@ -0,0 +1,7 @@
+"""
+地点名称常量模块
+地图服务、导航服务、MCP服务器与预解析共用的地点名称约定
+"""
+
+# 表示当前位置的地点名称（起点为空也视为当前位置）
+CURRENT_LOCATION_NAMES = ["当前位置", "我的位置", "这里", ""]
@@ -0,0 +1,211 @@
+"""
+地点预解析模块
+流式识别的中间结果逐条交给指令解析器，起点/终点短语稳定后立即在语音服务的事件循环中解析地点；
+最终识别结果到达、开始生成导航链接时，直接取用已解析（或仍在解析）的地点。
+短语随后续中间结果变化时，过期的解析任务被取消
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+
+from command_grammar import parse_command
+from concurrency import default_resolve_timeout
+from http_client import aclose_async_http_client
+from local_cache import normalize_text
+from place_names import CURRENT_LOCATION_NAMES
+
+logger = logging.getLogger(__name__)
+
+# 地点短语的最短长度（字符），过短的中间结果（如"人"）不值得解析
+MIN_PLACE_LENGTH = 2
+
+START = "start"
+END = "end"
+
+
+def _place_key(provider: str, name: str, city: str = None) -> Tuple[str, str, str]:
+    if name in CURRENT_LOCATION_NAMES:
+        return provider, "", ""  # 当前位置与城市无关
+    return provider, normalize_text(name), normalize_text(city)
+
+
+def _in_city(info: Dict, city: str) -> bool:
+    """解析结果是否位于指定城市（"上海"与"上海市"视为同一城市），结果没有城市信息时不认为位于该城市"""
+    cityname = normalize_text(info.get("cityname"))
+    city = normalize_text(city)
+    return bool(cityname) and (city in cityname or cityname in city)
+
+
+class PlaceSpeculator:
+    """
+    根据流式识别的中间结果提前解析起终点
+
+    update()在每条中间结果（或输入框防抖后的文本）到达时调用：起点位于"从A到B"的A处（后面已有"到"）或为当前位置时立即解析；
+    终点位于句尾、仍可能随语音延长，连续stable_partials条中间结果不变才解析。
+    take()在生成导航链接时调用，取用与最终起终点一致的解析结果
+    """
+
+    def __init__(self, nav_service, loop: asyncio.AbstractEventLoop, stable_partials: int = 2,
+                 max_lookups: int = 6):
+        self.nav_service = nav_service
+        self.loop = loop
+        self.stable_partials = stable_partials
+        self.max_lookups = max_lookups
+        self.provider = None
+        self.stats = {"started": 0, "cancelled": 0, "hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._lookups: Dict[Tuple[str, str, str], Dict] = {}  # 地点键 -> {"future", "role", "name", "started", "finished"}
+        self._active: Dict[str, Tuple[str, str, str]] = {}    # 角色 -> 当前解析中的地点键
+        self._candidate = None                                # (终点短语, 连续出现次数)
+        self._started_count = 0
+
+    def reset(self, provider: str):
+        """开始新的一句话：取消上一句遗留的解析任务"""
+        with self._lock:
+            self._cancel_all()
+            self.provider = provider
+            self._candidate = None
+            self._started_count = 0
+
+    def discard(self):
+        """放弃本句的预解析（识别失败或不是导航指令）"""
+        with self._lock:
+            self._cancel_all()
+            self.provider = None
+
+    def update(self, text: str, settled: bool = False):
+        """
+        处理一条中间识别结果
+
+        Args:
+            text: 识别（或输入）到目前为止的文本
+            settled: 文本已停止变化（如输入框停止输入），句尾的终点无需等待后续结果确认
+        """
+        if not self.provider:
+            return
+        command = parse_command(text)
+        if command["structure"] is None or command["markers"]:
+            return
+        start = (command["start_point"] or "").strip()
+        end = (command["end_point"] or "").strip()
+        with self._lock:
+            if command["structure"] == "go_to" or not start:
+                self._speculate(START, "")
+            elif len(start) >= MIN_PLACE_LENGTH:
+                self._speculate(START, start)
+
+            if self._candidate and self._candidate[0] == end:
+                self._candidate = (end, self._candidate[1] + 1)
+            else:
+                self._candidate = (end, 1)
+            if len(end) >= MIN_PLACE_LENGTH and (settled or self._candidate[1] >= self.stable_partials):
+                self._speculate(END, end)
+
+    def _speculate(self, role: str, name: str):
+        key = _place_key(self.provider, name)
+        if self._active.get(role) == key:
+            return
+        stale = self._active.pop(role, None)
+        if stale is not None and stale not in self._active.values():
+            self._cancel(stale)
+        self._active[role] = key
+        if key in self._lookups:
+            return
+        if self._started_count >= self.max_lookups:
+            logger.debug("本句预解析次数已达上限，不再解析: %s", name)
+            return
+        self._started_count += 1
+        self.stats["started"] += 1
+        future = asyncio.run_coroutine_threadsafe(
+            self.nav_service.resolve_place_async(self.provider, name), self.loop)
+        self._lookups[key] = {"future": future, "role": role, "name": name or "当前位置",
+                              "started": time.monotonic(), "finished": None}
+        future.add_done_callback(lambda _, lookup=self._lookups[key]: lookup.update(finished=time.monotonic()))
+        logger.info("预解析%s: %s", "起点" if role == START else "终点", name or "当前位置")
+
+    def _cancel(self, key):
+        lookup = self._lookups.pop(key, None)
+        if lookup is not None and lookup["future"].cancel():
+            self.stats["cancelled"] += 1
+            logger.info("取消过期的预解析: %s", lookup["name"])
+
+    def _cancel_all(self):
+        for key in list(self._lookups):
+            self._cancel(key)
+        self._active.clear()
+
+    def take(self, provider: str, start_point: str, end_point: str, start_city: str = None,
+             end_city: str = None, timeout: float = None) -> Dict[str, Optional[Dict]]:
+        """
+        取用与最终起终点一致的预解析结果，仍在解析的最多等待timeout秒；其余解析任务被取消
+
+        Returns:
+            {"start": 起点信息, "end": 终点信息}中命中的部分，未命中的角色不在字典中
+        """
+        if timeout is None:
+            timeout = default_resolve_timeout()
+        with self._lock:
+            if provider != self.provider or not self._lookups:
+                self._cancel_all()
+                return {}
+            lookups = {}  # 角色 -> (解析任务, 结果须位于的城市)
+            for role, name, city in ((START, start_point, start_city), (END, end_point, end_city)):
+                key = _place_key(provider, name, city)
+                if key in self._lookups:
+                    lookups[role] = (self._lookups.pop(key), None)
+                    continue
+                # 中间结果不带城市，预解析按不限城市保存；结果恰好位于指定城市时同样可用
+                key = _place_key(provider, name)
+                if key in self._lookups:
+                    lookups[role] = (self._lookups.pop(key), city)
+            self._cancel_all()
+            self.provider = None
+
+        deadline = time.monotonic() + timeout
+        taken = time.monotonic()
+        hits = {}
+        for role, (lookup, city) in lookups.items():
+            try:
+                info = lookup["future"].result(timeout=max(0.0, deadline - time.monotonic()))
+            except (FutureTimeoutError, CancelledError):
+                lookup["future"].cancel()
+                info = None
+            except Exception as e:
+                logger.warning("预解析出错: %s, %s", lookup["name"], e)
+                info = None
+            if info and city and not _in_city(info, city):
+                logger.info("预解析结果不在%s，重新解析: %s", city, lookup["name"])
+                info = None
+            if not info:
+                self.stats["misses"] += 1
+                continue
+            self.stats["hits"] += 1
+            hits[role] = info
+            finished = lookup["finished"] or time.monotonic()
+            logger.info("预解析命中: %s（%s）", lookup["name"],
+                        f"提前 {(taken - finished) * 1000:.0f} ms 完成" if finished <= taken
+                        else f"又等待 {(finished - taken) * 1000:.0f} ms")
+        return hits
+
+    def close(self):
+        self.discard()
+        try:
+            asyncio.run_coroutine_threadsafe(aclose_async_http_client(), self.loop).result(timeout=2)
+        except Exception as e:
+            logger.debug("关闭预解析HTTP客户端失败: %s", e)
+
+
+def speculation_settings() -> Dict:
+    """
+    读取环境变量NAV_SPECULATE（设为0关闭预解析）、NAV_SPECULATE_STABLE_PARTIALS
+    （终点短语需连续不变的中间结果条数）、NAV_SPECULATE_MAX_LOOKUPS（每句最多发起的预解析次数）
+    """
+    return {
+        "enabled": os.getenv("NAV_SPECULATE", "1") != "0",
+        "stable_partials": int(os.getenv("NAV_SPECULATE_STABLE_PARTIALS", "2")),
+        "max_lookups": int(os.getenv("NAV_SPECULATE_MAX_LOOKUPS", "6")),
+    }
@@ -0,0 +1,224 @@
+"""
+七牛云ASR异步客户端模块
+基于websockets实现七牛云语音识别（消息编解码见qiniu_asr_protocol），所有会话运行在同一个事件循环中，
+唤醒词与指令识别、多路音源可以同时进行，支持取消与发送背压
+"""
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Callable, Optional
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+from qiniu_asr_pool import ASRSessionPool, asr_pool_settings
+from qiniu_asr_protocol import ProtocolError, decode_response, encode_audio, encode_config
+
+logger = logging.getLogger(__name__)
+
+
+class ASRError(Exception):
+    """配置交换失败、服务端返回错误或连接异常断开"""
+
+
+class ASRAuthError(ASRError):
+    """认证失败或配额超限"""
+
+
+class ASRSession:
+    """
+    一句话的识别会话
+
+    音频经有界队列交给发送任务，队列满时feed()等待，上游产生音频快于网络发送时自然减速；
+    接收任务持续处理中间结果，收到最后包后结束
+    """
+
+    def __init__(self, ws, on_partial: Callable[[str], None] = None, queue_size: int = 8, compression_level: int = 1):
+        self.ws = ws
+        self.on_partial = on_partial
+        self.compression_level = compression_level
+        self.text = ""
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._pending = None
+        self._seq = 2
+        self._sender = asyncio.ensure_future(self._send_loop())
+        self._receiver = asyncio.ensure_future(self._receive_loop())
+
+    @property
+    def done(self) -> bool:
+        """服务端已返回最后结果或会话已出错"""
+        return self._receiver.done() or self._sender.done()
+
+    async def _send_loop(self):
+        while True:
+            message = await self._queue.get()
+            if message is None:
+                return
+            await self.ws.send(message)
+
+    async def _receive_loop(self):
+        try:
+            async for frame in self.ws:
+                response = decode_response(frame)
+                # 按需格式化，未开启DEBUG时不解压负载
+                logger.debug("收到响应: %r", response)
+                if response.failed:
+                    raise ASRError(response.error_message())
+                text = response.text
+                if text and text != self.text:
+                    self.text = text
+                    logger.info("中间识别文本: %s", text)
+                    if self.on_partial:
+                        self.on_partial(text)
+                if response.is_last_package:
+                    logger.info("收到最后包")
+                    return
+        except ProtocolError as e:
+            raise ASRError(f"响应格式错误: {e}") from e
+        except ConnectionClosed as e:
+            raise ASRError(f"WebSocket 连接已关闭: {e}") from e
+
+    def _raise_if_failed(self):
+        for task in (self._sender, self._receiver):
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def feed(self, pcm_bytes: bytes):
+        """
+        送入一段音频
+
+        为了给最后一段打结束标记，发送总是滞后一段；发送队列已满时等待
+        """
+        self._raise_if_failed()
+        if self._pending is not None:
+            await self._queue.put(encode_audio(self._pending, self._seq, last=False,
+                                                compression_level=self.compression_level))
+            self._seq += 1
+        self._pending = pcm_bytes
+
+    async def finish(self, timeout: float = 10.0) -> Optional[str]:
+        """发送最后一段并等待最终结果，超时返回已识别的文本"""
+        self._raise_if_failed()
+        if self._pending is not None:
+            await self._queue.put(encode_audio(self._pending, -self._seq, last=True,
+                                                compression_level=self.compression_level))
+            logger.info(f"音频发送完毕，共 {self._seq - 1} 段")
+            self._pending = None
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._receiver), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("未收到最后包，超时返回")
+        self._raise_if_failed()
+        return self.text or None
+
+    async def aclose(self):
+        for task in (self._sender, self._receiver):
+            task.cancel()
+        await asyncio.gather(self._sender, self._receiver, return_exceptions=True)
+        await self.ws.close()
+
+
+class QiniuASRClient:
+    """
+    七牛云ASR异步客户端
+
+    同时进行的会话数由max_sessions限制；连接池开启时会话取自预建的连接
+    """
+
+    def __init__(self, base_ws: str, api_key: str, sample_rate: int = 16000, channels: int = 1, bits: int = 16,
+                 max_sessions: int = 4, queue_size: int = 8, pool_size: int = 1, max_idle: float = 15.0,
+                 compression_level: int = 1):
+        self.url = f"{base_ws}/voice/asr"
+        self.api_key = api_key
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bits = bits
+        self.queue_size = queue_size
+        self.compression_level = compression_level
+        self._semaphore = asyncio.Semaphore(max_sessions)
+        self.pool = ASRSessionPool(self.open_connection, size=pool_size, max_idle=max_idle) if pool_size > 0 else None
+
+    def start(self):
+        """开始在后台预建会话，需在事件循环中调用"""
+        if self.pool:
+            self.pool.warm_up()
+
+    async def open_connection(self):
+        """建立WebSocket连接并完成配置交换，返回就绪的连接"""
+        try:
+            ws = await connect(self.url, additional_headers={"Authorization": "Bearer " + self.api_key},
+                               open_timeout=10)
+        except InvalidStatus as e:
+            if e.response.status_code == 403:
+                logger.error(f"Qiniu ASR 认证失败: {e}. 请检查 API Key 或配额限制")
+                raise ASRAuthError("Qiniu API 认证失败或配额超限，请检查密钥或联系 Qiniu 支持") from e
+            raise ASRError(f"WebSocket 连接失败: {e}") from e
+        logger.info("WebSocket 连接成功")
+        try:
+            await ws.send(encode_config(self.sample_rate, self.bits, self.channels))
+            response = decode_response(await asyncio.wait_for(ws.recv(), timeout=5))
+            logger.info("配置响应: %r", response)
+            if response.failed:
+                raise ASRError(response.error_message())
+        except ProtocolError as e:
+            await ws.close()
+            raise ASRError(f"配置响应格式错误: {e}") from e
+        except asyncio.TimeoutError as e:
+            await ws.close()
+            raise ASRError("配置响应超时") from e
+        except ConnectionClosed as e:
+            raise ASRError(f"配置交换时连接关闭: {e}") from e
+        except BaseException:
+            await ws.close()
+            raise
+        return ws
+
+    @contextlib.asynccontextmanager
+    async def session(self, on_partial: Callable[[str], None] = None):
+        """
+        开启一个识别会话，退出时关闭连接；任务被取消时同样会关闭连接
+
+        Args:
+            on_partial: 收到中间结果的回调，参数为当前识别文本
+        """
+        async with self._semaphore:
+            ws = self.pool.acquire() if self.pool else None
+            if ws is None:
+                ws = await self.open_connection()
+            else:
+                logger.info("使用预建的 ASR 会话")
+            session = ASRSession(ws, on_partial=on_partial, queue_size=self.queue_size,
+                                 compression_level=self.compression_level)
+            try:
+                yield session
+            finally:
+                await session.aclose()
+
+    async def recognize(self, pcm_bytes: bytes, timeout: float = 10.0,
+                        on_partial: Callable[[str], None] = None) -> Optional[str]:
+        """一次性识别整段音频"""
+        async with self.session(on_partial=on_partial) as session:
+            await session.feed(pcm_bytes)
+            return await session.finish(timeout)
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+
+
+def asr_client_settings() -> dict:
+    """
+    客户端配置，读取自环境变量QINIU_ASR_MAX_SESSIONS（同时进行的会话数）、
+    QINIU_ASR_SEND_QUEUE（每个会话待发送的音频段上限）、QINIU_ASR_COMPRESSION_LEVEL
+    （音频段gzip压缩级别，0为不压缩）及连接池配置
+    """
+    pool = asr_pool_settings()
+    return {
+        "max_sessions": int(os.getenv("QINIU_ASR_MAX_SESSIONS", "4")),
+        "queue_size": int(os.getenv("QINIU_ASR_SEND_QUEUE", "8")),
+        "compression_level": int(os.getenv("QINIU_ASR_COMPRESSION_LEVEL", "1")),
+        "pool_size": pool["size"],
+        "max_idle": pool["max_idle"],
+    }
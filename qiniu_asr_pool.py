@@ -0,0 +1,128 @@
+"""
+七牛云ASR连接池模块
+在后台预先建立WebSocket连接并完成FULL_CLIENT_REQUEST配置交换，检测到开口时直接取出就绪的会话，
+TLS握手与配置交换不再占用识别的关键路径
+"""
+import asyncio
+import collections
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from websockets.protocol import State
+
+logger = logging.getLogger(__name__)
+
+
+class ASRSessionPool:
+    """
+    预热的ASR会话池
+
+    每个会话只用于一句话的识别，取出后由调用方关闭；后台任务负责补足就绪会话，
+    并在空闲超过max_idle秒（服务端会断开长时间无音频的连接）前关闭重建
+    """
+
+    def __init__(self, open_session: Callable[[], Awaitable], size: int = 1, max_idle: float = 15.0,
+                 retry_interval: float = 5.0):
+        """
+        Args:
+            open_session: 建立连接并完成配置交换，返回就绪的连接，失败时抛出异常
+            size: 保持就绪的会话数
+            max_idle: 会话最长空闲秒数
+            retry_interval: 建立会话失败后的重试间隔（秒），避免认证失败时反复连接
+        """
+        self.open_session = open_session
+        self.size = size
+        self.max_idle = max_idle
+        self.retry_interval = retry_interval
+        self._idle = collections.deque()  # (连接, 就绪时间)
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._retry_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def warm_up(self):
+        """启动后台维护任务，需在事件循环中调用"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._maintain())
+
+    async def _maintain(self):
+        while not self._closed:
+            for ws in self._evict_stale():
+                await _close(ws)
+            if len(self._idle) < self.size and time.monotonic() >= self._retry_at:
+                try:
+                    ws = await self.open_session()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("预建ASR会话失败: %s", e)
+                    self._retry_at = time.monotonic() + self.retry_interval
+                    continue
+                if self._closed:
+                    await _close(ws)
+                    return
+                self._idle.append((ws, time.monotonic()))
+                logger.debug("ASR会话已就绪")
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _evict_stale(self):
+        """取出已断开或空闲过久的会话"""
+        now = time.monotonic()
+        stale = []
+        while self._idle and (now - self._idle[0][1] > self.max_idle or not _connected(self._idle[0][0])):
+            stale.append(self._idle.popleft()[0])
+        return stale
+
+    def acquire(self):
+        """
+        取出一个就绪的会话，没有时返回None（调用方自行建立连接）；取出后通知后台补充
+        """
+        stale = self._evict_stale()
+        ws = None
+        while self._idle:
+            candidate = self._idle.pop()[0]
+            if _connected(candidate):
+                ws = candidate
+                break
+            stale.append(candidate)
+        for item in stale:
+            asyncio.ensure_future(_close(item))
+        self._wake.set()
+        return ws
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        while self._idle:
+            await _close(self._idle.popleft()[0])
+
+
+def _connected(ws) -> bool:
+    return getattr(ws, "state", None) is State.OPEN
+
+
+async def _close(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+def asr_pool_settings() -> dict:
+    """连接池配置，读取自环境变量QINIU_ASR_POOL_SIZE（0为不使用连接池）、QINIU_ASR_POOL_MAX_IDLE"""
+    return {
+        "size": int(os.getenv("QINIU_ASR_POOL_SIZE", "1")),
+        "max_idle": float(os.getenv("QINIU_ASR_POOL_MAX_IDLE", "15")),
+    }
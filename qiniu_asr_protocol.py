@@ -0,0 +1,269 @@
+"""
+七牛云ASR二进制协议编解码模块
+消息由4字节头部（协议版本/头部长度、消息类型/标志、序列化/压缩方式、保留）、可选的序列号或错误码、
+负载长度与负载组成，整数均为大端
+
+编码使用预编译的struct布局与按消息类型预先生成的头部；解码只解析头部与定长字段，
+负载的gzip解压与JSON解析推迟到首次访问payload时进行
+"""
+import json
+import logging
+import struct
+import uuid
+import zlib
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# ---- 协议常量 ----
+PROTOCOL_VERSION = 0b0001
+FULL_CLIENT_REQUEST = 0b0001
+AUDIO_ONLY_REQUEST = 0b0010
+FULL_SERVER_RESPONSE = 0b1001
+SERVER_ACK = 0b1011
+SERVER_ERROR_RESPONSE = 0b1111
+
+NO_SEQUENCE = 0b0000
+POS_SEQUENCE = 0b0001
+LAST_PACKAGE = 0b0010
+NO_SERIALIZATION = 0b0000
+JSON_SERIALIZATION = 0b0001
+NO_COMPRESSION = 0b0000
+GZIP_COMPRESSION = 0b0001
+
+# 错误码：序列号不匹配
+MISMATCH_SEQUENCE = 45000000
+
+HEADER = struct.Struct(">BBBB")
+INT32 = struct.Struct(">i")
+UINT32 = struct.Struct(">I")
+SEQUENCE_SIZE = struct.Struct(">iI")
+CODE_SIZE = struct.Struct(">II")
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class ProtocolError(ValueError):
+    """消息不完整或格式不符"""
+
+
+def header(message_type: int, flags: int = NO_SEQUENCE, serial: int = JSON_SERIALIZATION,
+           comp: int = GZIP_COMPRESSION) -> bytes:
+    """4字节消息头部（头部长度固定为1个4字节单位）"""
+    return HEADER.pack((PROTOCOL_VERSION << 4) | 1, (message_type << 4) | flags, (serial << 4) | comp, 0)
+
+
+CONFIG_HEADER = header(FULL_CLIENT_REQUEST, POS_SEQUENCE)
+# 音频消息头部，按(是否最后一段, 是否压缩)取用
+AUDIO_HEADERS = {
+    (last, compressed): header(AUDIO_ONLY_REQUEST, POS_SEQUENCE | LAST_PACKAGE if last else POS_SEQUENCE,
+                               comp=GZIP_COMPRESSION if compressed else NO_COMPRESSION)
+    for last in (False, True) for compressed in (False, True)
+}
+
+
+def _gzip(data, level: int = 6) -> bytes:
+    # 等同gzip.compress(mtime=0)，省去GzipFile的封装
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def encode_config(sample_rate: int, bits: int, channels: int, uid: str = None) -> bytes:
+    """FULL_CLIENT_REQUEST配置消息（序列号1）"""
+    request = {
+        "user": {"uid": uid or str(uuid.uuid4())},
+        "audio": {
+            "format": "pcm",
+            "sample_rate": sample_rate,
+            "bits": bits,
+            "channel": channels,
+            "codec": "raw",
+        },
+        "request": {"model_name": "asr", "enable_punc": True}
+    }
+    payload = _gzip(json.dumps(request).encode('utf-8'))
+    return b"".join((CONFIG_HEADER, SEQUENCE_SIZE.pack(1, len(payload)), payload))
+
+
+def encode_audio(pcm_bytes: bytes, seq: int, last: bool, compression_level: int = 1) -> bytes:
+    """
+    AUDIO_ONLY_REQUEST音频消息
+
+    Args:
+        pcm_bytes: 本段PCM数据
+        seq: 序列号，音频分段从2开始递增，最后一段取负值
+        last: 是否为最后一段
+        compression_level: 每段独立gzip压缩的级别，0表示不压缩直接发送PCM
+    """
+    compressed = compression_level > 0
+    payload = _gzip(pcm_bytes, compression_level) if compressed else pcm_bytes
+    return b"".join((AUDIO_HEADERS[last, compressed], SEQUENCE_SIZE.pack(seq, len(payload)), payload))
+
+
+def encode_response(message_type: int, payload=None, sequence: int = None, last: bool = False, code: int = 0,
+                    ack_sequence: int = 0, serial: int = JSON_SERIALIZATION, comp: int = GZIP_COMPRESSION) -> bytes:
+    """
+    服务端消息，用于模拟服务端与编解码自检
+
+    Args:
+        payload: JSON序列化时为任意可序列化对象，否则为字符串或字节
+        sequence: 带序列号时的序列号，None表示不带
+    """
+    if serial == JSON_SERIALIZATION:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b""
+    elif isinstance(payload, str):
+        body = payload.encode('utf-8')
+    else:
+        body = bytes(payload or b"")
+    if comp == GZIP_COMPRESSION and body:
+        body = _gzip(body)
+    flags = (POS_SEQUENCE if sequence is not None else NO_SEQUENCE) | (LAST_PACKAGE if last else NO_SEQUENCE)
+    parts = [header(message_type, flags, serial, comp)]
+    if sequence is not None:
+        parts.append(INT32.pack(sequence))
+    if message_type == SERVER_ERROR_RESPONSE:
+        parts.append(CODE_SIZE.pack(code, len(body)))
+    elif message_type == SERVER_ACK:
+        parts.append(SEQUENCE_SIZE.pack(ack_sequence, len(body)))
+    else:
+        parts.append(UINT32.pack(len(body)))
+    parts.append(body)
+    return b"".join(parts)
+
+
+_UNDECODED = object()
+
+
+class Response:
+    """
+    解码后的服务端消息
+
+    构造时只解析头部与定长字段，payload首次访问时才解压并解析JSON，结果缓存
+    """
+
+    __slots__ = ("message_type", "flags", "serial", "comp", "sequence", "ack_sequence", "code", "_raw", "_payload")
+
+    def __init__(self, message_type: int = None, flags: int = NO_SEQUENCE, serial: int = NO_SERIALIZATION,
+                 comp: int = NO_COMPRESSION, raw=b"", payload=_UNDECODED):
+        self.message_type = message_type
+        self.flags = flags
+        self.serial = serial
+        self.comp = comp
+        self.sequence: Optional[int] = None       # 标志位带序列号时的序列号
+        self.ack_sequence: Optional[int] = None   # SERVER_ACK确认的序列号
+        self.code: Optional[int] = None           # SERVER_ERROR_RESPONSE的错误码
+        self._raw = raw
+        self._payload = payload
+
+    @property
+    def is_last_package(self) -> bool:
+        return bool(self.flags & LAST_PACKAGE)
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.code)
+
+    @property
+    def raw(self) -> bytes:
+        """未解压的原始负载"""
+        return bytes(self._raw)
+
+    @property
+    def payload(self):
+        """负载：JSON解析后的对象、字符串，空负载为None；解压或解析失败时保留原始数据"""
+        if self._payload is _UNDECODED:
+            self._payload = self._decode()
+        return self._payload
+
+    def _decode(self):
+        raw = self._raw
+        if not raw:
+            return None
+        if self.comp == GZIP_COMPRESSION:
+            try:
+                raw = zlib.decompress(raw, _GZIP_WBITS)
+            except zlib.error as e:
+                logger.error("GZIP 解压失败: %s", e)
+                return bytes(raw)
+        if self.serial == JSON_SERIALIZATION:
+            try:
+                return json.loads(bytes(raw))
+            except ValueError as e:
+                logger.error("JSON 解析失败: %s", e)
+                return bytes(raw)
+        return bytes(raw).decode('utf-8', errors='ignore')
+
+    @property
+    def text(self) -> Optional[str]:
+        """识别文本，位于result.text或data.result.text"""
+        msg = self.payload
+        if not isinstance(msg, dict):
+            return None
+        result = msg.get('result')
+        if not isinstance(result, dict):
+            data = msg.get('data')
+            result = data.get('result') if isinstance(data, dict) else None
+        if isinstance(result, dict) and 'text' in result:
+            return result['text']
+        return None
+
+    def error_message(self) -> str:
+        payload = self.payload
+        error_msg = payload.get('error', '未知错误') if isinstance(payload, dict) else (payload or '未知错误')
+        if self.code == MISMATCH_SEQUENCE and 'mismatch sequence' in str(error_msg):
+            error_msg = f"{error_msg}（序列号不匹配，请检查配置消息和音频消息的seq设置）"
+        return f"服务端错误: 错误码={self.code}, 信息={error_msg}"
+
+    def __repr__(self) -> str:
+        return (f"Response(type={self.message_type}, flags={self.flags:#06b}, sequence={self.sequence}, "
+                f"ack_sequence={self.ack_sequence}, code={self.code}, payload={self.payload!r})")
+
+
+def decode_response(data) -> Response:
+    """
+    解码一条WebSocket消息
+
+    文本消息原样作为payload；二进制消息只解析定长字段，负载保留为切片
+
+    Raises:
+        ProtocolError: 消息不完整或长度字段超出消息
+    """
+    if isinstance(data, str):
+        return Response(payload=data)
+    view = memoryview(data)
+    size = len(view)
+    if size < HEADER.size:
+        raise ProtocolError(f"消息长度 {size} 不足4字节头部")
+    first, type_flags, serial_comp, _ = HEADER.unpack_from(view)
+    offset = (first & 0x0f) * 4
+    if offset < HEADER.size or offset > size:
+        raise ProtocolError(f"头部长度 {offset} 无效")
+    response = Response(type_flags >> 4, type_flags & 0x0f, serial_comp >> 4, serial_comp & 0x0f)
+    message_type = response.message_type
+    try:
+        if response.flags & POS_SEQUENCE:
+            response.sequence = INT32.unpack_from(view, offset)[0]
+            offset += 4
+        if message_type in (FULL_SERVER_RESPONSE, FULL_CLIENT_REQUEST, AUDIO_ONLY_REQUEST):
+            length = UINT32.unpack_from(view, offset)[0]
+            offset += 4
+        elif message_type in (SERVER_ACK, SERVER_ERROR_RESPONSE):
+            if message_type == SERVER_ACK:
+                response.ack_sequence = INT32.unpack_from(view, offset)[0]
+            else:
+                response.code = UINT32.unpack_from(view, offset)[0]
+            offset += 4
+            # 确认与错误消息可以不带负载长度
+            length = 0
+            if size - offset >= 4:
+                length = UINT32.unpack_from(view, offset)[0]
+                offset += 4
+        else:
+            logger.warning("未知消息类型: %s", message_type)
+            length = size - offset
+    except struct.error as e:
+        raise ProtocolError(f"消息类型 {message_type} 的定长字段不完整") from e
+    if offset + length > size:
+        raise ProtocolError(f"负载长度 {length} 超出消息剩余的 {size - offset} 字节")
+    response._raw = view[offset:offset + length]
+    return response
@@ -0,0 +1,180 @@
+"""
+输入框联想模块
+停止输入（防抖）后解析输入框中的文本：起终点交给地点预解析器提前解析，提交时坐标已经就绪；
+正在输入的地点片段从本地已解析过的地点与地图输入提示接口取得候选，在补全弹窗中显示
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from PySide6.QtCore import QObject, QStringListModel, QTimer, Signal
+from PySide6.QtWidgets import QCompleter, QLineEdit
+
+from amap_service import get_amap_location_service
+from baidu_service import get_baidu_location_service
+from command_grammar import parse_command
+from concurrency import get_executor
+from local_cache import get_place_cache
+from place_speculation import MIN_PLACE_LENGTH
+
+logger = logging.getLogger(__name__)
+
+
+def completion_fragment(text: str) -> Tuple[str, str]:
+    """
+    拆出句尾正在输入的地点片段
+
+    Returns:
+        (片段之前的文本, 地点片段)，没有可补全的片段时片段为空字符串
+    """
+    text = text.rstrip()
+    command = parse_command(text)
+    if command["structure"] is None:
+        # "从人民"之类尚未出现"到/去"的起点
+        index = text.rfind("从")
+        fragment = text[index + 1:] if index >= 0 else ""
+    else:
+        fragment = command["end_point"] or ""
+    if not fragment or not text.endswith(fragment):
+        return text, ""
+    return text[:len(text) - len(fragment)], fragment
+
+
+class TypeAheadEngine(QObject):
+    """
+    输入框的防抖联想
+
+    每次编辑重新计时，停止输入debounce_ms毫秒后处理最新文本；候选在线程池中查询，
+    查询期间文本又被编辑时结果按代号作废，不会覆盖较新的候选
+    """
+
+    _suggested = Signal(int, str, list)  # 代号, 片段之前的文本, 候选地点名
+
+    def __init__(self, line_edit: QLineEdit, nav_service, provider: Callable[[], str], speculator=None,
+                 debounce_ms: int = 250, max_suggestions: int = 8):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.nav_service = nav_service
+        self.provider = provider  # 返回当前地图类型
+        self.speculator = speculator
+        self.max_suggestions = max_suggestions
+        self._generation = 0
+        self._tips: "OrderedDict[Tuple[str, str], List[str]]" = OrderedDict()  # (地图类型, 片段) -> 输入提示
+        self._tips_lock = threading.Lock()
+
+        self._model = QStringListModel(self)
+        # 不通过setCompleter挂到输入框，避免补全器按自身规则改写输入；候选由本引擎决定
+        self.completer = QCompleter(self._model, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setWidget(line_edit)
+        self.completer.activated.connect(self._on_activated)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._on_settled)
+        self._suggested.connect(self._show)
+        # 只响应用户编辑，语音识别写入输入框的文字不触发联想
+        line_edit.textEdited.connect(self._on_edited)
+
+    def cancel(self):
+        """放弃尚未处理的输入与正在查询的候选（提交或开始语音输入时调用）"""
+        self._timer.stop()
+        self._generation += 1
+        self.completer.popup().hide()
+
+    def _on_edited(self, text: str):
+        self._generation += 1
+        if text.strip():
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self.completer.popup().hide()
+
+    def _on_activated(self, text: str):
+        self.line_edit.setText(text)
+        self._timer.stop()
+        self._generation += 1
+        self._warm(text)
+
+    def _on_settled(self):
+        text = self.line_edit.text()
+        self._warm(text)
+        prefix, fragment = completion_fragment(text)
+        if not fragment:
+            self.completer.popup().hide()
+            return
+        generation = self._generation
+        future = get_executor("request").submit(self._lookup, self.provider(), fragment)
+        future.add_done_callback(lambda f: self._deliver(f, generation, prefix))
+
+    def _warm(self, text: str):
+        """把输入框中的起终点交给地点预解析器"""
+        if self.speculator is None:
+            return
+        provider = self.provider()
+        if self.speculator.provider != provider:
+            self.speculator.reset(provider)
+        self.speculator.update(text, settled=True)
+
+    def _deliver(self, future, generation: int, prefix: str):
+        # 在线程池中调用，经信号转到界面线程
+        if future.cancelled() or future.exception() is not None:
+            if not future.cancelled():
+                logger.warning("查询输入候选失败: %s", future.exception())
+            return
+        self._suggested.emit(generation, prefix, future.result())
+
+    def _show(self, generation: int, prefix: str, names: List[str]):
+        if generation != self._generation or not self.line_edit.isEnabled():
+            return
+        current = self.line_edit.text().rstrip()
+        items = [prefix + name for name in names if prefix + name != current]
+        if not items:
+            self.completer.popup().hide()
+            return
+        self._model.setStringList(items)
+        self.completer.complete()
+
+    def _lookup(self, provider: str, fragment: str) -> List[str]:
+        """本地已解析过的地点在前，其后为地图输入提示"""
+        names = []
+        cache = get_place_cache()
+        if cache:
+            names.extend(cache.recent_names(provider, fragment, self.max_suggestions))
+        if len(fragment) >= MIN_PLACE_LENGTH:
+            names.extend(name for name in self._input_tips(provider, fragment) if name not in names)
+        return names[:self.max_suggestions]
+
+    def _input_tips(self, provider: str, fragment: str) -> List[str]:
+        key = (provider, fragment)
+        with self._tips_lock:
+            if key in self._tips:
+                self._tips.move_to_end(key)
+                return self._tips[key]
+        if provider == "baidu":
+            tips = get_baidu_location_service(self.nav_service.baidu_api_key).input_tips(fragment)
+        else:
+            tips = get_amap_location_service(self.nav_service.amap_api_key).input_tips(fragment)
+        names = list(dict.fromkeys(tip["name"] for tip in tips))
+        if not names:
+            return names
+        with self._tips_lock:
+            self._tips[key] = names
+            while len(self._tips) > 128:
+                self._tips.popitem(last=False)
+        return names
+
+
+def type_ahead_settings() -> Dict:
+    """
+    读取环境变量NAV_TYPEAHEAD（设为0关闭输入联想）、NAV_TYPEAHEAD_DEBOUNCE_MS（停止输入多久后处理）、
+    NAV_TYPEAHEAD_MAX_SUGGESTIONS（补全弹窗的最多候选数）
+    """
+    return {
+        "enabled": os.getenv("NAV_TYPEAHEAD", "1") != "0",
+        "debounce_ms": int(os.getenv("NAV_TYPEAHEAD_DEBOUNCE_MS", "250")),
+        "max_suggestions": int(os.getenv("NAV_TYPEAHEAD_MAX_SUGGESTIONS", "8")),
+    }
@@ -1,23 +1,36 @@
-import speech_recognition as sr
 import logging
-import re
 import asyncio
-import gzip
-import json
+import threading
 import time
-import uuid
-import websocket
 import os
-from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from audio_capture import MicrophoneStream, microphone_settings
+from command_grammar import parse_command
+from endpointing import Endpointer, endpoint_settings
+from qiniu_asr_client import ASRError, QiniuASRClient, asr_client_settings
+from wake_word import get_wake_word_detector
+
 
 # 配置日志级别
 logging.basicConfig(level=logging.DEBUG)
 
 class VoiceRecognitionService:
+    """
+    语音识别服务
+
+    七牛云ASR会话运行在服务自带的常驻事件循环中（见submit），多个识别可以同时进行
+    """
+
     def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.pause_threshold = 1.0
+        # 逐帧端点检测：句尾静音至少end_silence秒，随句内停顿自适应增长，最多pause_threshold秒
+        self.end_silence = endpoint_settings()["end_silence"]
+        self.pause_threshold = 1.0
+        # 唤醒词阶段使用更短的停顿，"任意门"说完即结束本段，紧接着的指令留给指令识别
+        self.wake_pause_threshold = 0.4
+        # 指令识别的累计统计：上传字节、相比固定阈值节省的字节、说完到出结果的延迟
+        self.endpoint_stats = {"utterances": 0, "uploaded_bytes": 0, "saved_bytes": 0, "latency_ms_total": 0.0}
+        # 开口前附带的音频（秒），避免截掉第一个字
+        self.pre_roll_seconds = float(os.environ.get("VOICE_PRE_ROLL_MS", "500")) / 1000
         self.wake_word = "任意门"
         self.qiniu_base_ws = os.environ.get("QINIU_OPENAI_BASE_WS", "wss://openai.qiniu.com/v1")
         self.qiniu_api_key = os.environ.get("QINIU_OPENAI_API_KEY")
@@ -27,337 +40,325 @@ class VoiceRecognitionService:
         self.channels = int(os.environ.get("QINIU_ASR_CHANNELS", "1"))
         self.bits = int(os.environ.get("QINIU_ASR_BITS", "16"))
         self.seg_duration_ms = int(os.environ.get("QINIU_ASR_SEG_DURATION_MS", "300"))
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        # 流式识别：边说边按seg_duration_ms分段上传，设为0时录完整句再一次性上传
+        self.streaming = os.environ.get("QINIU_ASR_STREAMING", "1") != "0"
+        # 本地唤醒词检测，通过后才发送到云端确认
+        self.wake_detector = get_wake_word_detector(self.sample_rate)
+        # 常驻麦克风流，首次监听时打开；唤醒词与指令识别共用
+        self.microphone: Optional[MicrophoneStream] = None
+        self._microphone_lock = threading.Lock()
+        self._consumed = 0       # 已被某次识别读取的音频末尾位置
+        self._last_end = 0       # 最近一次采集结束的位置
+        self._resume_at = None   # 检测到唤醒词后，指令识别从此位置开始读取
+        # submit()允许多个识别同时进行，以上三个读取位置由此锁保护
+        self._position_lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, name="voice-recognition-loop", daemon=True)
+        self._loop_thread.start()
+        self.client = None
+        if self.qiniu_api_key:
+            self.client = QiniuASRClient(
+                self.qiniu_base_ws, self.qiniu_api_key,
+                sample_rate=self.sample_rate, channels=self.channels, bits=self.bits,
+                **asr_client_settings(),
+            )
+            # 预建并完成配置交换的ASR会话，开口时直接使用
+            self.loop.call_soon_threadsafe(self.client.start)
+
+    def submit(self, coro):
+        """
+        在服务的事件循环中运行协程，返回concurrent.futures.Future；
+        调用future.cancel()即可取消识别并关闭对应的连接
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        if self.client:
+            try:
+                self.submit(self.client.close()).result(timeout=2)
+            except Exception as e:
+                logging.warning(f"关闭 ASR 客户端失败: {e}")
+        if self.microphone:
+            self.microphone.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def listen_and_recognize(self, timeout=5, phrase_time_limit=10, on_partial=None):
+        """
+        监听一句语音并识别，需在服务的事件循环中运行（见submit）
 
-    async def listen_and_recognize(self, timeout=5, phrase_time_limit=10):
+        Args:
+            timeout: 等待开始说话的秒数
+            phrase_time_limit: 单句最长秒数
+            on_partial: 收到中间结果的回调，参数为当前识别文本
+        """
+        if not self.client:
+            logging.error("缺少 Qiniu API Key，无法进行语音识别")
+            return None
         try:
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                logging.info("开始监听麦克风...")
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-                pcm_data = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=self.bits // 8)
-                logging.info(f"音频参数: 采样率={self.sample_rate}, 位深={self.bits}, 通道数={self.channels}, 数据长度={len(pcm_data)}")
-                if len(pcm_data) == 0:
-                    logging.warning("录制音频数据为空")
+            if self.streaming:
+                text = await self._recognize_streaming(timeout, phrase_time_limit, on_partial=on_partial)
+            else:
+                pcm_data, utterance = await asyncio.to_thread(self._record_phrase, timeout, phrase_time_limit)
+                if not pcm_data:
                     return None
-
-            if self.qiniu_api_key:
                 logging.info("发送到 Qiniu ASR...")
-                text = await self._qiniu_asr_stream_once(pcm_data)
-                if text:
-                    logging.info(f"Qiniu 识别结果: {text}")
-                    return text
-                else:
-                    logging.error("Qiniu ASR 未返回有效结果")
-                    return None
-            else:
-                logging.error("缺少 Qiniu API Key，无法进行语音识别")
-                return None
-        except sr.WaitTimeoutError:
-            logging.warning("语音监听超时")
-            return None
-        except sr.UnknownValueError:
-            logging.warning("无法识别语音")
+                text = await self.client.recognize(pcm_data, timeout=10.0, on_partial=on_partial)
+                self._report_endpoint(utterance)
+        except ASRError as e:
+            logging.error(f"Qiniu ASR 执行失败: {e}")
             return None
         except Exception as e:
             logging.error(f"语音识别出错: {e}")
             return None
+        if text:
+            logging.info(f"Qiniu 识别结果: {text}")
+        else:
+            logging.error("Qiniu ASR 未返回有效结果")
+        return text
 
     async def listen_for_wake_word(self, timeout=5, phrase_time_limit=5):
+        """
+        监听唤醒词，需在服务的事件循环中运行（见submit）
+
+        开启本地检测时，录音先经本地VAD、时长过滤与模板匹配，通过后才发送到云端确认
+        """
+        if not self.client:
+            logging.error("缺少 Qiniu API Key，无法检测唤醒词")
+            return False
         try:
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                logging.info("开始监听唤醒词...")
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-                pcm_data = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=self.bits // 8)
-                logging.info(f"音频参数: 采样率={self.sample_rate}, 位深={self.bits}, 通道数={self.channels}, 数据长度={len(pcm_data)}")
-                if len(pcm_data) == 0:
-                    logging.warning("录制音频数据为空")
+            if self.wake_detector is not None:
+                pcm_data, _ = await asyncio.to_thread(
+                    self._record_phrase, timeout, phrase_time_limit, self.wake_pause_threshold)
+                if not pcm_data:
                     return False
-
-                if self.qiniu_api_key:
-                    logging.info("发送到 Qiniu ASR 检测唤醒词...")
-                    text = await self._qiniu_asr_stream_once(pcm_data, is_wake_word=True)
-                    if text and ("任意门" in text.lower() or "任意" in text.lower() or "hi" in text.lower()):
-                        logging.info(f"检测到唤醒词: {text}")
-                        return True
+                local = await asyncio.to_thread(self.wake_detector.detect, pcm_data)
+                logging.debug(f"本地唤醒词检测: {local}")
+                if not local["accepted"]:
                     return False
-                else:
-                    logging.error("缺少 Qiniu API Key，无法检测唤醒词")
+                logging.info("本地检测通过，发送到 Qiniu ASR 确认唤醒词...")
+                text = await self.client.recognize(pcm_data, timeout=5.0)
+            elif self.streaming:
+                text = await self._recognize_streaming(timeout, phrase_time_limit, is_wake_word=True)
+            else:
+                pcm_data, _ = await asyncio.to_thread(self._record_phrase, timeout, phrase_time_limit)
+                if not pcm_data:
                     return False
-        except sr.WaitTimeoutError:
-            logging.debug("唤醒词监听超时")
-            return False
-        except sr.UnknownValueError:
-            logging.debug("无法识别唤醒词")
-            return False
+                logging.info("发送到 Qiniu ASR 检测唤醒词...")
+                text = await self.client.recognize(pcm_data, timeout=5.0)
         except Exception as e:
             logging.error(f"唤醒词检测出错: {e}")
             return False
+        if text and self._is_wake_word(text):
+            logging.info(f"检测到唤醒词: {text}")
+            # 唤醒词之后紧接着说的指令已在缓冲区中，指令识别从这里接着读
+            with self._position_lock:
+                self._resume_at = self._last_end
+            return True
+        return False
+
+    def _get_microphone(self) -> MicrophoneStream:
+        with self._microphone_lock:
+            if self.microphone is None:
+                microphone = MicrophoneStream(sample_rate=self.sample_rate, **microphone_settings())
+                microphone.start()
+                self.microphone = microphone
+            return self.microphone
+
+    def _record_phrase(self, timeout, phrase_time_limit, pause_threshold=None):
+        """从麦克风流读取一整句语音，返回(PCM数据, 端点检测统计)"""
+        parts = []
+
+        def emit(segment):
+            if segment is not None:
+                parts.append(segment)
 
-    # ---- Qiniu ASR 常量定义 ----
-    PROTOCOL_VERSION = 0b0001
-    FULL_CLIENT_REQUEST = 0b0001
-    AUDIO_ONLY_REQUEST = 0b0010
-    FULL_SERVER_RESPONSE = 0b1001
-    SERVER_ACK = 0b1011
-    SERVER_ERROR_RESPONSE = 0b1111
-
-    NO_SEQUENCE = 0b0000
-    POS_SEQUENCE = 0b0001
-    JSON_SERIALIZATION = 0b0001
-    GZIP_COMPRESSION = 0b0001
-
-    def _gen_header(self, message_type=FULL_CLIENT_REQUEST,
-                    message_type_specific_flags=NO_SEQUENCE,
-                    serial=JSON_SERIALIZATION,
-                    comp=GZIP_COMPRESSION,
-                    reserved=0x00):
-        header = bytearray()
-        header_size = 1
-        header.append((self.PROTOCOL_VERSION << 4) | header_size)
-        header.append((message_type << 4) | message_type_specific_flags)
-        header.append((serial << 4) | comp)
-        header.append(reserved)
-        logging.debug(f"生成头部: {header}")
-        return header
-
-    def _gen_before_payload(self, sequence: int):
-        b = bytearray()
-        b.extend(sequence.to_bytes(4, 'big', signed=True))
-        logging.debug(f"生成序列号: {sequence}")
-        return b
-
-    def _parse_response(self, res):
-        logging.debug(f"原始响应数据: {res}")
-        if not isinstance(res, bytes):
-            return {'payload_msg': res}
-        header_size = res[0] & 0x0f
-        message_type = res[1] >> 4
-        flags = res[1] & 0x0f
-        serial = res[2] >> 4
-        comp = res[2] & 0x0f
-        payload = res[header_size * 4:]
-        result = {}
-        if flags & 0x01:
-            seq = int.from_bytes(payload[:4], 'big', signed=True)
-            result['payload_sequence'] = seq
-            payload = payload[4:]
-        result['is_last_package'] = bool(flags & 0x02)
-        logging.debug(f"消息类型: {message_type}, 是否最后包: {result['is_last_package']}")
-        if message_type == self.FULL_SERVER_RESPONSE:
-            payload_size = int.from_bytes(payload[:4], 'big', signed=True)
-            payload_msg = payload[4:4 + payload_size]
-        elif message_type == self.SERVER_ACK:
-            seq = int.from_bytes(payload[:4], 'big', signed=True)
-            result['seq'] = seq
-            if len(payload) >= 8:
-                payload_size = int.from_bytes(payload[4:8], 'big', signed=False)
-                payload_msg = payload[8:8 + payload_size]
+        utterance = self._capture_segments(emit, threading.Event(), timeout, phrase_time_limit, pause_threshold)
+        pcm_data = b"".join(parts)
+        logging.info(f"音频参数: 采样率={self.sample_rate}, 位深={self.bits}, 通道数={self.channels}, 数据长度={len(pcm_data)}")
+        return pcm_data, utterance
+
+    @staticmethod
+    def _is_wake_word(text: str) -> bool:
+        text = text.lower()
+        return "任意门" in text or "任意" in text or "hi" in text
+
+    def _segment_bytes(self) -> int:
+        return self.sample_rate * self.channels * (self.bits // 8) * self.seg_duration_ms // 1000
+
+    def _capture_segments(self, emit: Callable[[Optional[bytes]], None], stop: threading.Event, timeout,
+                          phrase_time_limit, pause_threshold=None) -> Optional[Dict]:
+        """
+        从麦克风流的环形缓冲区读取一句话，逐帧做端点检测，裁剪静音后按seg_duration_ms切段交给emit
+
+        从上一次识别读到的位置之后开始找开口（检测到唤醒词后紧接着说的指令不会丢失），最多回看
+        pre_roll_seconds秒；句尾静音达到自适应阈值（不超过pause_threshold，默认self.pause_threshold）
+        或达到phrase_time_limit时结束。结束时以None调用emit，超时仍未检测到语音时直接以None调用
+
+        Returns:
+            本句的端点检测统计，未检测到语音时为None
+        """
+        microphone = self._get_microphone()
+        chunk = microphone.chunk_bytes
+        rate = microphone.bytes_per_second
+        segment_size = self._segment_bytes()
+        pre_roll = int(self.pre_roll_seconds * rate) // 2 * 2
+        if pause_threshold is None:
+            pause_threshold = self.pause_threshold
+        endpointer = Endpointer(self.sample_rate, noise_floor=microphone.noise_floor,
+                                end_silence=min(self.end_silence, pause_threshold), max_end_silence=pause_threshold)
+
+        now = microphone.position
+        with self._position_lock:
+            if self._resume_at is not None and now - self._resume_at <= rate * 5:
+                start = self._resume_at
             else:
-                payload_msg = b""
-        elif message_type == self.SERVER_ERROR_RESPONSE:
-            code = int.from_bytes(payload[:4], 'big', signed=False)
-            result['code'] = code
-            payload_size = int.from_bytes(payload[4:8], 'big', signed=False)
-            payload_msg = payload[8:8 + payload_size]
-        else:
-            payload_msg = payload
-            logging.warning(f"未知消息类型: {message_type}")
-        if comp == self.GZIP_COMPRESSION:
-            try:
-                payload_msg = gzip.decompress(payload_msg)
-                logging.debug("GZIP 解压成功")
-            except Exception as e:
-                logging.error(f"GZIP 解压失败: {e}")
-        if serial == self.JSON_SERIALIZATION:
-            try:
-                payload_text = payload_msg.decode('utf-8')
-                payload_msg = json.loads(payload_text)
-                logging.debug(f"JSON 解析: {payload_msg}")
-            except Exception as e:
-                logging.error(f"JSON 解析失败: {e}")
-        else:
-            payload_msg = payload_msg.decode('utf-8', errors='ignore')
-        result['payload_msg'] = payload_msg
-        return result
+                start = max(now - pre_roll, self._consumed)
+            self._resume_at = None
+        cursor = start
+        deadline = now + int(timeout * rate) if timeout else None
+        buffer = bytearray()
+        try:
+            while not stop.is_set():
+                data = microphone.read(cursor, chunk)
+                cursor += chunk
+                buffer.extend(endpointer.feed(data))
+                if not endpointer.started:
+                    if deadline is not None and cursor > deadline:
+                        logging.debug("语音监听超时")
+                        return None
+                    continue
+                if endpointer.ended:
+                    break
+                if phrase_time_limit and endpointer.position - endpointer.onset > phrase_time_limit * rate:
+                    break
+                ready = len(buffer) - len(buffer) % segment_size
+                if ready:
+                    self._emit_segments(emit, buffer, ready, segment_size)
+                    del buffer[:ready]
+            if not endpointer.started:
+                return None
+            buffer.extend(endpointer.finish())
+            self._emit_segments(emit, buffer, len(buffer), segment_size)
+            return self._utterance_stats(endpointer, start, microphone, pre_roll, pause_threshold)
+        finally:
+            # 句尾之后多读的音频留给下一次识别
+            end = start + endpointer.position if endpointer.ended else cursor
+            with self._position_lock:
+                self._last_end = end
+                self._consumed = max(self._consumed, end)
+            emit(None)
 
-    async def _qiniu_asr_stream_once(self, pcm_bytes: bytes, is_wake_word=False) -> str | None:
-        if not self.qiniu_api_key:
-            logging.error("缺少 Qiniu API Key，请检查环境变量 QINIU_OPENAI_API_KEY")
-            return None
-        ws_url = f"{self.qiniu_base_ws}/voice/asr"
-        headers = ["Authorization: Bearer " + self.qiniu_api_key]
-        uid = str(uuid.uuid4())
-        logging.info(f"生成 UID: {uid}")
-        req = {
-            "user": {"uid": uid},
-            "audio": {
-                "format": "pcm",
-                "sample_rate": self.sample_rate,
-                "bits": self.bits,
-                "channel": self.channels,
-                "codec": "raw",
-            },
-            "request": {"model_name": "asr", "enable_punc": True}
+    @staticmethod
+    def _emit_segments(emit: Callable[[Optional[bytes]], None], buffer: bytearray, size: int, segment_size: int):
+        """把buffer前size字节按segment_size切段交给emit，每段只复制一次"""
+        with memoryview(buffer) as view:
+            for offset in range(0, size, segment_size):
+                emit(bytes(view[offset:min(offset + segment_size, size)]))
+
+    def _utterance_stats(self, endpointer: Endpointer, start: int, microphone: MicrophoneStream,
+                         pre_roll: int, pause_threshold: float) -> Dict:
+        rate = microphone.bytes_per_second
+        speech_bytes = endpointer.speech_end - endpointer.onset
+        # 对比固定阈值：开口前pre_roll与句尾pause_threshold秒静音全部上传
+        baseline = min(endpointer.onset, pre_roll) + speech_bytes + int(pause_threshold * rate)
+        return {
+            "speech_seconds": speech_bytes / rate,
+            "end_silence_seconds": endpointer.required_silence() / rate,
+            "uploaded_bytes": endpointer.uploaded_bytes,
+            "saved_bytes": max(0, baseline - endpointer.uploaded_bytes),
+            # 说完话的时刻，按缓冲区中的位置换算
+            "speech_end_time": time.monotonic() - (microphone.position - start - endpointer.speech_end) / rate,
         }
-        payload_bytes = gzip.compress(json.dumps(req).encode('utf-8'))
-        seq = 1
-        init_msg = bytearray(self._gen_header(message_type=self.FULL_CLIENT_REQUEST, message_type_specific_flags=self.POS_SEQUENCE))
-        init_msg.extend(self._gen_before_payload(sequence=seq))
-        init_msg.extend(len(payload_bytes).to_bytes(4, 'big'))
-        init_msg.extend(payload_bytes)
-        logging.info(f"发送配置消息，序列号: {seq}")
-
-        def sync_websocket():
-            ws = websocket.WebSocket()
-            try:
-                ws.connect(ws_url, header=headers, timeout=10)
-                logging.info("WebSocket 连接成功")
-                ws.settimeout(5)
-                ws.send_binary(init_msg)
-                try:
-                    res = ws.recv()
-                    parsed = self._parse_response(res)
-                    logging.info(f"配置响应: {parsed}")
-                    if 'code' in parsed and parsed['code'] != 0:
-                        logging.error(f"配置错误码: {parsed['code']}, 错误信息: {parsed['payload_msg'].get('error', '未知错误')}")
-                        return None
-                except websocket.WebSocketTimeoutException:
-                    logging.warning("配置响应超时")
-                    return None
-                except websocket.WebSocketConnectionClosedException:
-                    logging.warning("WebSocket 连接关闭")
-                    return None
-                except Exception as e:
-                    logging.warning(f"配置响应失败: {e}")
-                    return None
 
-                seq_inner = -2  # 匹配服务端期望的autoAssignedSequence (-2)
-                compressed_chunk = gzip.compress(pcm_bytes)
-                audio_msg = bytearray(self._gen_header(
-                    message_type=self.AUDIO_ONLY_REQUEST,
-                    message_type_specific_flags=self.POS_SEQUENCE | 0x02
-                ))
-                audio_msg.extend(self._gen_before_payload(sequence=seq_inner))
-                audio_msg.extend(len(compressed_chunk).to_bytes(4, 'big'))
-                audio_msg.extend(compressed_chunk)
-                logging.info(f"发送音频数据，长度: {len(compressed_chunk)} 字节, 序列号: {seq_inner}")
-                ws.send_binary(audio_msg)
-
-                final_text = ""
-                begin = time.time()
-                timeout = 10.0 if not is_wake_word else 5.0
-                while time.time() - begin < timeout:
-                    try:
-                        res = ws.recv()
-                        parsed = self._parse_response(res)
-                        logging.info(f"收到响应: {parsed}")
-                        if 'code' in parsed and parsed['code'] != 0:
-                            error_msg = parsed['payload_msg'].get('error', '未知错误')
-                            logging.error(f"服务端错误: 错误码={parsed['code']}, 信息={error_msg}")
-                            if parsed['code'] == 45000000 and 'mismatch sequence' in error_msg:
-                                logging.error("序列号不匹配错误 (45000000)，请检查配置消息和音频消息的seq设置或联系七牛支持")
-                            return None
-                        msg = parsed.get('payload_msg')
-                        if isinstance(msg, dict):
-                            text = None
-                            if 'result' in msg and 'text' in msg['result']:
-                                text = msg['result']['text']
-                            elif 'data' in msg and 'result' in msg['data'] and 'text' in msg['data']['result']:
-                                text = msg['data']['result']['text']
-                            if text:
-                                final_text = text
-                                logging.info(f"中间识别文本: {text}")
-                                if is_wake_word and ("任意门" in text.lower() or "任意" in text.lower() or "hi" in text.lower()):
-                                    return final_text
-                        if parsed.get('is_last_package'):
-                            logging.info("收到最后包")
-                            return final_text if final_text else None
-                    except websocket.WebSocketTimeoutException:
-                        logging.warning("接收响应超时，退出循环")
-                        break
-                    except websocket.WebSocketConnectionClosedException:
-                        logging.warning("WebSocket 连接已关闭，退出循环")
-                        break
-                    except Exception as e:
-                        logging.warning(f"接收响应失败: {e}")
-                        continue
-                logging.warning("未收到最后包，超时返回")
-                return final_text if final_text else None
-            except websocket.WebSocketException as e:
-                if "403 Forbidden" in str(e):
-                    logging.error(f"Qiniu ASR 认证失败: {e}. 请检查 API Key 或配额限制")
-                    raise Exception("Qiniu API 认证失败或配额超限，请检查密钥或联系 Qiniu 支持")
-                else:
-                    logging.error(f"WebSocket 连接或发送失败: {e}")
-                    return None
-            finally:
-                ws.close()
-                logging.debug("WebSocket 连接已关闭")
+    def _report_endpoint(self, utterance: Optional[Dict]):
+        """记录一次指令识别的上传字节与说完到出结果的延迟"""
+        if not utterance:
+            return
+        latency_ms = (time.monotonic() - utterance["speech_end_time"]) * 1000
+        stats = self.endpoint_stats
+        stats["utterances"] += 1
+        stats["uploaded_bytes"] += utterance["uploaded_bytes"]
+        stats["saved_bytes"] += utterance["saved_bytes"]
+        stats["latency_ms_total"] += latency_ms
+        total = stats["uploaded_bytes"] + stats["saved_bytes"]
+        logging.info(
+            f"端点检测: 语音 {utterance['speech_seconds']:.2f}s，句尾静音 {utterance['end_silence_seconds']:.2f}s，"
+            f"上传 {utterance['uploaded_bytes']} 字节，节省 {utterance['saved_bytes']} 字节；"
+            f"说完到出结果 {latency_ms:.0f} ms（累计 {stats['utterances']} 句，节省 "
+            f"{stats['saved_bytes'] / total:.0%}，平均 {stats['latency_ms_total'] / stats['utterances']:.0f} ms）"
+        )
 
+    async def _recognize_streaming(self, timeout, phrase_time_limit, is_wake_word=False, on_partial=None):
+        """
+        流式识别：麦克风在后台线程中采集，检测到开口时取出就绪的会话，边采集边发送音频分段
+
+        说完后只需等待服务端返回最后结果；唤醒词模式下一旦中间结果包含唤醒词立即结束
+        """
+        loop = asyncio.get_running_loop()
+        segments: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        heard = asyncio.Event()
+
+        def emit(segment):
+            loop.call_soon_threadsafe(segments.put_nowait, segment)
+
+        def partial(text):
+            if on_partial:
+                on_partial(text)
+            if is_wake_word and self._is_wake_word(text):
+                # 已听到唤醒词，不必等这句说完
+                stop.set()
+                heard.set()
+
+        capture = asyncio.ensure_future(
+            asyncio.to_thread(self._capture_segments, emit, stop, timeout, phrase_time_limit))
         try:
-            result = await asyncio.get_event_loop().run_in_executor(self.executor, sync_websocket)
-            return result
-        except Exception as e:
-            logging.error(f"Qiniu ASR 执行失败: {e}")
-            return None
+            segment = await segments.get()
+            if segment is None:
+                return None
+            async with self.client.session(on_partial=partial) as session:
+                while segment is not None and not heard.is_set() and not session.done:
+                    await session.feed(segment)
+                    segment = await segments.get()
+                if heard.is_set():
+                    return session.text
+                text = await session.finish(timeout=5.0 if is_wake_word else 10.0)
+            if not is_wake_word:
+                self._report_endpoint(await asyncio.shield(capture))
+            return text
+        finally:
+            stop.set()
+            await asyncio.shield(capture)
 
     def parse_navigation_command(self, text, require_wake_word=True):
         if not text:
             logging.warning("输入文本为空")
             return {'valid': False}
 
-        # 改进预处理：移除空格、逗号、句号
-        text = text.replace(" ", "").replace(",", "").replace("。", "").lower()
-        logging.debug(f"处理后的输入文本: {text}")
+        # 唤醒词、交通方式与句式在一次扫描中识别，地点名称保留原文
+        command = parse_command(text)
+        logging.debug(f"指令解析结果: {command}")
 
-        if require_wake_word:
-            if self.wake_word not in text and "hi" not in text:
-                if "任意" in text or "门" in text:
-                    logging.info(f"部分匹配唤醒词: {text}")
-                else:
-                    logging.warning("缺少唤醒词，解析失败")
-                    return {'valid': False}
+        if require_wake_word and not command['wake_word']:
+            if command['partial_wake_word']:
+                logging.info(f"部分匹配唤醒词: {text}")
+            else:
+                logging.warning("缺少唤醒词，解析失败")
+                return {'valid': False}
+
+        if command['structure'] is None:
+            logging.warning(f"无法匹配导航模式，输入文本: {text}")
+            return {'valid': False}
 
         result = {
             'valid': True,
-            'start_point': None,
-            'end_point': None,
-            'transport_mode': None
-        }
-
-        transport_keywords = {
-            '步行': 'walking',
-            '驾车': 'driving',
-            '自驾': 'driving',
-            '开车': 'driving',
-            '公交': 'public_transit',
-            '地铁': 'public_transit'
+            'start_point': command['start_point'] or None,
+            'end_point': command['end_point'],
+            'transport_mode': command['transport_mode']
         }
-
-        for keyword, mode in transport_keywords.items():
-            if keyword in text:
-                result['transport_mode'] = mode
-                text = text.replace(keyword, '')  # 移除交通方式，便于后续匹配
-                break
-
-        # 支持“从A到B”
-        from_to_pattern = r'从(.+?)到(.+)'
-        match = re.search(from_to_pattern, text)
-        if match:
-            result['start_point'] = match.group(1).strip()
-            result['end_point'] = match.group(2).strip()
+        if result['start_point']:
             logging.debug(f"解析导航: 从 {result['start_point']} 到 {result['end_point']}, 方式: {result['transport_mode']}")
-            return result
-
-        # 支持“导航到某地”或“到某地”或“去某地”
-        go_to_pattern = r'(?:导航)?[到去](.+)'
-        match = re.search(go_to_pattern, text)
-        if match:
-            result['end_point'] = match.group(1).strip()
+        else:
             logging.debug(f"解析导航: 去 {result['end_point']}, 方式: {result['transport_mode']}")
-            return result
-
-        logging.warning(f"无法匹配导航模式，处理后文本: {text}")
-        return {'valid': False}
\ No newline at end of file
+        return result
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+本地唤醒词检测模块
+常驻监听时先在本地用能量VAD截取语音段并按时长过滤，再把MFCC特征与录入的唤醒词模板做DTW匹配，
+只有通过本地检测的片段才发送到七牛云ASR确认，空闲时不再持续调用云端识别
+
+录入模板: python wake_word.py enroll [--count 5]
+"""
+import argparse
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 25
+HOP_MS = 10
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+# 语音帧需高出本段背景噪声的分贝数，以及语音的最低绝对能量（dBFS）
+VAD_MARGIN_DB = 10.0
+VAD_MIN_DB = -55.0
+# 唤醒词语音段的合理时长（秒），"任意门"一般在0.5~1.2秒
+MIN_WAKE_SECONDS = 0.3
+MAX_WAKE_SECONDS = 2.0
+# 模板间最大DTW距离乘以该系数作为默认阈值
+THRESHOLD_MARGIN = 1.25
+
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.expanduser("~"), ".renyimen", "wake_word_templates.npz")
+
+
+def pcm_to_float(pcm: bytes) -> np.ndarray:
+    """16位PCM转为[-1, 1)浮点采样"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _frames(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    frame_len = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    if len(samples) < frame_len:
+        return np.empty((0, frame_len), dtype=np.float32)
+    return np.lib.stride_tricks.sliding_window_view(samples, frame_len)[::hop]
+
+
+def frame_energies(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """每帧能量（dBFS）"""
+    frames = _frames(samples, sample_rate)
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def voiced_region(samples: np.ndarray, sample_rate: int) -> Optional[Tuple[int, int]]:
+    """
+    能量VAD：找出第一个到最后一个语音帧的区间
+
+    Returns:
+        (起始采样, 结束采样)，没有语音帧时为None
+    """
+    energies = frame_energies(samples, sample_rate)
+    if not len(energies):
+        return None
+    noise_floor = np.percentile(energies, 10)
+    if energies.max() <= max(noise_floor + VAD_MARGIN_DB, VAD_MIN_DB):
+        return None
+    # 至少一帧明显高于背景噪声才算有语音；语音段边界按一半的余量确定，避免截掉较弱的音节
+    voiced = np.flatnonzero(energies > max(noise_floor + VAD_MARGIN_DB / 2, VAD_MIN_DB))
+    hop = sample_rate * HOP_MS // 1000
+    frame_len = sample_rate * FRAME_MS // 1000
+    return int(voiced[0] * hop), int(min(voiced[-1] * hop + frame_len, len(samples)))
+
+
+_mel_cache: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+def _mel_matrices(sample_rate: int):
+    """Hamming窗、Mel滤波器组与DCT矩阵，按采样率缓存"""
+    if sample_rate not in _mel_cache:
+        frame_len = sample_rate * FRAME_MS // 1000
+        window = np.hamming(frame_len).astype(np.float32)
+
+        def hz_to_mel(hz):
+            return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+        mel_points = np.linspace(hz_to_mel(60.0), hz_to_mel(sample_rate / 2), N_MELS + 2)
+        hz_points = 700.0 * (10 ** (mel_points / 2595.0) - 1.0)
+        bins = np.floor((N_FFT + 1) * hz_points / sample_rate).astype(int)
+        filters = np.zeros((N_MELS, N_FFT // 2 + 1), dtype=np.float32)
+        for m in range(1, N_MELS + 1):
+            left, center, right = bins[m - 1], bins[m], bins[m + 1]
+            if center > left:
+                filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+            if right > center:
+                filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+
+        n = np.arange(N_MELS)
+        dct = np.cos(np.pi / N_MELS * (n[None, :] + 0.5) * np.arange(N_MFCC)[:, None]).astype(np.float32)
+        _mel_cache[sample_rate] = (window, filters.T, dct.T)
+    return _mel_cache[sample_rate]
+
+
+def mfcc(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    MFCC特征（帧数 × 12，去掉C0并做倒谱均值归一化，对音量和麦克风差异不敏感）
+    """
+    window, filters, dct = _mel_matrices(sample_rate)
+    frames = _frames(samples, sample_rate)
+    if not len(frames):
+        return np.empty((0, N_MFCC - 1), dtype=np.float32)
+    spectrum = np.abs(np.fft.rfft(frames * window, n=N_FFT)) ** 2
+    features = np.log(spectrum @ filters + 1e-10) @ dct
+    features = features[:, 1:]
+    return features - features.mean(axis=0)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """两段特征序列的DTW距离，按路径长度归一化"""
+    n, m = len(a), len(b)
+    if not n or not m:
+        return float("inf")
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)).tolist()
+    inf = float("inf")
+    previous = [inf] * (m + 1)
+    previous[0] = 0.0
+    for i in range(n):
+        row = cost[i]
+        current = [inf] * (m + 1)
+        for j in range(m):
+            best = previous[j]
+            if previous[j + 1] < best:
+                best = previous[j + 1]
+            if current[j] < best:
+                best = current[j]
+            current[j + 1] = row[j] + best
+        previous = current
+    return previous[m] / (n + m)
+
+
+class WakeWordDetector:
+    """
+    本地唤醒词检测器
+
+    没有录入模板时只做VAD与时长过滤；录入模板后再按DTW距离匹配
+    """
+
+    def __init__(self, sample_rate: int = 16000, templates: List[np.ndarray] = None, threshold: float = None):
+        self.sample_rate = sample_rate
+        self.templates = list(templates or [])
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: str, sample_rate: int = 16000, threshold: float = None) -> "WakeWordDetector":
+        """读取模板文件，文件不存在时返回只做VAD与时长过滤的检测器"""
+        detector = cls(sample_rate=sample_rate, threshold=threshold)
+        if not os.path.exists(path):
+            return detector
+        with np.load(path) as data:
+            if int(data["sample_rate"]) != sample_rate:
+                logger.warning("唤醒词模板采样率(%s)与当前采样率(%s)不一致，忽略模板", int(data["sample_rate"]), sample_rate)
+                return detector
+            count = int(data["count"])
+            detector.templates = [data[f"template_{i}"] for i in range(count)]
+            if detector.threshold is None:
+                detector.threshold = float(data["threshold"])
+        logger.info("已加载 %d 个唤醒词模板，阈值 %.3f", len(detector.templates), detector.threshold)
+        return detector
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {f"template_{i}": template for i, template in enumerate(self.templates)}
+        np.savez(path, sample_rate=self.sample_rate, count=len(self.templates), threshold=self.threshold, **arrays)
+
+    def _voiced_features(self, pcm: bytes) -> Tuple[Optional[np.ndarray], float]:
+        samples = pcm_to_float(pcm)
+        region = voiced_region(samples, self.sample_rate)
+        if region is None:
+            return None, 0.0
+        start, end = region
+        return mfcc(samples[start:end], self.sample_rate), (end - start) / self.sample_rate
+
+    def enroll(self, clips: List[bytes]):
+        """
+        用若干段唤醒词录音生成模板，并以模板间最大距离乘以THRESHOLD_MARGIN作为阈值
+
+        Raises:
+            ValueError: 有效录音少于2段
+        """
+        templates = []
+        for pcm in clips:
+            features, duration = self._voiced_features(pcm)
+            if features is not None and MIN_WAKE_SECONDS <= duration <= MAX_WAKE_SECONDS:
+                templates.append(features)
+        if len(templates) < 2:
+            raise ValueError("有效的唤醒词录音少于2段，请在安静环境中重新录入")
+        distances = [dtw_distance(a, b) for i, a in enumerate(templates) for b in templates[i + 1:]]
+        self.templates = templates
+        self.threshold = max(distances) * THRESHOLD_MARGIN
+        logger.info("已录入 %d 个唤醒词模板，阈值 %.3f", len(templates), self.threshold)
+
+    def detect(self, pcm: bytes) -> Dict:
+        """
+        检测一段录音是否可能是唤醒词
+
+        Returns:
+            字典，包含accepted（是否通过本地检测）、duration（语音段时长，秒）、
+            score（与最近模板的DTW距离，没有模板时为None）及reason
+        """
+        result = {"accepted": False, "duration": 0.0, "score": None, "reason": ""}
+        features, duration = self._voiced_features(pcm)
+        result["duration"] = round(duration, 3)
+        if features is None:
+            result["reason"] = "无语音"
+            return result
+        if not MIN_WAKE_SECONDS <= duration <= MAX_WAKE_SECONDS:
+            result["reason"] = "语音时长不符"
+            return result
+        if not self.templates:
+            result["accepted"] = True
+            result["reason"] = "未录入模板，仅按时长过滤"
+            return result
+        score = min(dtw_distance(features, template) for template in self.templates)
+        result["score"] = round(score, 3)
+        result["accepted"] = score <= self.threshold
+        result["reason"] = "匹配模板" if result["accepted"] else "与模板不匹配"
+        return result
+
+
+_detector: Optional[WakeWordDetector] = None
+
+
+def get_wake_word_detector(sample_rate: int = 16000) -> Optional[WakeWordDetector]:
+    """
+    获取全局唤醒词检测器
+
+    读取环境变量WAKE_WORD_LOCAL（设为0关闭本地检测，每段录音都发送到云端）、
+    WAKE_WORD_TEMPLATES（模板文件路径）、WAKE_WORD_THRESHOLD（覆盖录入时计算的阈值）
+    """
+    global _detector
+    if os.getenv("WAKE_WORD_LOCAL", "1") == "0":
+        return None
+    if _detector is None:
+        threshold = os.getenv("WAKE_WORD_THRESHOLD")
+        _detector = WakeWordDetector.load(
+            os.getenv("WAKE_WORD_TEMPLATES", DEFAULT_TEMPLATE_PATH),
+            sample_rate=sample_rate,
+            threshold=float(threshold) if threshold else None,
+        )
+    return _detector
+
+
+def _enroll(count: int, sample_rate: int, path: str):
+    import speech_recognition as sr
+
+    from audio_capture import PCMConverter, microphone_settings
+
+    recognizer = sr.Recognizer()
+    clips = []
+    with sr.Microphone(sample_rate=microphone_settings()["device_rate"] or sample_rate) as source:
+        recognizer.adjust_for_ambient_noise(source, duration=1.0)
+        for i in range(count):
+            print(f"[{i + 1}/{count}] 请说“任意门”...")
+            audio = recognizer.listen(source, timeout=10, phrase_time_limit=3)
+            converter = PCMConverter(audio.sample_rate, sample_rate, sample_width=audio.sample_width)
+            clips.append(converter.convert(audio.get_raw_data()))
+    detector = WakeWordDetector(sample_rate=sample_rate)
+    detector.enroll(clips)
+    detector.save(path)
+    print(f"已保存 {len(detector.templates)} 个模板到 {path}，阈值 {detector.threshold:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地唤醒词模板录入")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    enroll = subparsers.add_parser("enroll", help="录入唤醒词模板")
+    enroll.add_argument("--count", type=int, default=5, help="录音次数")
+    enroll.add_argument("--path", default=os.getenv("WAKE_WORD_TEMPLATES", DEFAULT_TEMPLATE_PATH), help="模板文件路径")
+    args = parser.parse_args()
+    sample_rate = int(os.getenv("QINIU_ASR_SAMPLE_RATE", "16000"))
+    if args.command == "enroll":
+        _enroll(args.count, sample_rate, args.path)
+
+
+if __name__ == "__main__":
+    main()